@@ -1,35 +1,52 @@
-import sys
-import csv
-
-def parse_data(data, coord_mapping):
-    current_unique_domain = "a"
-    for row in data:
-        protein_id, start, end, domain = row
-        start, end = int(start), int(end)  # Convert to integers
-        unique_domain = "{},{}".format(protein_id, domain)
-
-        if ((unique_domain + current_unique_domain[-1]) == current_unique_domain):
-            unique_domain = current_unique_domain
-
-        if unique_domain not in coord_mapping:
-            coord_mapping[unique_domain] = [start, end]
-            current_unique_domain = unique_domain
-        else:
-            if current_unique_domain != unique_domain:
-                last_char = unique_domain[-1]
-                try:
-                    last_char = int(last_char)
-                    unique_domain.append(str(int(last_char) + 1))
-                except:
-                     unique_domain += "2"
-                current_unique_domain = unique_domain
-                coord_mapping[unique_domain] = [start, end]
-            if start < coord_mapping[unique_domain][0]:
-                coord_mapping[unique_domain][0] = start
-            if end > coord_mapping[unique_domain][1]:
-                coord_mapping[unique_domain][1] = end
-
-def combine_coords(inputfile, outputfile):
+import argparse
+import numpy as np
+import pandas as pd
+
+COLUMNS = ['protein_id', 'start', 'end', 'domain']
+DEFAULT_CHUNKSIZE = 1_000_000  # Rows read per chunk
+
+def merge_domains(hits):
+    """
+    Collapses each protein's domain hits into one span per run of the same domain.
+
+    Hits are ordered by start within each protein; consecutive hits of the same
+    domain merge into (min start, max end), and a domain that appears again after
+    a different one starts a new numbered entry (TIR, TIR2, TIR3, ...).
+    Proteins are returned in order of first appearance.
+    """
+    if hits.empty:
+        return pd.DataFrame(columns=COLUMNS)
+    protein_codes, proteins = pd.factorize(hits['protein_id'])
+    domain_codes, domains = pd.factorize(hits['domain'])
+    starts = hits['start'].to_numpy(dtype=np.int64)
+    ends = hits['end'].to_numpy(dtype=np.int64)
+
+    # Stable sort by (protein, start); a run ends wherever the protein or the domain changes
+    order = np.lexsort((starts, protein_codes))
+    protein_codes, domain_codes = protein_codes[order], domain_codes[order]
+    starts, ends = starts[order], ends[order]
+    boundary = np.r_[True, (protein_codes[1:] != protein_codes[:-1]) | (domain_codes[1:] != domain_codes[:-1])]
+    run_starts = np.flatnonzero(boundary)
+    run_proteins, run_domains = protein_codes[run_starts], domain_codes[run_starts]
+
+    # Number repeated runs of a domain within a protein: 1 (no suffix), 2, 3, ...
+    keys = run_proteins.astype(np.int64) * len(domains) + run_domains
+    occurrence = pd.Series(keys).groupby(keys).cumcount().to_numpy() + 1
+    labels = np.asarray(domains, dtype=object)[run_domains]
+    repeated = occurrence > 1
+    labels[repeated] = [f"{label}{n}" for label, n in zip(labels[repeated], occurrence[repeated])]
+
+    return pd.DataFrame({
+        'protein_id': np.asarray(proteins, dtype=object)[run_proteins],
+        'start': np.minimum.reduceat(starts, run_starts),
+        'end': np.maximum.reduceat(ends, run_starts),
+        'domain': labels,
+    })
+
+def read_hits(inputfile, chunksize=DEFAULT_CHUNKSIZE):
+    """
+    Yields chunks of (protein_id, start, end, domain) rows from a CSV or TSV file.
+    """
     # Determine file type and read accordingly
     if inputfile.endswith('.csv'):
         delimiter = ','
@@ -37,24 +54,40 @@ def combine_coords(inputfile, outputfile):
         delimiter = '\t'
     else:
         raise ValueError("Unsupported file format. Please use CSV or TSV.")
+    yield from pd.read_csv(inputfile, sep=delimiter, header=None, names=COLUMNS, chunksize=chunksize,
+                           dtype={'protein_id': str, 'start': np.int64, 'end': np.int64, 'domain': str})
 
-    coord_mapping = {}
-    
-    with open(inputfile, 'r') as infile:
-        reader = csv.reader(infile, delimiter=delimiter)
-        parse_data(reader, coord_mapping)
+def combine_coords(inputfiles, outputfile, chunksize=DEFAULT_CHUNKSIZE):
+    """
+    Merges the domain hits of one or more CSV/TSV files into protein,start,end,domain rows.
 
+    Inputs are streamed in chunks and treated as one sequence of rows. Each chunk's
+    trailing protein is held back until the next chunk, so a protein's hits are merged
+    together as long as they are contiguous in the input (as hmmscan/InterProScan write them).
+    """
+    if isinstance(inputfiles, str):
+        inputfiles = [inputfiles]
+    pending = None
     with open(outputfile, 'w') as outfile:
-        writer = csv.writer(outfile, lineterminator = "\n")
-        for key, value in coord_mapping.items():
-            protein_id, domain = key.split(',')
-            writer.writerow([protein_id, value[0], value[1], domain])
-
-# Usage
-if len(sys.argv) != 3:
-    print("Usage: python combine_coords.py <input_file> <output_file>")
-    sys.exit(1)
-
-input_file = sys.argv[1]
-output_file = sys.argv[2]
-combine_coords(input_file, output_file)
\ No newline at end of file
+        for inputfile in inputfiles:
+            for chunk in read_hits(inputfile, chunksize):
+                if pending is not None:
+                    chunk = pd.concat([pending, chunk], ignore_index=True)
+                proteins = chunk['protein_id'].to_numpy()
+                # First row of the trailing run of the last protein
+                changes = np.flatnonzero(proteins[1:] != proteins[:-1])
+                tail = changes[-1] + 1 if len(changes) else 0
+                pending = chunk.iloc[tail:]
+                merge_domains(chunk.iloc[:tail]).to_csv(outfile, header=False, index=False, lineterminator="\n")
+        if pending is not None:
+            merge_domains(pending).to_csv(outfile, header=False, index=False, lineterminator="\n")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Merge domain coordinate hits per protein')
+    parser.add_argument('files', nargs='+', help='Input CSV/TSV files followed by the output file')
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE, help='Rows read per chunk')
+    args = parser.parse_args()
+    if len(args.files) < 2:
+        parser.error("at least one input file and an output file are required")
+
+    combine_coords(args.files[:-1], args.files[-1], args.chunksize)
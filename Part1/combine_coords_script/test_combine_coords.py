@@ -1,4 +1,8 @@
 import sys
+import os
+import tempfile
+from combine_coords import combine_coords
+
 
 def test():
     correct_file = open("./example_domain_coordinates_output_file_for_parser.csv", "r")
@@ -8,4 +12,21 @@ def test():
     for i in range(len(correct_lines) - 1):
         assert correct_lines[i] == output_lines[i]
 
-test()
\ No newline at end of file
+
+def test_repeated_domains():
+    rows = ["p1,1,5,CC1", "p1,4,9,CC1", "p1,10,20,NBS", "p1,21,30,CC1", "p1,31,40,NBS", "p1,41,50,CC1", "p2,3,8,TIR"]
+    with tempfile.TemporaryDirectory() as tmp:
+        first, second = os.path.join(tmp, "a.csv"), os.path.join(tmp, "b.tsv")
+        with open(first, "w") as f:
+            f.write("\n".join(rows[:4]) + "\n")
+        with open(second, "w") as f:
+            f.write("\n".join(row.replace(",", "\t") for row in rows[4:]) + "\n")
+        output = os.path.join(tmp, "out.csv")
+        combine_coords([first, second], output, chunksize=2)
+        with open(output) as f:
+            assert f.read().splitlines() == ["p1,1,9,CC1", "p1,10,20,NBS", "p1,21,30,CC12", "p1,31,40,NBS2",
+                                             "p1,41,50,CC13", "p2,3,8,TIR"]
+
+
+if __name__ == "__main__":
+    test()
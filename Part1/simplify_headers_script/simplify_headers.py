@@ -1,4 +1,14 @@
+import argparse
+import gzip
+import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
+
+BLOCK_SIZE = 16 * 1024 * 1024  # Characters read per block
+BUFFER_SIZE = 1024 * 1024  # Underlying file buffer
+GZIP_MAGIC = b'\x1f\x8b'
+GZIP_SUFFIXES = ('.gz', '.bgz')
+FASTA_SUFFIXES = ('.fasta', '.fa', '.faa', '.fna', '.fas')
 
 def simplify_header(header):
     """
@@ -7,28 +17,175 @@ def simplify_header(header):
     parts = header.split("_")
     return "_".join(parts[:4])
 
-def process_fasta(input_file, output_file):
+def is_gzipped(path):
+    """
+    True if the file starts with the gzip magic bytes (bgzip files are gzip too).
+    """
+    with open(path, 'rb') as f:
+        return f.read(2) == GZIP_MAGIC
+
+def open_fasta(path, mode):
+    """
+    Opens a FASTA file as text, decompressing/compressing gzip transparently.
+    Inputs are detected by content, outputs are compressed when named *.gz or *.bgz.
+    """
+    if 'r' in mode:
+        compressed = is_gzipped(path)
+    else:
+        compressed = path.lower().endswith(GZIP_SUFFIXES)
+    if compressed:
+        return gzip.open(path, mode + 't', compresslevel=6)
+    return open(path, mode, buffering=BUFFER_SIZE)
+
+def read_blocks(infile, block_size=BLOCK_SIZE):
+    """
+    Yields large blocks of whole lines from a text file.
+    """
+    while True:
+        block = infile.read(block_size)
+        if not block:
+            return
+        if not block.endswith('\n'):
+            block += infile.readline()
+        yield block
+
+def rewrite_headers(block, rewrite):
+    """
+    Returns the pieces of a block of whole lines with each header line replaced by rewrite(line).
+    Sequence lines are copied through in bulk.
+    """
+    pieces = []
+    pos = 0
+    start = 0 if block.startswith('>') else block.find('\n>') + 1 or -1
+    while start >= 0:
+        end = block.find('\n', start) + 1 or len(block)
+        pieces.append(block[pos:start])
+        pieces.append(rewrite(block[start:end]))
+        pos = end
+        # The newline ending this header may start the next one
+        start = block.find('\n>', end - 1) + 1 or -1
+    pieces.append(block[pos:])
+    return pieces
+
+def process_fasta(input_file, output_file, mapping_file=None):
     """
     Reads an input FASTA file, modifies the headers, and writes to an output FASTA file.
+    Optionally writes a TSV of original -> simplified headers in the same pass.
+    Returns the number of headers rewritten.
     """
-    with open(input_file, 'r') as infile, open(output_file, 'w') as outfile:
-        for line in infile:
-            if line.startswith('>'):
-                simplified_header = simplify_header(line.strip().lstrip('>'))
-                outfile.write(f'>{simplified_header}\n')
-            else:
-                outfile.write(line)
+    mapping = open_fasta(mapping_file, 'w') if mapping_file else None
+    count = 0
+
+    def rewrite(line):
+        nonlocal count
+        original = line.strip().lstrip('>')
+        simplified_header = simplify_header(original)
+        if mapping is not None:
+            mapping.write(f'{original}\t{simplified_header}\n')
+        count += 1
+        return f'>{simplified_header}\n'
+
+    try:
+        if mapping is not None:
+            mapping.write('original\tsimplified\n')
+        with open_fasta(input_file, 'r') as infile, open_fasta(output_file, 'w') as outfile:
+            for block in read_blocks(infile):
+                outfile.writelines(rewrite_headers(block, rewrite))
+    finally:
+        if mapping is not None:
+            mapping.close()
+    return count
+
+def default_output_name(input_file, output_dir=None):
+    """
+    <name>_simplified.fasta next to the input (or in output_dir), keeping a .gz suffix.
+    """
+    directory, name = os.path.split(input_file)
+    suffix = ''
+    for gz in GZIP_SUFFIXES:
+        if name.lower().endswith(gz):
+            name, suffix = name[:-len(gz)], gz
+            break
+    name = name.split(".")[0] + "_simplified.fasta" + suffix
+    return os.path.join(output_dir if output_dir is not None else directory, name)
+
+def mapping_name(output_file):
+    """
+    Header-mapping TSV path for an output FASTA file (gzipped alongside gzipped output).
+    """
+    suffix = ''
+    for gz in GZIP_SUFFIXES:
+        if output_file.lower().endswith(gz):
+            output_file, suffix = output_file[:-len(gz)], gz
+            break
+    return os.path.splitext(output_file)[0] + "_headers.tsv" + suffix
+
+def collect_inputs(paths):
+    """
+    Expands directories into the FASTA files (plain or gzipped) they contain.
+    """
+    inputs = []
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                base = name.lower()
+                for gz in GZIP_SUFFIXES:
+                    if base.endswith(gz):
+                        base = base[:-len(gz)]
+                if base.endswith(FASTA_SUFFIXES) and not base.split(".")[0].endswith("_simplified"):
+                    inputs.append(os.path.join(path, name))
+        else:
+            inputs.append(path)
+    return inputs
+
+def _process_job(job):
+    input_file, output_file, mapping_file = job
+    return input_file, output_file, process_fasta(input_file, output_file, mapping_file)
+
+def process_many(inputs, output_dir=None, jobs=None, write_mapping=False):
+    """
+    Simplifies many FASTA files in parallel across a process pool.
+    Returns (input, output, header count) per file, in input order.
+    """
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    work = []
+    for input_file in inputs:
+        output_file = default_output_name(input_file, output_dir)
+        work.append((input_file, output_file, mapping_name(output_file) if write_mapping else None))
+    jobs = jobs or min(len(work), os.cpu_count() or 1)
+    if jobs <= 1 or len(work) <= 1:
+        return [_process_job(job) for job in work]
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        return list(pool.map(_process_job, work))
+
+def main(argv):
+    # Legacy form: simplify_headers.py <input_file_name> [<output_file_name>]
+    if 1 <= len(argv) <= 2 and not any(arg.startswith('-') for arg in argv) and not os.path.isdir(argv[0]):
+        input_file = argv[0]
+        output_file = argv[1] if len(argv) == 2 else default_output_name(input_file)
+        process_fasta(input_file, output_file)
+        print(f"Simplified FASTA file saved as: {output_file}")
+        return
+
+    parser = argparse.ArgumentParser(description='Simplify FASTA headers to their first four underscore-separated tokens')
+    parser.add_argument('inputs', nargs='+', help='FASTA files (plain or gzipped) or directories of them')
+    parser.add_argument('--output-dir', '-o', help='Directory for the simplified files (default: next to each input)')
+    parser.add_argument('--jobs', '-j', type=int, help='Files processed in parallel (default: one per CPU)')
+    parser.add_argument('--mapping', action='store_true',
+                        help='Also write <output>_headers.tsv mapping original to simplified headers')
+    args = parser.parse_args(argv)
+
+    inputs = collect_inputs(args.inputs)
+    if not inputs:
+        print("No FASTA files found")
+        sys.exit(1)
+    for input_file, output_file, count in process_many(inputs, args.output_dir, args.jobs, args.mapping):
+        print(f"Simplified FASTA file saved as: {output_file} ({count} headers)")
 
 if __name__ == "__main__":
     if len(sys.argv) < 2:
         print("Usage: python simplify_headers.py <input_file_name> <output_file_name>")
+        print("       python simplify_headers.py <inputs or directories>... [-o OUTPUT_DIR] [-j JOBS] [--mapping]")
         sys.exit(1)
-
-    input_file = sys.argv[1]
-    if (len(sys.argv)) == 3:
-        output_file = sys.argv[2]
-    else:
-        output_file = sys.argv[1].split(".")[0] + "_simplified.fasta"
-        
-    process_fasta(input_file, output_file)
-    print(f"Simplified FASTA file saved as: {output_file}")
+    main(sys.argv[1:])
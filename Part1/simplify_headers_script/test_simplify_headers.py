@@ -10,3 +10,25 @@ def test():
 
 test()
 
+
+def test_gzip_with_mapping():
+    import gzip
+    import os
+    import tempfile
+    from simplify_headers import process_fasta, process_many
+
+    with tempfile.TemporaryDirectory() as tmp:
+        plain = os.path.join(tmp, "plain.fasta")
+        process_fasta("./Dandie_helixer_Rprotein.fasta", plain)
+        source = os.path.join(tmp, "sample.fasta.gz")
+        with open("./Dandie_helixer_Rprotein.fasta", "rb") as infile, gzip.open(source, "wb") as outfile:
+            outfile.write(infile.read())
+
+        [(_, output, count)] = process_many([tmp + "/sample.fasta.gz"], os.path.join(tmp, "out"), write_mapping=True)
+        with gzip.open(output, "rt") as simplified, open(plain, "r") as expected:
+            assert simplified.read() == expected.read()
+        with gzip.open(os.path.join(tmp, "out", "sample_simplified_headers.tsv.gz"), "rt") as mapping:
+            rows = mapping.read().splitlines()
+        assert rows[0] == "original\tsimplified"
+        assert len(rows) == count + 1
+        assert rows[1].split("\t")[1] == "Lsativa_Dandie_Chr1_000100"
@@ -0,0 +1,168 @@
+import json
+import sys
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import pytest
+from jose import jwk, jwt
+import auth_utils
+from exception_templates.auth_exception import AuthenticationError
+
+ISSUER = "https://cognito-idp.local/test-pool"
+CLIENT_ID = "test-client"
+
+
+def _make_signing_key(kid):
+    """Generate an RSA key pair and return (private PEM, public JWK dict)."""
+    import rsa
+    public_key, private_key = rsa.newkeys(1024)
+    private_pem = private_key.save_pkcs1().decode()
+    public_jwk = jwk.construct(public_key.save_pkcs1().decode(), algorithm='RS256').to_dict()
+    public_jwk['kid'] = kid
+    return private_pem, public_jwk
+
+
+class _JWKSStandIn:
+    """Local JWKS endpoint that counts how often it gets hit."""
+
+    def __init__(self, keys, delay=0.0):
+        self.body = json.dumps({"keys": keys}).encode()
+        self.delay = delay
+        self.hits = 0
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stand_in.hits += 1
+                time.sleep(stand_in.delay)
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.end_headers()
+                self.wfile.write(stand_in.body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = HTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/.well-known/jwks.json"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+
+
+def _setup(monkeypatch, stand_in):
+    monkeypatch.setattr(auth_utils, 'JWKS_URL', stand_in.url)
+    monkeypatch.setattr(auth_utils, 'COGNITO_ISSUER', ISSUER)
+    monkeypatch.setattr(auth_utils, 'APP_CLIENT_ID', CLIENT_ID)
+    monkeypatch.setattr(auth_utils, '_jwks_keys', {})
+    monkeypatch.setattr(auth_utils, '_jwks_last_fetch_time', 0)
+    auth_utils.token_cache.clear()
+
+
+def _token(private_pem, kid, exp):
+    claims = {"sub": "user-1", "iss": ISSUER, "aud": CLIENT_ID, "exp": exp}
+    return jwt.encode(claims, private_pem, algorithm='RS256', headers={'kid': kid})
+
+
+def test_verified_token_is_served_from_cache(monkeypatch):
+    private_pem, public_jwk = _make_signing_key('kid-1')
+    stand_in = _JWKSStandIn([public_jwk])
+    try:
+        _setup(monkeypatch, stand_in)
+        token = _token(private_pem, 'kid-1', int(time.time()) + 600)
+
+        decode_calls = []
+        real_decode = auth_utils.jwt.decode
+        monkeypatch.setattr(auth_utils.jwt, 'decode', lambda *a, **k: decode_calls.append(1) or real_decode(*a, **k))
+
+        first = auth_utils.verify_token(token)
+        second = auth_utils.verify_token(token)
+
+        assert first == second
+        assert first['sub'] == 'user-1'
+        assert len(decode_calls) == 1
+        assert stand_in.hits == 1
+    finally:
+        stand_in.close()
+
+
+def test_cached_claims_expire_with_token():
+    cache = auth_utils.VerifiedTokenCache(max_size=2)
+    cache.put('a', {'sub': 'a'}, expires_at=100)
+    assert cache.get('a', now=99) == {'sub': 'a'}
+    assert cache.get('a', now=100) is None
+
+    cache.put('a', {'sub': 'a'}, expires_at=100)
+    cache.put('b', {'sub': 'b'}, expires_at=100)
+    cache.get('a', now=0)
+    cache.put('c', {'sub': 'c'}, expires_at=100)
+    # 'b' was least recently used
+    assert cache.get('b', now=0) is None
+    assert cache.get('a', now=0) is not None
+
+
+def test_concurrent_cold_requests_fetch_jwks_once(monkeypatch):
+    private_pem, public_jwk = _make_signing_key('kid-1')
+    stand_in = _JWKSStandIn([public_jwk], delay=0.2)
+    try:
+        _setup(monkeypatch, stand_in)
+        tokens = [_token(private_pem, 'kid-1', int(time.time()) + 600 + i) for i in range(8)]
+        errors = []
+
+        def verify(token):
+            try:
+                auth_utils.verify_token(token)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=verify, args=(t,)) for t in tokens]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert not errors
+        assert stand_in.hits == 1
+    finally:
+        stand_in.close()
+
+
+def test_unknown_kid_is_rejected(monkeypatch):
+    private_pem, public_jwk = _make_signing_key('kid-1')
+    stand_in = _JWKSStandIn([public_jwk])
+    try:
+        _setup(monkeypatch, stand_in)
+        token = _token(private_pem, 'kid-unknown', int(time.time()) + 600)
+        with pytest.raises(AuthenticationError):
+            auth_utils.verify_token(token)
+    finally:
+        stand_in.close()
+
+
+def test_expired_token_is_rejected(monkeypatch):
+    private_pem, public_jwk = _make_signing_key('kid-1')
+    stand_in = _JWKSStandIn([public_jwk])
+    try:
+        _setup(monkeypatch, stand_in)
+        token = _token(private_pem, 'kid-1', int(time.time()) - 60)
+        with pytest.raises(AuthenticationError):
+            auth_utils.verify_token(token)
+        assert len(auth_utils.token_cache._entries) == 0
+    finally:
+        stand_in.close()
+
+
+def test_bad_signature_is_rejected(monkeypatch):
+    _, public_jwk = _make_signing_key('kid-1')
+    other_pem, _ = _make_signing_key('kid-1')
+    stand_in = _JWKSStandIn([public_jwk])
+    try:
+        _setup(monkeypatch, stand_in)
+        token = _token(other_pem, 'kid-1', int(time.time()) + 600)
+        with pytest.raises(AuthenticationError):
+            auth_utils.verify_token(token)
+    finally:
+        stand_in.close()
@@ -1,7 +1,9 @@
 # auth_utils.py
-from flask import jsonify
-from jose import jwt
-import requests
+from collections import OrderedDict
+from jose import jwk, jwt
+from jose.exceptions import JWTError
+import hashlib
+import threading
 import time
 import os
 
@@ -13,57 +15,155 @@ COGNITO_REGION = os.getenv('AWS_REGION')
 USER_POOL_ID = os.getenv('COGNITO_USER_POOL_ID')
 APP_CLIENT_ID = os.getenv('COGNITO_APP_CLIENT_ID')
 COGNITO_ISSUER = f"https://cognito-idp.{COGNITO_REGION}.amazonaws.com/{USER_POOL_ID}"
-JWKS_URL = f"{COGNITO_ISSUER}/.well-known/jwks.json"
+# Overridable so the verification path can be exercised against a local JWKS endpoint
+JWKS_URL = os.getenv('COGNITO_JWKS_URL', f"{COGNITO_ISSUER}/.well-known/jwks.json")
 
-# Cache
-_jwks_cache = None
+# JWKS cache: kid -> parsed public key
+_jwks_keys = {}
 _jwks_last_fetch_time = 0
+_jwks_lock = threading.Lock()
 JWKS_REFRESH_INTERVAL = 3600  # 1 hour (in seconds)
+JWKS_MIN_REFRESH_INTERVAL = 30  # unknown kids can't force refreshes more often than this
+JWKS_FETCH_TIMEOUT = 5
+
+
+class VerifiedTokenCache:
+    """
+    Bounded LRU cache of verified token claims.
+
+    Entries are keyed by a hash of the token (never the token itself) and
+    expire at the token's own ``exp`` claim, so a cache hit can never outlive
+    the token it was verified from.
+    """
+
+    def __init__(self, max_size: int = 1024):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(token, access_token=None):
+        digest = hashlib.sha256(token.encode('utf-8'))
+        if access_token:
+            # ID tokens are verified against an access token's at_hash
+            digest.update(b'\0' + access_token.encode('utf-8'))
+        return digest.hexdigest()
+
+    def get(self, key, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            claims, expires_at = entry
+            if now >= expires_at:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return dict(claims)
+
+    def put(self, key, claims, expires_at):
+        with self._lock:
+            self._entries[key] = (dict(claims), expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+token_cache = VerifiedTokenCache(int(os.getenv('TOKEN_CACHE_SIZE', '1024')))
+
+
+def _parse_jwks(jwks):
+    keys = {}
+    for key in jwks.get('keys', []):
+        try:
+            keys[key['kid']] = jwk.construct(key, algorithm=key.get('alg', 'RS256'))
+        except Exception:
+            # Skip keys we can't use rather than failing the whole set
+            continue
+    return keys
+
 
 def fetch_jwks(force=False):
-    global _jwks_cache, _jwks_last_fetch_time
-    now = time.time()
+    """
+    Return the kid -> public key map, refreshing it from JWKS_URL when stale.
+
+    Refreshes are single-flight: concurrent callers wait on one fetch instead
+    of each hitting the JWKS endpoint.
+    """
+    global _jwks_keys, _jwks_last_fetch_time
+    requested_at = time.time()
 
-    # Only fetch if cache is stale or force refresh
-    if _jwks_cache is None or force or (now - _jwks_last_fetch_time > JWKS_REFRESH_INTERVAL):
-        response = requests.get(JWKS_URL)
+    if _jwks_keys and not force and (requested_at - _jwks_last_fetch_time <= JWKS_REFRESH_INTERVAL):
+        return _jwks_keys
+
+    with _jwks_lock:
+        now = time.time()
+        # Someone else refreshed while we were waiting on the lock
+        if _jwks_keys and _jwks_last_fetch_time >= requested_at:
+            return _jwks_keys
+        if _jwks_keys and force and (now - _jwks_last_fetch_time < JWKS_MIN_REFRESH_INTERVAL):
+            return _jwks_keys
+        if _jwks_keys and not force and (now - _jwks_last_fetch_time <= JWKS_REFRESH_INTERVAL):
+            return _jwks_keys
+
+        import requests  # only needed on a JWKS refresh, keep it off the cold-start path
+        response = requests.get(JWKS_URL, timeout=JWKS_FETCH_TIMEOUT)
         response.raise_for_status()
-        _jwks_cache = response.json()
-        _jwks_last_fetch_time = now
+        _jwks_keys = _parse_jwks(response.json())
+        _jwks_last_fetch_time = time.time()
 
-    return _jwks_cache
+    return _jwks_keys
 
-def get_public_key(kid):
-    jwks = fetch_jwks()
 
-    for key in jwks['keys']:
-        if key['kid'] == kid:
-            return key
+def get_public_key(kid):
+    key = fetch_jwks().get(kid)
+    if key is not None:
+        return key
 
     # If the key was not found, refresh and try again once
-    jwks = fetch_jwks(force=True)
-    for key in jwks['keys']:
-        if key['kid'] == kid:
-            return key
+    key = fetch_jwks(force=True).get(kid)
+    if key is not None:
+        return key
 
     raise Exception('Public key not found after refresh.')
 
+
 def verify_token(token, access_token=None):
+    cache_key = VerifiedTokenCache.make_key(token, access_token)
+    claims = token_cache.get(cache_key)
+    if claims is not None:
+        return claims
+
     try:
         headers = jwt.get_unverified_header(token)
         key = get_public_key(headers['kid'])
     except Exception:
         raise TokenVerificationError()
     options = {"verify_at_hash": bool(access_token)}
-    return jwt.decode(
-        token,
-        key,
-        algorithms=['RS256'],
-        audience=APP_CLIENT_ID,
-        issuer=COGNITO_ISSUER,
-        access_token=access_token,
-        options=options
-    )
+    try:
+        claims = jwt.decode(
+            token,
+            key,
+            algorithms=['RS256'],
+            audience=APP_CLIENT_ID,
+            issuer=COGNITO_ISSUER,
+            access_token=access_token,
+            options=options
+        )
+    except JWTError:
+        # Expired, bad signature, wrong audience/issuer
+        raise TokenVerificationError()
+    if 'exp' in claims:
+        token_cache.put(cache_key, claims, float(claims['exp']))
+    return claims
 
 
 def authenticate_user(request):
@@ -0,0 +1,114 @@
+"""
+Local mixed-load scenario for /generate_graph admission control.
+
+Small clients post small synthetic datasets back to back while large clients
+post large ones, all against the Flask app in this process (one thread per
+client, as a threaded WSGI server would run them). The scenario runs once
+with admission control off and once on, and reports small-request latency
+percentiles, completed large requests and rejections by status.
+
+Usage:
+    python -m benchmarks.admission_load
+    python -m benchmarks.admission_load --small-clients 8 --large-clients 6 --large-genes 3000 --duration 30
+"""
+import argparse
+import json
+import statistics
+import threading
+import time
+from dataclasses import replace
+from io import BytesIO
+
+from benchmarks.synthetic import DatasetSpec, generate_dataset
+from services.admission import AdmissionConfig, AdmissionController, set_admission_controller
+
+
+def _percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+
+def _form(dataset):
+    (coord_name, coord_bytes), matrices = dataset
+    data = {"file_coordinate": (BytesIO(coord_bytes), coord_name), "is_domain_specific": "false"}
+    for i, (name, matrix_bytes) in enumerate(matrices):
+        data[f"file_matrix_{i}"] = (BytesIO(matrix_bytes), name)
+    return data
+
+
+def run_scenario(config: AdmissionConfig, small_dataset, large_dataset, small_clients: int, large_clients: int,
+                 duration: float):
+    """Run the mixed load for duration seconds; returns latency and status statistics."""
+    from server import app
+
+    set_admission_controller(AdmissionController(config))
+    stop = time.perf_counter() + duration
+    lock = threading.Lock()
+    stats = {"small": [], "large": [], "statuses": {}}
+
+    def client(kind, index, dataset):
+        test_client = app.test_client()
+        environ = {"REMOTE_ADDR": f"10.0.{0 if kind == 'small' else 1}.{index}"}
+        while time.perf_counter() < stop:
+            start = time.perf_counter()
+            response = test_client.post('/generate_graph', data=_form(dataset), environ_base=environ,
+                                        content_type='multipart/form-data')
+            elapsed = time.perf_counter() - start
+            with lock:
+                key = f"{kind}:{response.status_code}"
+                stats["statuses"][key] = stats["statuses"].get(key, 0) + 1
+                if response.status_code == 200:
+                    stats[kind].append(elapsed)
+            if response.status_code in (429, 503):
+                time.sleep(min(float(response.headers.get('Retry-After', 1)), 1.0))
+
+    threads = [threading.Thread(target=client, args=("small", i, small_dataset)) for i in range(small_clients)]
+    threads += [threading.Thread(target=client, args=("large", i, large_dataset)) for i in range(large_clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    set_admission_controller(None)
+
+    small = stats["small"]
+    return {
+        "admission": config.enabled,
+        "small_completed": len(small),
+        "small_p50": _percentile(small, 50),
+        "small_p99": _percentile(small, 99),
+        "small_mean": statistics.fmean(small) if small else None,
+        "large_completed": len(stats["large"]),
+        "large_p50": _percentile(stats["large"], 50),
+        "statuses": stats["statuses"],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Small-request latency under mixed load, with and without admission control')
+    parser.add_argument('--small-clients', type=int, default=6)
+    parser.add_argument('--large-clients', type=int, default=6)
+    parser.add_argument('--small-genes', type=int, default=150)
+    parser.add_argument('--large-genes', type=int, default=2500)
+    parser.add_argument('--duration', type=float, default=20.0, help='Seconds per run')
+    parser.add_argument('--output', '-o', type=str, help='Also write the results as JSON')
+    args = parser.parse_args()
+
+    small_dataset = generate_dataset(DatasetSpec(n_genes=args.small_genes, seed=1))
+    large_dataset = generate_dataset(DatasetSpec(n_genes=args.large_genes, seed=2))
+    base = AdmissionConfig.from_env()
+
+    results = []
+    for enabled in (False, True):
+        result = run_scenario(replace(base, enabled=enabled), small_dataset, large_dataset,
+                              args.small_clients, args.large_clients, args.duration)
+        results.append(result)
+        fmt = lambda v: f"{v * 1000:8.1f}ms" if v is not None else "       -"
+        print(f"admission {'on ' if enabled else 'off'}: small p50 {fmt(result['small_p50'])} "
+              f"p99 {fmt(result['small_p99'])} ({result['small_completed']} done), "
+              f"large p50 {fmt(result['large_p50'])} ({result['large_completed']} done), "
+              f"statuses {result['statuses']}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,237 @@
+"""
+Benchmark harness for the parsing and graph pipeline.
+
+Runs the real pipeline (parse_matrix, or domain_parse for domain cases) on
+synthetic datasets (see benchmarks/synthetic.py) under collect_timings, so
+the per-stage numbers are the same stage() records /generate_graph reports.
+Wall time is summed per stage name; the optional memory pass records each
+stage's largest tracemalloc allocation delta. Results are written as JSON and
+a previous results file can be given as a baseline to flag regressions.
+
+Usage:
+    python -m benchmarks.run_benchmarks
+    python -m benchmarks.run_benchmarks --genes 500,2000 --domains 0,3 --formats csv,xlsx -o results.json
+    python -m benchmarks.run_benchmarks --baseline baseline.json --fail-threshold 1.3
+    python -m benchmarks.run_benchmarks --save-baseline baseline.json
+"""
+import argparse
+import itertools
+import json
+import platform
+import statistics
+import sys
+from datetime import datetime, timezone
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import DatasetSpec, generate_dataset, named_file
+from core.config import FileProcessingConfig
+from parsing.general_parse import parse_matrix
+from parsing.domain_parse import domain_parse
+from parsing.instrumentation import collect_timings, stage
+
+
+# Ingest options applied to every case (set from the command line)
+INGEST_OPTIONS: Dict = {}
+
+
+def _config(spec: DatasetSpec) -> FileProcessingConfig:
+    return FileProcessingConfig(validation_mode="domain" if spec.n_domains else "general", **INGEST_OPTIONS)
+
+
+def run_pipeline(spec: DatasetSpec, coord_file, matrix_files, trace_memory: bool = False):
+    """
+    Parse one dataset with parse_matrix/domain_parse and serialize the result.
+
+    Returns:
+        Tuple of (output sizes, stage records from the TimingCollector)
+    """
+    config = _config(spec)
+    coord_name, coord_bytes = coord_file
+
+    with collect_timings(trace_memory=trace_memory, log=False) as timings:
+        if spec.n_domains:
+            outputs = domain_parse([named_file(data, name) for name, data in matrix_files],
+                                   named_file(coord_bytes, coord_name), [name for name, _ in matrix_files],
+                                   config=config)
+        else:
+            matrix_name, matrix_bytes = matrix_files[0]
+            graph = parse_matrix(named_file(matrix_bytes, matrix_name), named_file(coord_bytes, coord_name),
+                                 config=config)
+            outputs = [{**graph, "domain_name": "general"}]
+        with stage('serialize') as s:
+            payload = json.dumps(outputs)
+            s.set(bytes=len(payload))
+
+    sizes = {
+        "nodes": len(outputs[-1].get("nodes", outputs[0]["nodes"])),
+        "links": len(outputs[-1]["links"]),
+        "output_bytes": len(payload),
+    }
+    return sizes, timings.records
+
+
+def _stage_seconds(records: List[Dict]) -> Dict[str, float]:
+    """Seconds per stage name, in first-seen order (repeated stages, e.g. one per domain, are summed)."""
+    seconds: Dict[str, float] = {}
+    for record in records:
+        seconds[record["stage"]] = seconds.get(record["stage"], 0.0) + record["seconds"]
+    return seconds
+
+
+def benchmark_case(spec: DatasetSpec, repeat: int, trace_memory: bool) -> Dict:
+    coord_file, matrix_files = generate_dataset(spec)
+    input_bytes = len(coord_file[1]) + sum(len(data) for _, data in matrix_files)
+
+    runs: List[Dict[str, float]] = []
+    depths: Dict[str, int] = {}
+    sizes = None
+    for _ in range(repeat):
+        sizes, records = run_pipeline(spec, coord_file, matrix_files)
+        runs.append(_stage_seconds(records))
+        for record in records:
+            depths.setdefault(record["stage"], record["depth"])
+
+    alloc_kib: Dict[str, float] = {}
+    if trace_memory:
+        # Separate pass: tracemalloc slows allocation-heavy code down considerably
+        _, records = run_pipeline(spec, coord_file, matrix_files, trace_memory=True)
+        for record in records:
+            alloc_kib[record["stage"]] = max(alloc_kib.get(record["stage"], 0.0), record["alloc_kib"])
+
+    stages = {}
+    for name in runs[0]:
+        samples = [run[name] for run in runs if name in run]
+        stages[name] = {
+            "seconds": statistics.median(samples),
+            "min_seconds": min(samples),
+            "depth": depths[name],
+            "alloc_kib": alloc_kib.get(name),
+        }
+
+    return {
+        "id": spec.case_id,
+        "spec": spec.to_dict(),
+        "input_bytes": input_bytes,
+        "sizes": sizes,
+        "stages": stages,
+        # Nested stages are already included in their parents' time
+        "total_seconds": sum(timing["seconds"] for timing in stages.values() if timing["depth"] == 0),
+    }
+
+
+def compare(results: Dict, baseline: Dict, threshold: float, min_delta: float = 0.005) -> List[Dict]:
+    """
+    Compare per-stage median times against a baseline results file.
+
+    Returns:
+        List of regressions: stages slower than baseline by more than
+        `threshold` times and by at least `min_delta` seconds
+    """
+    baseline_cases = {case["id"]: case for case in baseline.get("cases", [])}
+    regressions = []
+    for case in results["cases"]:
+        base = baseline_cases.get(case["id"])
+        if not base:
+            continue
+        for stage_name, timing in case["stages"].items():
+            base_timing = base["stages"].get(stage_name)
+            if not base_timing or base_timing["seconds"] <= 0:
+                continue
+            ratio = timing["seconds"] / base_timing["seconds"]
+            timing["baseline_seconds"] = base_timing["seconds"]
+            timing["ratio"] = round(ratio, 3)
+            if ratio > threshold and timing["seconds"] - base_timing["seconds"] >= min_delta:
+                regressions.append({"case": case["id"], "stage": stage_name, "ratio": round(ratio, 3),
+                                    "seconds": timing["seconds"], "baseline_seconds": base_timing["seconds"]})
+    return regressions
+
+
+def format_results(results: Dict) -> str:
+    lines = []
+    for case in results["cases"]:
+        lines.append(f"{case['id']}  ({case['sizes']['links']} links, total {case['total_seconds']:.3f}s)")
+        for name, timing in case["stages"].items():
+            label = "  " * timing.get("depth", 0) + name
+            line = f"    {label:<36}{timing['seconds'] * 1000:10.1f} ms"
+            if timing.get("alloc_kib") is not None:
+                line += f"{timing['alloc_kib']:12.0f} KiB alloc"
+            if "ratio" in timing:
+                line += f"    x{timing['ratio']:.2f} vs baseline"
+            lines.append(line)
+    return "\n".join(lines)
+
+
+def _int_list(value):
+    return [int(v) for v in value.split(',')]
+
+
+def _float_list(value):
+    return [float(v) for v in value.split(',')]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark the parsing and graph pipeline on synthetic data')
+    parser.add_argument('--genes', type=_int_list, default=[200], help='Comma-separated gene counts')
+    parser.add_argument('--genomes', type=_int_list, default=[3], help='Comma-separated genome counts')
+    parser.add_argument('--domains', type=_int_list, default=[0, 2], help='Comma-separated domain counts (0 = general)')
+    parser.add_argument('--density', type=_float_list, default=[0.05], help='Comma-separated fractions of cells above cutoff')
+    parser.add_argument('--formats', type=lambda v: v.split(','), default=['csv'], help='Comma-separated file formats (csv, tsv, xlsx)')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs per case (median is reported)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-memory', action='store_true', help='Skip the tracemalloc pass')
+    parser.add_argument('--output', '-o', type=str, help='Write JSON results to this path')
+    parser.add_argument('--baseline', type=str, help='Results JSON to compare against')
+    parser.add_argument('--save-baseline', type=str, help='Also write the results to this path as a new baseline')
+    parser.add_argument('--csv-engine', choices=['c', 'pyarrow', 'auto'], default='c', help='CSV/TSV parser engine')
+    parser.add_argument('--float-dtype', choices=['float64', 'float32'], default='float64', help='Matrix score dtype')
+    parser.add_argument('--xlsx-reader', choices=['openpyxl', 'stream', 'calamine', 'auto'], default='auto', help='xlsx ingest path')
+    parser.add_argument('--link-engine', choices=['blocks', 'dataframe'], default='blocks', help='Link computation path')
+    parser.add_argument('--link-workers', type=int, help='Thread pool size for the block link engine')
+    parser.add_argument('--untyped', action='store_true', help='Infer CSV/TSV dtypes instead of using the explicit schema')
+    parser.add_argument('--fail-threshold', type=float, default=1.25, help='Exit non-zero if a stage is this many times slower than baseline')
+
+    args = parser.parse_args()
+    INGEST_OPTIONS.update(csv_engine=args.csv_engine, matrix_float_dtype=args.float_dtype, typed_ingest=not args.untyped,
+                          xlsx_reader=args.xlsx_reader, link_engine=args.link_engine, link_workers=args.link_workers)
+
+    results = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+            "repeat": args.repeat,
+            "ingest": INGEST_OPTIONS,
+        },
+        "cases": [],
+    }
+
+    for genes, genomes, domains, density, file_format in itertools.product(
+            args.genes, args.genomes, args.domains, args.density, args.formats):
+        spec = DatasetSpec(n_genes=genes, n_genomes=genomes, n_domains=domains, density=density,
+                           file_format=file_format, seed=args.seed)
+        print(f"Running {spec.case_id}...", file=sys.stderr)
+        results["cases"].append(benchmark_case(spec, args.repeat, trace_memory=not args.no_memory))
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.fail_threshold)
+        results["regressions"] = regressions
+
+    print(format_results(results))
+
+    for path in filter(None, [args.output, args.save_baseline]):
+        with open(path, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {path}", file=sys.stderr)
+
+    if regressions:
+        for r in regressions:
+            print(f"REGRESSION {r['case']} {r['stage']}: {r['seconds'] * 1000:.1f} ms vs "
+                  f"{r['baseline_seconds'] * 1000:.1f} ms (x{r['ratio']})", file=sys.stderr)
+        sys.exit(1)
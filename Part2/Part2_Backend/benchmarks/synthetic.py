@@ -0,0 +1,124 @@
+"""
+Deterministic synthetic datasets for benchmarking the parsing/graph pipeline.
+
+Generates a coordinate file and one score matrix per domain (or a single
+matrix for general graphs) in the same layout users upload, so every stage
+from read_file onwards can be exercised at arbitrary scale.
+"""
+from dataclasses import dataclass, asdict
+from io import BytesIO
+from typing import List, Tuple
+import numpy as np
+import pandas as pd
+
+DOMAIN_NAMES = ['NBS', 'LRR', 'TIR', 'CC', 'RPW8']
+
+
+@dataclass(frozen=True)
+class DatasetSpec:
+    """Parameters of a synthetic dataset."""
+    n_genes: int = 300
+    n_genomes: int = 3
+    n_domains: int = 0  # 0 means a general (single matrix) dataset
+    density: float = 0.05  # fraction of off-diagonal cells at or above the cutoff
+    file_format: str = 'csv'  # 'csv', 'tsv' or 'xlsx'
+    cutoff: float = 25.0
+    seed: int = 0
+
+    @property
+    def case_id(self) -> str:
+        return (f"genes={self.n_genes},genomes={self.n_genomes},domains={self.n_domains},"
+                f"density={self.density},format={self.file_format}")
+
+    def to_dict(self):
+        return asdict(self)
+
+
+def _gene_table(spec: DatasetSpec, rng: np.random.Generator) -> pd.DataFrame:
+    genome_of_gene = np.arange(spec.n_genes) % spec.n_genomes
+    genomes = np.array([f"Genome{g + 1}" for g in range(spec.n_genomes)])[genome_of_gene]
+    protein_names = np.array([f"P{i:06d}" for i in range(spec.n_genes)])
+    names = np.char.add(np.char.add(genomes.astype(str), '_'), protein_names)
+    positions = rng.integers(1_000, 50_000_000, size=spec.n_genes)
+
+    table = pd.DataFrame({
+        'name': names,
+        'protein_name': protein_names,
+        'genome': genomes,
+        'gene_type': rng.choice(['TNL', 'CNL', 'NL', 'RNL'], size=spec.n_genes),
+        'orientation': rng.choice(['plus', 'minus'], size=spec.n_genes),
+        'position': positions,
+    })
+
+    for d in range(spec.n_domains):
+        domain = DOMAIN_NAMES[d % len(DOMAIN_NAMES)]
+        start = rng.integers(1, 800, size=spec.n_genes).astype(float)
+        end = start + rng.integers(50, 400, size=spec.n_genes)
+        # Roughly 10% of genes lack each domain
+        missing = rng.random(spec.n_genes) < 0.1
+        start[missing] = np.nan
+        end[missing] = np.nan
+        table[f"domain{d + 1}_{domain}_start"] = start
+        table[f"domain{d + 1}_{domain}_end"] = end
+
+    return table
+
+
+def _score_matrix(spec: DatasetSpec, names: np.ndarray, rng: np.random.Generator) -> pd.DataFrame:
+    n = len(names)
+    above = rng.random((n, n)) < spec.density
+    scores = np.where(
+        above,
+        rng.uniform(spec.cutoff, 100.0, size=(n, n)),
+        rng.uniform(0.0, spec.cutoff, size=(n, n)),
+    ).round(2)
+    np.fill_diagonal(scores, 100.0)
+    return pd.DataFrame(scores, index=names, columns=names)
+
+
+def _encode(df: pd.DataFrame, file_format: str, index: bool) -> bytes:
+    buffer = BytesIO()
+    if file_format == 'csv':
+        df.to_csv(buffer, index=index)
+    elif file_format == 'tsv':
+        df.to_csv(buffer, sep='\t', index=index)
+    elif file_format == 'xlsx':
+        df.to_excel(buffer, index=index, engine='openpyxl')
+    else:
+        raise ValueError(f"Unsupported format: {file_format}")
+    return buffer.getvalue()
+
+
+def named_file(data: bytes, name: str) -> BytesIO:
+    """Wrap bytes the way the controllers do, with a name used for format detection."""
+    file = BytesIO(data)
+    file.name = name
+    return file
+
+
+def generate_dataset(spec: DatasetSpec) -> Tuple[Tuple[str, bytes], List[Tuple[str, bytes]]]:
+    """
+    Generate a dataset.
+
+    Returns:
+        ((coordinate filename, bytes), [(matrix filename, bytes), ...]). Matrix
+        filenames follow the '<name>_domainN_NAME.<ext>' convention that
+        parse_filenames expects for domain datasets.
+    """
+    rng = np.random.default_rng(spec.seed)
+    table = _gene_table(spec, rng)
+    ext = spec.file_format
+
+    coord_file = (f"synthetic_coords.{ext}", _encode(table, ext, index=False))
+
+    matrix_files = []
+    if spec.n_domains == 0:
+        matrix = _score_matrix(spec, table['name'].to_numpy(), rng)
+        matrix_files.append((f"synthetic_matrix.{ext}", _encode(matrix, ext, index=True)))
+    else:
+        for d in range(spec.n_domains):
+            domain = DOMAIN_NAMES[d % len(DOMAIN_NAMES)]
+            matrix = _score_matrix(spec, table['name'].to_numpy(), rng)
+            matrix_files.append((f"synthetic_domain{d + 1}_{domain}.{ext}", _encode(matrix, ext, index=True)))
+
+    return coord_file, matrix_files
@@ -1,66 +1,267 @@
 from flask import jsonify
-from parsing.general_parse import parse_matrix
-from parsing.domain_parse import domain_parse
+from flask import Response
 from io import BytesIO
+import json
+import uuid
 
 from services.s3_service import get_file_url
+from services.s3_service import get_file_bytes
+from services.result_store import get_result_store
+from services.result_store import ResultExpiredError
+from parsing.instrumentation import collect_timings, stage, timings_enabled_by_default
 
 
+def _stage(data, owner=None):
+    try:
+        return get_result_store().put(data, owner)
+    except Exception as e:
+        print(f"Error staging graph result: {str(e)}")
+        return None
+
+
+def _graph_response(result, is_domain_specific, domain_state=None, timings=None, layout=False, owner=None):
+    combined = next(g for g in result if (g["domain_name"] == "ALL" or g["domain_name"] == "general"))
+    num_genes = len(combined["nodes"])
+    num_domains = len(result) - 1  # Exclude the combined graph
+
+    if layout:
+        # Track order, node tracks and link endpoints for the diagram; saved along with the graph
+        from parsing.graph_utils import add_layout
+        add_layout(result)
+
+    # Stage the result so /save can promote it by id instead of the client posting it back
+    with stage('stage_result') as s:
+        payload = json.dumps(result).encode('utf-8')
+        s.set(bytes=len(payload))
+        result_id = _stage(payload, owner)
+    response = {
+        "message": "Graph(s) generated successfully",
+        "graphs": result,
+        "result_id": result_id,
+        "num_genes": num_genes,
+        "num_domains": num_domains,
+        "is_domain_specific": is_domain_specific
+    }
+    if domain_state is not None:
+        # Per-domain intermediates, for /regenerate_domain
+        with stage('stage_domain_state'):
+            response["state_id"] = _stage(domain_state.to_bytes(), owner)
+    if timings is not None:
+        response["timings"] = timings.to_dict()
+    return jsonify(response), 200
 
-def generate_graph(coordinate_file, matrix_files, is_domain_specific):
+
+def _collect(include_timings, **context):
+    """
+    Stage timings are returned in the response when the client asks for them
+    (include_timings is True or 'memory', the latter adding tracemalloc deltas)
+    and logged as JSON when PIPELINE_TIMINGS is set.
+    """
+    return collect_timings(
+        enabled=bool(include_timings) or timings_enabled_by_default(),
+        trace_memory=include_timings == 'memory',
+        **context
+    )
+
+
+def generate_graph(coordinate_file, matrix_files, is_domain_specific, include_timings=False, genome_pairs=None,
+                   domain_coordinate_file=None, layout=None, owner=None, keep_state=False):
+    """
+    Parse the uploads into graph(s) and stage the result for /save.
+
+    owner is the signed-in user's id, if any; staged results are bound to it.
+    keep_state also stages a domain-specific project's per-domain intermediates
+    (returned as state_id) for /regenerate_domain and /save.
+    """
     if not coordinate_file or not matrix_files:
         return jsonify({"error": "Coordinate file and at least one matrix file are required"}), 400
+    if genome_pairs and is_domain_specific:
+        return jsonify({"error": "genome_pairs is only supported for non-domain-specific graphs"}), 400
+    if domain_coordinate_file and not is_domain_specific:
+        return jsonify({"error": "A domain coordinate file is only used for domain-specific graphs"}), 400
     if is_domain_specific and len(matrix_files) > 3:
         return jsonify({"error": "A maximum of three matrix files are allowed for domain-specific graphs"}), 400
     if not is_domain_specific and len(matrix_files) != 1:
         return jsonify({"error": "Exactly one matrix file is required for non-domain-specific graphs"}), 400
 
+    # The parsing stack pulls in pandas/openpyxl, so import it on first use only
+    from parsing.general_parse import parse_matrix
+    from parsing.domain_parse import domain_parse
+    from parsing.block_links import parse_genome_pairs
+    from parsing.layout import layout_enabled_by_default
+    layout = layout_enabled_by_default() if layout is None else layout
+
     try:
-        if is_domain_specific:
-            # Create BytesIO objects with filenames for all files
-            matrix_ios = []
-            for matrix_file in matrix_files:
+        genome_pairs = parse_genome_pairs(genome_pairs)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        with _collect(include_timings, endpoint="generate_graph", is_domain_specific=is_domain_specific) as timings:
+            if is_domain_specific:
+                # Create BytesIO objects with filenames for all files
+                matrix_ios = []
+                for matrix_file in matrix_files:
+                    matrix_bytes = matrix_file.read()
+                    matrix_io = BytesIO(matrix_bytes)
+                    matrix_io.name = matrix_file.filename
+                    matrix_ios.append(matrix_io)
+
+                coordinate_bytes = coordinate_file.read()
+                coordinate_io = BytesIO(coordinate_bytes)
+                coordinate_io.name = coordinate_file.filename
+
+                domain_io = None
+                if domain_coordinate_file:
+                    domain_io = BytesIO(domain_coordinate_file.read())
+                    domain_io.name = domain_coordinate_file.filename
+
+                parsed = domain_parse(
+                    matrix_ios,
+                    coordinate_io,
+                    [m.filename for m in matrix_files],
+                    return_state=keep_state,
+                    domain_file=domain_io,
+                )
+                result, domain_state = parsed if keep_state else (parsed, None)
+                return _graph_response(result, is_domain_specific, domain_state, timings if include_timings else None,
+                                       layout, owner)
+            else:
+                matrix_file = matrix_files[0]
                 matrix_bytes = matrix_file.read()
+                coordinate_bytes = coordinate_file.read()
+                # Create BytesIO objects with filename attributes
                 matrix_io = BytesIO(matrix_bytes)
                 matrix_io.name = matrix_file.filename
-                matrix_ios.append(matrix_io)
+                coordinate_io = BytesIO(coordinate_bytes)
+                coordinate_io.name = coordinate_file.filename
+                graph = parse_matrix(matrix_io, coordinate_io, genome_pairs)
+                result = [{**graph, "domain_name": "general"}]
+
+            return _graph_response(result, is_domain_specific, timings=timings if include_timings else None,
+                                   layout=layout, owner=owner)
+
+    except Exception as e:
+        return jsonify({"error": f"Failed to generate graph: {str(e)}"}), 500
+
 
-            coordinate_bytes = coordinate_file.read()
-            coordinate_io = BytesIO(coordinate_bytes)
-            coordinate_io.name = coordinate_file.filename
 
-            result = domain_parse(
-                matrix_ios,
-                coordinate_io,
-                [m.filename for m in matrix_files],
-            )
+def regenerate_domain_graph(action, state_id=None, group_id=None, domain=None, matrix_file=None, include_timings=False,
+                            layout=None, owner=None):
+    """
+    Re-run a domain-specific project after swapping, adding or removing one domain matrix.
+
+    Uses the per-domain intermediates cached by /generate_graph (state_id) or
+    stored with one of owner's saved projects (group_id), so only the changed
+    domain is parsed.
+    """
+    if not state_id and not group_id:
+        return jsonify({"error": "Either state_id or group_id is required"}), 400
+    if action not in ("replace", "add", "remove"):
+        return jsonify({"error": "action must be one of replace, add or remove"}), 400
+    if action != "remove" and not matrix_file:
+        return jsonify({"error": f"A matrix file is required to {action} a domain"}), 400
+
+    from parsing.domain_parse import regenerate_domain
+    from parsing.domain_state import DomainState
+    from parsing.layout import layout_enabled_by_default
+    layout = layout_enabled_by_default() if layout is None else layout
+    from database.models import Group, File
+    from database.crud import get_first_or_none
+    from database import session_scope
+
+    try:
+        if state_id:
+            state_bytes = get_result_store().get(state_id, owner)
         else:
-            matrix_file = matrix_files[0]
-            matrix_bytes = matrix_file.read()
-            coordinate_bytes = coordinate_file.read()
-            # Create BytesIO objects with filename attributes
-            matrix_io = BytesIO(matrix_bytes)
+            try:
+                uuid.UUID(str(group_id))
+            except ValueError:
+                return jsonify({"error": "Project not found"}), 404
+            with session_scope() as session:
+                if not owner or not get_first_or_none(session, Group, id=group_id, user_id=owner):
+                    return jsonify({"error": "Project not found"}), 404
+                state_file = get_first_or_none(session, File, group_id=group_id, file_type="domain_state")
+                state_key = state_file.s3_key if state_file else None
+            if not state_key:
+                return jsonify({"error": "No cached domain results for this project; generate the graph from files instead"}), 409
+            state_bytes = get_file_bytes(state_key)
+        state = DomainState.from_bytes(state_bytes)
+
+        matrix_io = None
+        file_name = None
+        if matrix_file:
+            matrix_io = BytesIO(matrix_file.read())
             matrix_io.name = matrix_file.filename
-            coordinate_io = BytesIO(coordinate_bytes)
-            coordinate_io.name = coordinate_file.filename
-            graph = parse_matrix(matrix_io, coordinate_io)
-            result = [{**graph, "domain_name": "general"}]
-
-        combined = next(g for g in result if (g["domain_name"] == "ALL" or g["domain_name"] == "general"))
-        num_genes = len(combined["nodes"])
-        num_domains = len(result) - 1  # Exclude the combined graph
-
-        return jsonify({
-            "message": "Graph(s) generated successfully",
-            "graphs": result,
-            "num_genes": num_genes,
-            "num_domains": num_domains,
-            "is_domain_specific": is_domain_specific
-        }), 200
+            file_name = matrix_file.filename
 
+        if action == "add" and len(state.domains) >= 3:
+            return jsonify({"error": "A maximum of three matrix files are allowed for domain-specific graphs"}), 400
+
+        with _collect(include_timings, endpoint="regenerate_domain", action=action) as timings:
+            result, new_state = regenerate_domain(state, action, domain=domain, matrix_file=matrix_io, file_name=file_name)
+            return _graph_response(result, True, new_state, timings if include_timings else None, layout, owner)
+
+    except ResultExpiredError as e:
+        return jsonify({"error": str(e)}), 410
     except Exception as e:
-        return jsonify({"error": f"Failed to generate graph: {str(e)}"}), 500
+        return jsonify({"error": f"Failed to regenerate graph: {str(e)}"}), 500
+
+
+def _load_graph_result(user_id, group_id=None, result_id=None):
+    """
+    A staged result's or one of the user's saved projects' graph list; None if the
+    project doesn't exist, belongs to another user or has no stored graph.
+    """
+    from parsing.graph_diff import load_result
+    if result_id:
+        return load_result(get_result_store().get(result_id, user_id))
+
+    from database.models import Group, File
+    from database.crud import get_first_or_none
+    from database import session_scope
+    try:
+        uuid.UUID(str(group_id))
+    except ValueError:
+        return None
+    with session_scope() as session:
+        group = get_first_or_none(session, Group, id=group_id, user_id=user_id)
+        graph_file = get_first_or_none(session, File, group_id=group_id, file_type="graph") if group else None
+        graph_key = graph_file.s3_key if graph_file else None
+    if not graph_key:
+        return None
+    return load_result(get_file_bytes(graph_key))
+
+
+def diff_graphs(user_id, base_group_id=None, compare_group_id=None, base_result_id=None, compare_result_id=None,
+                score_tolerance=None):
+    """
+    Stream the differences between two graph results.
+
+    Each side is one of the user's saved projects (group id) or a result they
+    staged with /generate_graph or /regenerate_domain (result id), e.g. the same
+    data at two cutoffs. The response is the parsing.graph_diff document, streamed as it is built.
+    """
+    if not (base_group_id or base_result_id) or not (compare_group_id or compare_result_id):
+        return jsonify({"error": "A base and a compare graph are required (group id or result id for each)"}), 400
+    try:
+        score_tolerance = float(score_tolerance) if score_tolerance not in (None, "") else 0.0
+    except ValueError:
+        return jsonify({"error": "score_tolerance must be a number"}), 400
+
+    from parsing.graph_diff import iter_diff_json
+
+    try:
+        base = _load_graph_result(user_id, base_group_id, base_result_id)
+        compare = _load_graph_result(user_id, compare_group_id, compare_result_id)
+        if base is None or compare is None:
+            return jsonify({"error": "Project or graph file not found"}), 404
+    except ResultExpiredError as e:
+        return jsonify({"error": str(e)}), 410
+    except Exception as e:
+        return jsonify({"error": f"Failed to load graphs: {str(e)}"}), 500
 
+    return Response(iter_diff_json(base, compare, score_tolerance), status=200, mimetype='application/json')
 
 
 def download(s3_key):
@@ -1,4 +1,6 @@
 from flask import jsonify
+from flask import Response
+from flask import current_app
 import json
 from io import BytesIO
 from datetime import datetime
@@ -8,7 +10,14 @@ from database.models import Base, User, Group, File
 from services.s3_service import upload_to_s3
 from services.s3_service import delete_from_s3
 from services.s3_service import get_file_url
-from services.s3_service import get_file
+from services.s3_service import get_file_bytes
+from services.s3_service import open_object
+from services.s3_service import upload_bytes
+from services.s3_service import delete_key
+from services.result_store import get_result_store
+from services.result_store import ResultExpiredError
+from services import compression
+from services.gene_index import extract_genes, index_group, clear_group, search_genes, DEFAULT_SEARCH_LIMIT
 from database.crud import create_group
 from database.crud import add_file
 from database.crud import get_first_or_none
@@ -18,7 +27,20 @@ from database import session_scope
 
 
 
-def get_group_graph(group_id):
+def _splice_graph_response(payload, graph_bytes):
+    """
+    Build the JSON response body around already-serialized graph JSON.
+
+    The stored graph is inserted as raw bytes so it doesn't go through a
+    json.loads/jsonify round trip on every load.
+    """
+    rest = json.dumps(payload).encode('utf-8')
+    if rest == b'{}':
+        return b'{"graphs": ' + graph_bytes + b'}'
+    return b'{"graphs": ' + graph_bytes + b', ' + rest[1:]
+
+
+def get_group_graph(group_id, include_graph=True):
     if not group_id:
         return jsonify({"error": "Missing groupId parameter"}), 400
 
@@ -51,21 +73,21 @@ def get_group_graph(group_id):
             if not (matrix_files and coordinate_file and graph_s3_key):
                 return jsonify({"error": "Matrix/coordinate/graph file not found for this project"}), 400
 
-            graph_str = get_file(graph_s3_key)
-
-            # Parse graph JSON
-            graph = json.loads(graph_str)
-
-            return jsonify({
+            payload = {
                 "message": "Graph generated successfully",
                 "title": group.title,
                 "description": group.description,
-                "graphs": graph,
                 "num_genes": group.num_genes,
                 "num_domains": group.num_domains,
                 "matrix_files": matrix_files,  # Include presigned URLs and original filenames for matrix files
                 "coordinate_file": coordinate_file  # Include presigned URL and original filename for coordinate file
-            }), 200
+            }
+            if not include_graph:
+                # Graph itself is fetched from /get_group_graph_data
+                return jsonify(payload), 200
+
+            graph_bytes = get_file_bytes(graph_s3_key)
+            return Response(_splice_graph_response(payload, graph_bytes), status=200, mimetype='application/json')
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -73,6 +95,41 @@ def get_group_graph(group_id):
 
 
 
+def get_group_graph_data(group_id, accept_encoding=None):
+    """
+    Stream a project's stored graph JSON.
+
+    When the client accepts the encoding the graph was stored with, the stored
+    bytes are passed straight through with a matching Content-Encoding header;
+    otherwise they are decompressed on the fly.
+    """
+    if not group_id:
+        return jsonify({"error": "Missing groupId parameter"}), 400
+
+    try:
+        with session_scope() as session:
+            graph_file = get_first_or_none(session, File, group_id=group_id, file_type="graph")
+            if not graph_file:
+                return jsonify({"error": "Graph file not found for this project"}), 404
+            graph_s3_key = graph_file.s3_key
+
+        chunks, content_encoding, content_length = open_object(graph_s3_key)
+        headers = {"Vary": "Accept-Encoding"}
+        if compression.normalize_encoding(content_encoding) == compression.IDENTITY or \
+                compression.accepts_encoding(accept_encoding, content_encoding):
+            if content_encoding:
+                headers["Content-Encoding"] = content_encoding
+            if content_length is not None:
+                headers["Content-Length"] = str(content_length)
+            body = chunks
+        else:
+            body = compression.decompress_stream(chunks, content_encoding)
+        return Response(body, status=200, mimetype='application/json', headers=headers)
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
 def get_user_file_groups(user_id):
 
     try:
@@ -111,6 +168,27 @@ def get_user_file_groups(user_id):
 
 
 
+def search_user_genes(user_id, query, limit=None):
+    if not query:
+        return jsonify({"error": "Missing q parameter"}), 400
+    try:
+        limit = int(limit) if limit else DEFAULT_SEARCH_LIMIT
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+
+    try:
+        with session_scope() as session:
+            user = get_first_or_none(session, User, id=user_id)
+            if not user:
+                return jsonify({"error": "User not found"}), 404
+            found = search_genes(session, user.id, query, limit)
+            return jsonify({"query": query, **found}), 200
+
+    except Exception as e:
+        return jsonify({"error": f"Failed to search genes: {str(e)}"}), 500
+
+
+
 def delete_group(user_id, group_id):
 
     try:
@@ -138,7 +216,8 @@ def delete_group(user_id, group_id):
             for file in files:
                 delete(session, file)
 
-            # Delete the group
+            # Delete the group and its gene index rows
+            clear_group(session, group.id)
             delete(session, group)
 
             return jsonify({"message": "Project and associated files deleted successfully"}), 200
@@ -150,8 +229,22 @@ def delete_group(user_id, group_id):
 
 
 
-def save_group(user_id, title, description, coordinate_file, matrix_files, is_domain_specific, genomes, num_genes, num_domains, graph_data, group_id=None):
+def _graph_encoding(compress):
+    """Pick the storage encoding for a saved graph; compress=None means use the configured default."""
+    if compress is False:
+        return compression.IDENTITY
+    encoding = compression.default_graph_encoding()
+    if compress and encoding == compression.IDENTITY:
+        return compression.GZIP
+    return encoding
+
 
+def save_group(user_id, title, description, coordinate_file, matrix_files, is_domain_specific, genomes, num_genes, num_domains, graph_data, group_id=None, result_id=None, compress=None, state_id=None):
+
+    # Staged results stay in the store until the project's rows have committed, so a failed save
+    # can be retried with the same ids; the copies promoted for a failed save are removed
+    promoted_keys = []
+    promoted_ids = []
     try:
         with session_scope() as session:
             user = get_first_or_none(session, User, id=user_id)
@@ -171,6 +264,8 @@ def save_group(user_id, title, description, coordinate_file, matrix_files, is_do
             # Handle new group creation
             if not coordinate_file or not matrix_files:
                 return jsonify({"error": "Coordinate file and at least one matrix file are required for new projects"}), 400
+            if not result_id and not graph_data:
+                return jsonify({"error": "Either a result_id from /generate_graph or the graph data is required for new projects"}), 400
             print("Coordinate file:", coordinate_file)
             print("Matrix files:", matrix_files)
 
@@ -178,24 +273,72 @@ def save_group(user_id, title, description, coordinate_file, matrix_files, is_do
             new_group = create_group(session, user.id, title, description, is_domain_specific, genomes, num_genes, num_domains)
             group_id = new_group.id
 
+            # Store the graph first: promoting a staged result can fail if it has expired
+            encoding = _graph_encoding(compress)
+            if result_id:
+                graph_s3_key, graph_filename, graph_source = get_result_store().promote(
+                    result_id, encoding, user_id, return_data=True, delete_staged=False)
+                promoted_keys.append(graph_s3_key)
+                promoted_ids.append(result_id)
+            else:
+                graph_source = graph_data
+                graph_bytes = compression.compress(graph_data.encode('utf-8'), encoding)
+                content_encoding = None if encoding == compression.IDENTITY else encoding
+                graph_s3_key = upload_bytes(graph_bytes, "json", content_encoding=content_encoding)
+                timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+                graph_filename = f"graph_{timestamp}.json"
+
             # Upload files to S3
             coordinate_s3_key, coordinate_filename = upload_to_s3(coordinate_file)
-            graph_file = BytesIO(graph_data.encode('utf-8'))
-            timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-            graph_file.filename = f"graph_{timestamp}.json"
-            graph_s3_key, graph_filename = upload_to_s3(graph_file)
 
             # Insert coordinate and graph file records into database
             add_file(session, group_id, user.id, coordinate_filename, coordinate_s3_key, "coordinate")
             add_file(session, group_id, user.id, graph_filename, graph_s3_key, "graph")
 
+            # Index the project's genes for /search_genes. A failure doesn't fail the save: the
+            # savepoint is rolled back and the project, left without index rows, is picked up by
+            # the next `python -m services.gene_index` backfill
+            try:
+                with session.begin_nested():
+                    index_group(session, group_id, user.id, extract_genes(graph_source))
+            except Exception:
+                current_app.logger.exception("Gene indexing failed for project %s; run the gene index backfill", group_id)
+
+
+            # Keep the per-domain intermediates so the project can be regenerated incrementally
+            if state_id and is_domain_specific:
+                try:
+                    state_s3_key, state_filename = get_result_store().promote(state_id, encoding, user_id,
+                                                                              delete_staged=False)
+                    promoted_keys.append(state_s3_key)
+                    promoted_ids.append(state_id)
+                    add_file(session, group_id, user.id, state_filename.replace("graph_", "domain_state_"), state_s3_key, "domain_state")
+                except ResultExpiredError:
+                    current_app.logger.warning("Domain state %s expired before save; project %s will need a full "
+                                               "rebuild to regenerate", state_id, group_id)
 
             # Insert matrix file records into database
             for matrix_file in matrix_files:
                 matrix_s3_key, matrix_filename = upload_to_s3(matrix_file)
                 add_file(session, group_id, user.id, matrix_filename, matrix_s3_key, "matrix")
 
-            return jsonify({"message": "Files and project saved successfully", "group_id": group_id}), 200
-
+    except ResultExpiredError as e:
+        _delete_promoted(promoted_keys)
+        return jsonify({"error": str(e)}), 410
     except Exception as e:
+        _delete_promoted(promoted_keys)
         return jsonify({"error": f"Failed to save files: {str(e)}"}), 500
+
+    # Committed: the staged copies are no longer needed
+    for staged_id in promoted_ids:
+        get_result_store().delete(staged_id)
+    return jsonify({"message": "Files and project saved successfully", "group_id": group_id}), 200
+
+
+def _delete_promoted(s3_keys):
+    """Remove graphs promoted for a save that then failed (best effort; the save's error is what gets reported)."""
+    for s3_key in s3_keys:
+        try:
+            delete_key(s3_key)
+        except Exception:
+            current_app.logger.exception("Could not delete %s after a failed save", s3_key)
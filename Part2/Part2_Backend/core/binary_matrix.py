@@ -0,0 +1,255 @@
+"""
+Binary score-matrix container (.pmx).
+
+Layout:
+    bytes 0-3     magic b'PMX1'
+    bytes 4-11    header length (little-endian uint64)
+    header        UTF-8 JSON: version, dtype, shape, row/column label tables,
+                  optional genome block offsets, body offset
+    padding       up to a 64-byte boundary
+    body          rows x cols values in row-major order (float32 by default)
+
+The body is opened with np.memmap (or np.frombuffer for in-memory uploads),
+so opening a file costs only the header parse. When the converter is given a
+coordinate file, rows and columns are grouped by genome and their block
+offsets recorded; block() and to_frame(keep=...) then slice whole blocks and
+only those pages are read. Uploads go through parsing.io_utils.read_file like
+any other matrix, and empty-row removal and the cutoff scan every score, so
+the pipeline does read the whole body; the saving there is skipping the text
+parse.
+
+Convert an existing matrix:
+    python -m core.binary_matrix matrix.xlsx matrix.pmx --coords coords.xlsx
+"""
+import json
+import os
+import struct
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+MAGIC = b'PMX1'
+EXTENSION = '.pmx'
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+_LENGTH = struct.Struct('<Q')
+
+
+def is_binary_matrix(filename: str) -> bool:
+    return bool(filename) and filename.lower().endswith(EXTENSION)
+
+
+def _genome_blocks(labels: List[str], genomes: Dict[str, str]) -> Tuple[List[int], Dict[str, List[int]]]:
+    """Stable order grouping labels by genome (first-appearance order), and each genome's [start, stop)."""
+    groups: Dict[str, List[int]] = {}
+    for i, label in enumerate(labels):
+        groups.setdefault(genomes.get(label), []).append(i)
+    order = []
+    blocks = {}
+    for genome, positions in groups.items():
+        if genome is not None:
+            blocks[genome] = [len(order), len(order) + len(positions)]
+        order.extend(positions)
+    return order, blocks
+
+
+def write_binary_matrix(df: pd.DataFrame, path: str, dtype: str = 'float32',
+                        genomes: Optional[Dict[str, str]] = None) -> None:
+    """
+    Write a matrix DataFrame (row labels as index) as a .pmx file.
+
+    Args:
+        df: Numeric matrix with gene names as index and columns
+        path: Output path
+        dtype: 'float32' (default) or 'float64'
+        genomes: Optional gene name -> genome mapping; rows and columns are
+            grouped by genome and block offsets recorded
+    """
+    rows = [str(label) for label in df.index]
+    columns = [str(label) for label in df.columns]
+    values = df.to_numpy(dtype=dtype)
+    header = {"version": FORMAT_VERSION, "dtype": np.dtype(dtype).newbyteorder('<').str}
+
+    if genomes:
+        row_order, header["row_blocks"] = _genome_blocks(rows, genomes)
+        col_order, header["col_blocks"] = _genome_blocks(columns, genomes)
+        values = values[np.ix_(row_order, col_order)]
+        rows = [rows[i] for i in row_order]
+        columns = [columns[i] for i in col_order]
+
+    header.update(shape=list(values.shape), rows=rows, columns=columns)
+    # body_offset depends on the header length, which depends on body_offset's digits
+    header["body_offset"] = 0
+    while True:
+        encoded = json.dumps(header).encode('utf-8')
+        start = len(MAGIC) + _LENGTH.size + len(encoded)
+        offset = -(-start // ALIGNMENT) * ALIGNMENT
+        if header["body_offset"] == offset:
+            break
+        header["body_offset"] = offset
+
+    with open(path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(_LENGTH.pack(len(encoded)))
+        f.write(encoded)
+        f.write(b'\0' * (offset - start))
+        f.write(np.ascontiguousarray(values, dtype=header["dtype"]).tobytes())
+
+
+class BinaryMatrix:
+    """A .pmx matrix opened without reading its body."""
+
+    def __init__(self, header: Dict, values: np.ndarray):
+        self.header = header
+        self.values = values
+        self.rows: List[str] = header["rows"]
+        self.columns: List[str] = header["columns"]
+        self.row_blocks: Dict[str, List[int]] = header.get("row_blocks", {})
+        self.col_blocks: Dict[str, List[int]] = header.get("col_blocks", {})
+
+    @classmethod
+    def open(cls, file) -> 'BinaryMatrix':
+        """
+        Open a .pmx file from a path or file object.
+
+        Files on disk are memory-mapped; in-memory uploads are wrapped with
+        np.frombuffer. Either way the body is not copied.
+        """
+        path = file if isinstance(file, (str, os.PathLike)) else None
+        if path is None and not hasattr(file, 'getbuffer') and hasattr(file, 'fileno'):
+            # An open file on disk (BytesIO uploads also carry a name, but no file behind it)
+            name = getattr(file, 'name', None)
+            path = name if isinstance(name, str) and os.path.isfile(name) else None
+        if path is not None:
+            with open(path, 'rb') as f:
+                header = cls._read_header(f.read(len(MAGIC) + _LENGTH.size), f)
+            values = np.memmap(path, dtype=header["dtype"], mode='r', offset=header["body_offset"],
+                               shape=tuple(header["shape"]))
+            return cls(header, values)
+
+        if hasattr(file, 'getbuffer'):
+            buffer = file.getbuffer()
+        else:
+            file.seek(0)
+            buffer = memoryview(file.read())
+        header = cls._read_header(bytes(buffer[:len(MAGIC) + _LENGTH.size]), buffer=buffer)
+        count = int(np.prod(header["shape"]))
+        values = np.frombuffer(buffer, dtype=header["dtype"], count=count,
+                               offset=header["body_offset"]).reshape(header["shape"])
+        return cls(header, values)
+
+    @staticmethod
+    def _read_header(prefix: bytes, f=None, buffer=None) -> Dict:
+        if len(prefix) < len(MAGIC) + _LENGTH.size or prefix[:len(MAGIC)] != MAGIC:
+            raise ValueError("Not a .pmx matrix file (bad magic number)")
+        (length,) = _LENGTH.unpack(prefix[len(MAGIC):])
+        start = len(MAGIC) + _LENGTH.size
+        raw = f.read(length) if f is not None else bytes(buffer[start:start + length])
+        header = json.loads(raw)
+        if header.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported .pmx version {header.get('version')}")
+        return header
+
+    def block(self, row_genome: str, col_genome: str) -> np.ndarray:
+        """Zero-copy view of the scores between two genomes (needs a file converted with --coords)."""
+        if row_genome not in self.row_blocks or col_genome not in self.col_blocks:
+            raise KeyError(f"No genome block for {row_genome!r} x {col_genome!r}")
+        row_start, row_stop = self.row_blocks[row_genome]
+        col_start, col_stop = self.col_blocks[col_genome]
+        return self.values[row_start:row_stop, col_start:col_stop]
+
+    @staticmethod
+    def _positions(labels: List[str], keep: Optional[set]):
+        """Index (a slice when possible) of the labels in keep, in file order."""
+        if keep is None:
+            return slice(None)
+        positions = np.fromiter((i for i, label in enumerate(labels) if label in keep), dtype=np.int64)
+        if len(positions) and positions[-1] - positions[0] + 1 == len(positions):
+            # Contiguous (e.g. a run of whole genome blocks): a zero-copy view
+            return slice(int(positions[0]), int(positions[-1]) + 1)
+        return positions
+
+    def to_frame(self, keep: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """
+        The matrix as a DataFrame indexed by row label.
+
+        Args:
+            keep: Optional gene names; rows and columns not in it are left out
+                (and their pages never touched)
+        """
+        keep = set(keep) if keep is not None else None
+        row_index = self._positions(self.rows, keep)
+        col_index = self._positions(self.columns, keep)
+        if isinstance(row_index, slice) and isinstance(col_index, slice):
+            values = self.values[row_index, col_index]
+        else:
+            values = self.values[np.ix_(np.arange(len(self.rows))[row_index], np.arange(len(self.columns))[col_index])]
+        rows = self.rows[row_index] if isinstance(row_index, slice) else [self.rows[i] for i in row_index]
+        columns = self.columns[col_index] if isinstance(col_index, slice) else [self.columns[i] for i in col_index]
+        return pd.DataFrame(values, index=pd.Index(rows), columns=pd.Index(columns), copy=False)
+
+
+def convert_to_binary(matrix_path: str, output_path: str, coords_path: Optional[str] = None,
+                      dtype: str = 'float32') -> Dict:
+    """
+    Convert a matrix accepted by read_file (xlsx/csv/tsv) to .pmx.
+
+    The matrix goes through the same load/validate/whitespace cleaning as an
+    upload (but not the cutoff, so any cutoff can be applied later).
+
+    Returns:
+        Summary dict (shape, genomes, sizes)
+    """
+    from core.config import FileProcessingConfig
+    from core.matrix_file import MatrixFile
+    from parsing.dataframe_utils import clean_dataframe_whitespace
+
+    config = FileProcessingConfig()
+    with open(matrix_path, 'rb') as f:
+        matrix_file = MatrixFile(f, config)
+        matrix_file.load_data()
+        if not matrix_file.validate():
+            raise ValueError(f"Matrix file validation failed: {', '.join(matrix_file.validation_errors)}")
+        df = clean_dataframe_whitespace(matrix_file.data.copy())
+
+    genomes = None
+    if coords_path:
+        from core.coordinate_file import CoordinateFile
+        with open(coords_path, 'rb') as f:
+            coord_file = CoordinateFile(f, config)
+            coord_file.load_data()
+            if not coord_file.validate():
+                raise ValueError(f"Coordinate file validation failed: {', '.join(coord_file.validation_errors)}")
+            coords = coord_file.clean()
+        genomes = dict(zip(coords['name'].astype(str), coords['genome']))
+
+    write_binary_matrix(df, output_path, dtype=dtype, genomes=genomes)
+    opened = BinaryMatrix.open(output_path)
+    return {
+        "shape": list(opened.values.shape),
+        "dtype": opened.header["dtype"],
+        "genome_blocks": sorted(opened.row_blocks),
+        "input_bytes": os.path.getsize(matrix_path),
+        "output_bytes": os.path.getsize(output_path),
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description='Convert a score matrix (xlsx/csv/tsv) to the binary .pmx format')
+    parser.add_argument('matrix_file', type=str, help='Path to the matrix file')
+    parser.add_argument('output', type=str, help='Output .pmx path')
+    parser.add_argument('--coords', type=str, help='Coordinate file; groups rows/columns into genome blocks')
+    parser.add_argument('--dtype', choices=['float32', 'float64'], default='float32')
+
+    args = parser.parse_args()
+
+    try:
+        summary = convert_to_binary(args.matrix_file, args.output, args.coords, args.dtype)
+        print(json.dumps(summary, indent=2))
+    except Exception as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        sys.exit(1)
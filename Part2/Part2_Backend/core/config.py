@@ -1,5 +1,5 @@
 from dataclasses import dataclass, field
-from typing import Dict, List
+from typing import Dict, List, Optional
 from core.file_structures import CoordinateFileStructure, MatrixFileStructure
 
 @dataclass
@@ -7,9 +7,26 @@ class FileProcessingConfig:
     """Configuration for file processing operations."""
     # File reading settings
     supported_formats: Dict[str, List[str]] = field(default_factory=lambda: {
-        'matrix': ['.xlsx', '.csv', '.tsv'],
+        'matrix': ['.xlsx', '.csv', '.tsv', '.pmx'],
         'coordinate': ['.xlsx', '.csv', '.tsv']
     })
+    # CSV/TSV ingest settings
+    csv_engine: str = "c"  # "c", "pyarrow" (multithreaded, needs pyarrow) or "auto" (pyarrow when installed)
+    matrix_float_dtype: str = "float64"  # "float32" halves matrix memory at the cost of precision
+    typed_ingest: bool = True  # Read CSV/TSV with explicit dtypes instead of inferring them
+    # Chunked matrix processing (CSV/TSV only); None disables it
+    chunked_min_bytes: Optional[int] = None
+    chunk_memory_mb: int = 64  # Target size of one block of matrix rows
+    # Link computation: "blocks" (per genome-pair block on a thread pool) or "dataframe" (row/column max frames)
+    link_engine: str = "blocks"
+    link_workers: Optional[int] = None  # Thread pool size for the block engine; None uses the executor default
+    # Synteny blocks: chains of reciprocal links between genome pairs, returned as the graph's "blocks"
+    synteny_blocks: bool = True
+    synteny_max_gap: int = 5  # Genes that may be skipped between consecutive anchors
+    synteny_min_anchors: int = 3  # Smallest chain reported as a block
+    synteny_strand_match: bool = True  # Collinear blocks take same-strand anchors, inverted blocks opposite-strand ones
+    # xlsx ingest: "openpyxl" (pd.read_excel), "stream" (openpyxl read-only rows), "calamine" or "auto"
+    xlsx_reader: str = "auto"
     # Data cleaning settings
     clean_whitespace: bool = True
     normalize_orientations: bool = True
@@ -6,24 +6,33 @@ from core.config import FileProcessingConfig
 from core.enums import OrientationType
 from core.domain_types import DomainColumn
 from core.domain_processor import DomainProcessor
-from parsing.io_utils import read_file
+from core.coordinate_index import relative_positions, inverted_domain_intervals
+from parsing.io_utils import read_file, read_domain_coordinates
 from parsing.dataframe_utils import clean_dataframe_whitespace, parse_comma_separated_number
 
 
 class CoordinateFile(DataFile):
     """Represents a coordinate file with validation and processing."""
     
-    def __init__(self, file_object: Union[BinaryIO, BytesIO], config: FileProcessingConfig, filename: str = None):
+    def __init__(self, file_object: Union[BinaryIO, BytesIO], config: FileProcessingConfig, filename: str = None,
+                 domain_file: Union[BinaryIO, BytesIO] = None):
         super().__init__(file_object, 'coordinate', config, filename)
         self.structure = config.coordinate_structure
         self.domain_columns: List[DomainColumn] = []
+        # Optional long-format (protein, start, end, domain) file, e.g. Part1's combine_coords.py output
+        self.domain_file = domain_file
     
     def load_data(self) -> pd.DataFrame:
-        """Load coordinate data from file object."""
+        """Load coordinate data from file object, adding the domain columns from the domain file if given."""
         
         # Reset file pointer to beginning
         self.file_object.seek(0)
-        self.data = read_file(self.file_object, 'coordinate')
+        self.data = read_file(self.file_object, 'coordinate', self.config, self.filename)
+        if self.domain_file is not None:
+            self.domain_file.seek(0)
+            hits = read_domain_coordinates(self.domain_file)
+            self.data, warnings = DomainProcessor().pivot_domain_coordinates(self.data, hits)
+            self.processing_warnings.extend(warnings)
         return self.data
     
     def validate(self) -> bool:
@@ -43,6 +52,7 @@ class CoordinateFile(DataFile):
                 domain_names, domain_col_names = processor.process_domain_field(self.data)
                 # Store domain columns for later use
                 self.domain_columns = processor._extract_domain_columns(self.data)
+                self.processing_warnings.extend(inverted_domain_intervals(self.data))
             except ValueError as e:
                 self.validation_errors.append(str(e))
         
@@ -110,7 +120,7 @@ class CoordinateFile(DataFile):
         
         # Clean whitespace
         if self.config.clean_whitespace:
-            cleaned_data = clean_dataframe_whitespace(cleaned_data)
+            cleaned_data = clean_dataframe_whitespace(cleaned_data, self.structure.get_string_columns())
         
         # Normalize orientations
         if self.config.normalize_orientations and 'orientation' in cleaned_data.columns:
@@ -122,7 +132,7 @@ class CoordinateFile(DataFile):
         
         # Calculate relative positions
         if 'position' in cleaned_data.columns and 'genome' in cleaned_data.columns:
-            cleaned_data['rel_position'] = cleaned_data.groupby('genome')['position'].rank(method='first').astype(int)
+            cleaned_data['rel_position'] = relative_positions(cleaned_data['genome'], cleaned_data['position'])
         
         return cleaned_data
     
@@ -162,8 +172,12 @@ class CoordinateFile(DataFile):
         # Import here to avoid circular import
         domain_columns = [col for col in cleaned_data.columns if 'domain' in col]
         if domain_columns:
-            processor = DomainProcessor()
-            domain_names, domain_col_names = processor.process_domain_field(cleaned_data)
+            if self.domain_columns:
+                # validate() already processed the domain fields
+                domain_col_names = [dc.name for dc in self.domain_columns]
+            else:
+                processor = DomainProcessor()
+                domain_names, domain_col_names = processor.process_domain_field(cleaned_data)
             required_columns = ['name', 'genome', 'protein_name', 'position', 'rel_position', 'orientation', 'gene_type'] + domain_col_names
             if not all(col in cleaned_data.columns for col in required_columns):
                 raise ValueError("Missing one or more required columns after processing")
@@ -0,0 +1,197 @@
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from core.gene_registry import GeneRegistry, cached_per_frame
+
+
+def relative_positions(genomes: pd.Series, positions: pd.Series) -> np.ndarray:
+    """
+    1-based rank of each gene's position within its genome (ties in file order).
+
+    Same result as groupby('genome')['position'].rank(method='first'), from a
+    single lexsort.
+    """
+    codes, _ = pd.factorize(genomes)
+    values = pd.to_numeric(positions).to_numpy(dtype=np.float64)
+    order = np.lexsort((np.arange(len(values)), values, codes))
+    sorted_codes = codes[order]
+    # Start of each genome's run in the sorted order
+    starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+    run_start = np.repeat(starts, np.diff(np.r_[starts, len(order)]))
+    ranks = np.empty(len(order), dtype=np.int64)
+    ranks[order] = np.arange(len(order)) - run_start + 1
+    return ranks
+
+
+@dataclass
+class DomainIntervals:
+    """Start/end per gene (NaN where the gene has no interval) for one domain."""
+    domain: str
+    start_column: str
+    end_column: str
+    start: np.ndarray
+    end: np.ndarray
+
+    @property
+    def has_interval(self) -> np.ndarray:
+        return ~(np.isnan(self.start) | np.isnan(self.end))
+
+
+def domain_interval_columns(columns: Iterable[str]) -> Dict[str, tuple]:
+    """{domain name: (start column, end column)} for the domain start/end column pairs in a frame."""
+    from core.domain_types import DomainColumn
+
+    found: Dict[str, Dict[str, str]] = {}
+    for column in columns:
+        if 'domain' not in str(column).lower():
+            continue
+        try:
+            domain_column = DomainColumn.from_column_name(column)
+        except ValueError:
+            continue
+        if domain_column.column_type in ('start', 'end'):
+            found.setdefault(domain_column.domain_name, {})[domain_column.column_type] = column
+    return {domain: (cols['start'], cols['end']) for domain, cols in found.items() if len(cols) == 2}
+
+
+def inverted_domain_intervals(df: pd.DataFrame) -> List[str]:
+    """
+    Warnings for genes whose domain start is not before its end. CoordinateIndex
+    treats those intervals as missing; the node fields keep the file's values.
+    """
+    warnings = []
+    for domain, (start_column, end_column) in domain_interval_columns(df.columns).items():
+        start = pd.to_numeric(df[start_column], errors='coerce')
+        end = pd.to_numeric(df[end_column], errors='coerce')
+        bad = start.notna() & end.notna() & (start >= end)
+        if bad.any():
+            names = df.loc[bad, 'name'].astype(str).tolist() if 'name' in df.columns else []
+            warnings.append(f"Domain {domain} has start >= end for {int(bad.sum())} genes (treated as having "
+                            f"no {domain} interval): " + ", ".join(names[:10]))
+    return warnings
+
+
+class CoordinateIndex:
+    """
+    Positional index over a cleaned coordinate frame, built once and shared.
+
+    Holds each genome's genes sorted by position, the rel_position array and
+    one DomainIntervals per domain, plus the node columns add_nodes needs, so
+    graph builders and positional queries (windows, neighbours, synteny)
+    don't re-derive any of it from the frame.
+    """
+
+    _cache: Dict[int, Tuple[tuple, 'CoordinateIndex']] = {}
+
+    def __init__(self, coords: pd.DataFrame):
+        self.registry = GeneRegistry.of(coords)
+        self.columns = list(coords.columns)
+        self.names: List[Any] = coords['name'].tolist()
+        self.genome_ids = self.registry.genome_ids
+        self.genome_names = self.registry.genome_names
+        self.positions = pd.to_numeric(coords['position']).to_numpy(dtype=np.float64)
+        if 'rel_position' in coords.columns:
+            self.rel_position = coords['rel_position'].to_numpy(dtype=np.int64)
+        else:
+            self.rel_position = relative_positions(coords['genome'], coords['position'])
+        # Normalized strand per gene ("plus"/"minus"), None without an orientation column
+        self.orientations = (np.asarray(coords['orientation'].tolist(), dtype=object)
+                             if 'orientation' in coords.columns else None)
+
+        # Rows of each genome in position order
+        order = np.lexsort((np.arange(len(self.positions)), self.positions, self.genome_ids))
+        sorted_ids = self.genome_ids[order]
+        self.genome_rows: Dict[Any, np.ndarray] = {
+            genome: order[sorted_ids == code] for code, genome in enumerate(self.genome_names)
+        }
+
+        self.domains: Dict[str, DomainIntervals] = {}
+        for domain, (start_column, end_column) in domain_interval_columns(self.columns).items():
+            start = pd.to_numeric(coords[start_column], errors='coerce').to_numpy(dtype=np.float64)
+            end = pd.to_numeric(coords[end_column], errors='coerce').to_numpy(dtype=np.float64)
+            # Inverted intervals (reported by inverted_domain_intervals) count as missing
+            inverted = start >= end
+            start, end = np.where(inverted, np.nan, start), np.where(inverted, np.nan, end)
+            self.domains[domain] = DomainIntervals(domain, start_column, end_column, start, end)
+
+        # Node fields, as Python values
+        self._node_columns = {
+            column: coords[column].tolist()
+            for column in ('genome', 'protein_name', 'orientation', 'gene_type') if column in coords.columns
+        }
+        # add_nodes copies every *domain*_start/_end column, NaN as None
+        self._domain_node_columns = {
+            column: [None if pd.isna(value) else value for value in coords[column].tolist()]
+            for column in self.columns
+            if 'domain' in column and (column.endswith('_start') or column.endswith('_end'))
+        }
+
+    @classmethod
+    def of(cls, coords: pd.DataFrame) -> 'CoordinateIndex':
+        """The index for a cleaned coordinate frame, built on first use and shared after (see cached_per_frame)."""
+        return cached_per_frame(cls._cache, coords, cls)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def genome_order(self, genome) -> List[Any]:
+        """Gene names of a genome in position order."""
+        return [self.names[row] for row in self.genome_rows.get(genome, ())]
+
+    def window(self, genome, start: float, end: float) -> List[Any]:
+        """Gene names of a genome with start <= position <= end, in position order."""
+        rows = self.genome_rows.get(genome)
+        if rows is None:
+            return []
+        positions = self.positions[rows]
+        lo, hi = np.searchsorted(positions, start, side='left'), np.searchsorted(positions, end, side='right')
+        return [self.names[row] for row in rows[lo:hi]]
+
+    def neighbours(self, name, distance: int = 1) -> List[Any]:
+        """Genes within ``distance`` places of a gene on its genome (excluding the gene itself)."""
+        row = self.registry.index.get(name)
+        if row is None or self.genome_ids[row] < 0:
+            return []
+        rows = self.genome_rows[self.genome_names[self.genome_ids[row]]]
+        place = int(np.flatnonzero(rows == row)[0])
+        nearby = rows[max(place - distance, 0):place + distance + 1]
+        return [self.names[r] for r in nearby if r != row]
+
+    def domain_interval(self, domain: str, name) -> Optional[tuple]:
+        """(start, end) of a gene's domain, or None."""
+        intervals = self.domains.get(domain)
+        row = self.registry.index.get(name)
+        if intervals is None or row is None or not intervals.has_interval[row]:
+            return None
+        return float(intervals.start[row]), float(intervals.end[row])
+
+    def nodes(self, cutoff_index=None, include_gene_type=False, include_domains=False) -> List[Dict[str, Any]]:
+        """Node dicts for graph output (see add_nodes)."""
+        present = set(cutoff_index) if cutoff_index is not None else None
+        genomes = self._node_columns['genome']
+        protein_names = self._node_columns['protein_name']
+        orientations = self._node_columns['orientation']
+        gene_types = self._node_columns.get('gene_type') if include_gene_type else None
+        domain_columns = list(self._domain_node_columns.items()) if include_domains else []
+        rel_positions = self.rel_position.tolist()
+
+        nodes = []
+        for i, name in enumerate(self.names):
+            node_data = {
+                "id": name,
+                "genome_name": genomes[i],
+                "protein_name": protein_names[i],
+                "direction": orientations[i],
+                "rel_position": rel_positions[i],
+            }
+            if gene_types is not None:
+                node_data["gene_type"] = gene_types[i]
+            if present is not None:
+                node_data["is_present"] = name in present
+            for column, values in domain_columns:
+                node_data[column] = values[i]
+            nodes.append(node_data)
+        return nodes
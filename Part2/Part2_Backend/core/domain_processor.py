@@ -1,4 +1,5 @@
 from typing import List, Dict, Tuple
+import numpy as np
 import pandas as pd
 from core.domain_types import DomainColumn
 
@@ -43,6 +44,78 @@ class DomainProcessor:
         except Exception as e:
             raise ValueError(f"Error processing domain field: {str(e)}")
     
+    def pivot_domain_coordinates(self, coords: pd.DataFrame, hits: pd.DataFrame) -> Tuple[pd.DataFrame, List[str]]:
+        """
+        Add long-format domain hits to a coordinate table as domainN_NAME_start/end columns.
+
+        Each hit's protein is matched against protein_name, then name. Domains that
+        already have a domainN_NAME column keep their number; new domains are numbered
+        after them in order of first appearance. Repeat runs numbered by
+        combine_coords.py (TIR2, TIR3, ...) are domains of their own and get their own
+        domainN_TIR2_start/end columns. Duplicate protein/domain hits are dropped in
+        favour of the first occurrence.
+
+        Args:
+            coords: Coordinate DataFrame (wide format)
+            hits: DataFrame with protein_id, start, end and domain columns
+
+        Returns:
+            Tuple of (coordinate DataFrame with the domain columns, processing warnings)
+
+        Raises:
+            ValueError: If the hits or the resulting domain columns are invalid
+        """
+        warnings = []
+        invalid = hits['protein_id'].isna() | hits['domain'].isna() | hits['start'].isna() | hits['end'].isna()
+        if invalid.any():
+            raise ValueError(f"Domain coordinate file has {int(invalid.sum())} rows without a protein, domain "
+                             f"or numeric start/end (first at row {int(np.flatnonzero(invalid.to_numpy())[0]) + 1})")
+
+        duplicate = hits.duplicated(['protein_id', 'domain']).to_numpy()
+        if duplicate.any():
+            warnings.append(f"Ignored {int(duplicate.sum())} duplicate protein/domain hits")
+        hits = hits[~duplicate]
+
+        # Reuse the numbers of domains the coordinate file already names
+        hit_domains = set(hits['domain'])
+        numbers = {}
+        for dc in self._extract_domain_columns(coords):
+            if dc.domain_name in hit_domains and dc.column_type in ('start', 'end'):
+                raise ValueError(f"Domain {dc.domain_name} has start/end columns in both the coordinate "
+                                 f"and the domain coordinate file")
+            numbers.setdefault(dc.domain_name, dc.name.split('_')[0])
+        used = [int(prefix[len('domain'):]) for prefix in numbers.values() if prefix[len('domain'):].isdigit()]
+        next_number = max(used, default=0) + 1
+        for domain in pd.unique(hits['domain']):
+            if domain not in numbers:
+                numbers[domain] = f"domain{next_number}"
+                next_number += 1
+
+        # Wide table: one row per protein, one start/end column pair per domain
+        starts = hits.pivot(index='protein_id', columns='domain', values='start')
+        ends = hits.pivot(index='protein_id', columns='domain', values='end')
+        by_protein = starts.index.get_indexer(coords['protein_name'].astype(str).str.strip())
+        by_name = starts.index.get_indexer(coords['name'].astype(str).str.strip())
+        unmatched = np.setdiff1d(np.arange(len(starts.index)), np.concatenate([by_protein, by_name]))
+        if len(unmatched):
+            warnings.append(f"{len(unmatched)} proteins in the domain coordinate file are not in the coordinate "
+                            f"file: " + ", ".join(map(str, starts.index[unmatched[:10]])))
+
+        result = coords.copy()
+        for domain in pd.unique(hits['domain']):
+            prefix = f"{numbers[domain]}_{domain}"
+            for suffix, table in (('start', starts), ('end', ends)):
+                # NaN-padded so that -1 (no match) picks the NaN
+                column = np.append(table[domain].to_numpy(dtype=np.float64), np.nan)
+                values = column[by_protein]
+                values = np.where(np.isnan(values), column[by_name], values)
+                result[f"{prefix}_{suffix}"] = values
+
+        errors = self._validate_domain_structure(self._extract_domain_columns(result))
+        if errors:
+            raise ValueError(f"Domain validation failed: {'; '.join(errors)}")
+        return result, warnings
+
     def _extract_domain_columns(self, df: pd.DataFrame) -> List[DomainColumn]:
         """Extract and parse domain columns from a DataFrame."""
         domain_columns = []
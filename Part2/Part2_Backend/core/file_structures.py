@@ -1,5 +1,5 @@
 from dataclasses import dataclass, field
-from typing import List, Dict, Set, Any
+from typing import List, Dict, Set, Any, Optional
 import pandas as pd
 from core.enums import OrientationType
 from core.domain_types import DomainColumn
@@ -60,6 +60,16 @@ class CoordinateFileStructure:
     # Computed columns that will be added during processing
     computed_columns: List[str] = field(default_factory=lambda: ['rel_position'])
     
+    def get_string_columns(self) -> List[str]:
+        """Columns read as text regardless of content (keeps e.g. protein names like '000123' intact)."""
+        return [col for col, spec in self.column_specifications.items()
+                if spec['type'] in ('string', 'categorical')]
+
+    def get_read_dtypes(self, columns: List[str]) -> Dict[str, Any]:
+        """dtype mapping for reading a coordinate file with the given header."""
+        string_columns = set(self.get_string_columns())
+        return {col: str for col in columns if col in string_columns}
+    
     def get_all_required_columns(self) -> List[str]:
         """Get all required columns including computed ones."""
         return self.required_columns + self.computed_columns
@@ -135,8 +145,9 @@ class MatrixFileStructure:
             errors.append("Matrix has no valid columns after removing NA values")
         
         # Check data types
-        if not df.dtypes.apply(lambda x: pd.api.types.is_numeric_dtype(x)).all():
-            errors.append("Matrix contains non-numeric values")
+        non_numeric = self.non_numeric_error(df)
+        if non_numeric:
+            errors.append(non_numeric)
         
         # Check index and column lengths
         if any(len(str(idx)) > self.validation_rules['max_index_length'] for idx in df.index):
@@ -147,6 +158,21 @@ class MatrixFileStructure:
         
         return errors
     
+    def non_numeric_error(self, df: pd.DataFrame) -> Optional[str]:
+        """
+        The validation error for score columns that didn't parse as numbers, if any.
+
+        Comma-formatted scores ('1,234', '95,5') are rejected rather than guessed
+        at, since the comma may be a thousands or a decimal separator.
+        """
+        text_columns = [i for i, dtype in enumerate(df.dtypes) if not pd.api.types.is_numeric_dtype(dtype)]
+        if not text_columns:
+            return None
+        values = df.iloc[:, text_columns].stack().astype(str)
+        if values.str.fullmatch(r'\s*[-+]?\d+(,\d+)+(\.\d+)?\s*').any():
+            return "Matrix contains non-numeric values (comma-formatted scores such as '1,234' are not supported)"
+        return "Matrix contains non-numeric values"
+
     def apply_cutoff(self, df: pd.DataFrame) -> pd.DataFrame:
         """Apply cutoff threshold to matrix data."""
         return df[df >= self.cutoff_threshold] 
\ No newline at end of file
@@ -0,0 +1,114 @@
+import weakref
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple, TypeVar
+
+import numpy as np
+import pandas as pd
+
+T = TypeVar('T')
+
+
+def cached_per_frame(cache: Dict[int, Tuple[tuple, T]], coords: pd.DataFrame,
+                     build: Callable[[pd.DataFrame], T]) -> T:
+    """
+    The object build(coords) for a cleaned coordinate frame, built once per frame.
+
+    Cleaned frames are read-only by convention: pipeline stages derive new
+    frames instead of editing them. Entries are keyed by id(coords) and
+    dropped when the frame is garbage collected. Each entry also records the
+    frame's length and columns, and a frame whose shape has changed is
+    rebuilt rather than served stale (edits to individual cells are not
+    detected; hashing the contents would cost more than the cache saves).
+    """
+    key = id(coords)
+    signature = (len(coords), tuple(coords.columns))
+    entry = cache.get(key)
+    if entry is not None and entry[0] == signature:
+        return entry[1]
+    value = build(coords)
+    if entry is None:
+        weakref.finalize(coords, cache.pop, key, None)
+    cache[key] = (signature, value)
+    return value
+
+
+class GeneRegistry:
+    """
+    Dense integer ids for gene names and genomes.
+
+    Built once per cleaned coordinate frame (see ``GeneRegistry.of``) so that
+    matrix labels can be turned into int32 arrays up front; pipeline stages
+    then group, compare and key on ints, and names are only looked up again
+    when the output is built.
+    """
+
+    _cache: Dict[int, Tuple[tuple, 'GeneRegistry']] = {}
+
+    def __init__(self, names: Sequence, genomes: Optional[Sequence] = None):
+        self._names = np.asarray(list(names), dtype=object)
+        # Names added by intern() since the arrays were last built (all without a genome)
+        self._interned: List = []
+        # Last occurrence wins, like dict(zip(names, genomes))
+        self.index: Dict[str, int] = {name: i for i, name in enumerate(self._names)}
+        if genomes is None:
+            self.genome_names: List = []
+            self._genome_ids = np.full(len(self._names), -1, dtype=np.int32)
+        else:
+            # First-appearance order (as coords['genome'].unique()); missing genomes get -1
+            codes, uniques = pd.factorize(pd.Series(list(genomes), dtype=object))
+            self.genome_names = list(uniques)
+            self._genome_ids = codes.astype(np.int32)
+
+    @classmethod
+    def of(cls, coords: pd.DataFrame) -> 'GeneRegistry':
+        """The registry for a cleaned coordinate frame, built on first use and shared after (see cached_per_frame)."""
+        return cached_per_frame(cls._cache, coords, lambda frame: cls(frame['name'], frame['genome']))
+
+    def _build(self) -> None:
+        # Interned names are appended in one go, so interning n names stays linear
+        if self._interned:
+            self._names = np.concatenate([self._names, np.array(self._interned, dtype=object)])
+            self._genome_ids = np.concatenate([self._genome_ids, np.full(len(self._interned), -1, dtype=np.int32)])
+            self._interned = []
+
+    @property
+    def names(self) -> np.ndarray:
+        """Gene name per id."""
+        self._build()
+        return self._names
+
+    @property
+    def genome_ids(self) -> np.ndarray:
+        """Genome id per gene id (-1 without a genome)."""
+        self._build()
+        return self._genome_ids
+
+    def __len__(self) -> int:
+        return len(self._names) + len(self._interned)
+
+    def ids(self, labels: Iterable) -> np.ndarray:
+        """int32 ids for gene names; -1 for names not in the registry."""
+        labels = list(labels)
+        index = self.index
+        return np.fromiter((index.get(label, -1) for label in labels), dtype=np.int32, count=len(labels))
+
+    def intern(self, name) -> int:
+        """Id for a name, registering it (without a genome) if it is new."""
+        gene_id = self.index.get(name)
+        if gene_id is None:
+            gene_id = self.index[name] = len(self)
+            self._interned.append(name)
+        return gene_id
+
+    def genome_codes(self, ids: np.ndarray) -> np.ndarray:
+        """Genome id per gene id; -1 for unknown genes or genes without a genome."""
+        ids = np.asarray(ids, dtype=np.int64)
+        codes = np.full(len(ids), -1, dtype=np.int32)
+        known = ids >= 0
+        codes[known] = self.genome_ids[ids[known]]
+        return codes
+
+    def genome_labels(self, labels: Iterable) -> np.ndarray:
+        """Genome name per gene name (object array, None where unknown)."""
+        codes = self.genome_codes(self.ids(labels))
+        lookup = np.asarray(self.genome_names + [None], dtype=object)
+        return lookup[codes]  # -1 indexes the trailing None
@@ -19,7 +19,8 @@ class MatrixFile(DataFile):
         
         # Reset file pointer to beginning
         self.file_object.seek(0)
-        raw_data = read_file(self.file_object, 'matrix')
+        # Every format, .pmx included, comes back from read_file as a label column plus scores
+        raw_data = read_file(self.file_object, 'matrix', self.config, self.filename)
         
         # Prepare matrix structure
         self.data = raw_data.reset_index(drop=True)
@@ -1,4 +1,5 @@
 import os
+import threading
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import NullPool
@@ -8,14 +9,22 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
-if os.getenv("ENV") == "production":
-    engine = create_engine(
-        os.getenv("DATABASE_URL"),
-        poolclass=NullPool,
-        pool_pre_ping=True
-    )
-else:
-    engine = create_engine(
+# The engine is created on first access rather than at import time so that a
+# cold start doesn't open connection pools for requests that never hit the DB.
+_engine = None
+_engine_lock = threading.Lock()
+
+SessionLocal = sessionmaker()
+
+
+def _create_engine():
+    if os.getenv("ENV") == "production":
+        return create_engine(
+            os.getenv("DATABASE_URL"),
+            poolclass=NullPool,
+            pool_pre_ping=True
+        )
+    return create_engine(
         os.getenv("DATABASE_URL"),
         pool_size=5,
         max_overflow=10,
@@ -23,10 +32,20 @@ else:
         pool_pre_ping=True
     )
 
-SessionLocal = sessionmaker(bind=engine)
+
+def get_engine():
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = _create_engine()
+                SessionLocal.configure(bind=_engine)
+    return _engine
+
 
 @contextmanager
 def session_scope():
+    get_engine()
     session = SessionLocal()
     try:
         yield session
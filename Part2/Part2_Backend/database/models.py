@@ -1,5 +1,5 @@
 # Defines models for database tables
-from sqlalchemy import Column, String, Integer, Boolean, TIMESTAMP, ARRAY, ForeignKey
+from sqlalchemy import Column, String, Integer, Boolean, TIMESTAMP, ARRAY, ForeignKey, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql import func
@@ -41,3 +41,20 @@ class File(Base):
     s3_key = Column(String, nullable=False)
     file_type = Column(String)
     uploaded_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
+
+class GeneIndex(Base):
+    """Which of a user's projects contain each gene/protein (filled on save; see services/gene_index.py)."""
+    __tablename__ = "gene_index"
+
+    group_id = Column(UUID(as_uuid=True), ForeignKey('groups.id', ondelete='CASCADE'), primary_key=True)
+    gene_id = Column(String, primary_key=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey('users.id'), nullable=False)
+    protein_name = Column(String)
+    genome_name = Column(String)
+
+    # text_pattern_ops lets "LIKE 'prefix%'" use the btree under any collation
+    __table_args__ = (
+        Index('idx_gene_index_user_gene', 'user_id', 'gene_id', postgresql_ops={'gene_id': 'text_pattern_ops'}),
+        Index('idx_gene_index_user_protein', 'user_id', 'protein_name',
+              postgresql_ops={'protein_name': 'text_pattern_ops'}),
+    )
@@ -0,0 +1,14 @@
+class AdmissionRejected(Exception):
+    def __init__(self, message, status_code=503, retry_after=1):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+class ClientLimitExceeded(AdmissionRejected):
+    def __init__(self, retry_after):
+        super().__init__("Too many large graph requests in progress for this client", 429, retry_after)
+
+class ServerSaturated(AdmissionRejected):
+    def __init__(self, retry_after):
+        super().__init__("Server is busy generating graphs; please retry shortly", 503, retry_after)
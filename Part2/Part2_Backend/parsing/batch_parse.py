@@ -0,0 +1,274 @@
+"""
+Batch parsing of many datasets in one launch.
+
+Datasets come from a directory tree laid out like parsing_testing (one dataset
+per directory: a ``*coords*`` file plus either one ``*matrix*`` file or
+``*_domainN_NAME`` matrices) or from a JSON manifest:
+
+    {"datasets": [{"name": "chr1", "coords": "chr1/coords.xlsx",
+                   "matrices": ["chr1/chr1_domain1_NBS.xlsx", "chr1/chr1_domain2_LRR.xlsx"],
+                   "domain_specific": true, "domains": "chr1/hits.csv"}]}
+
+(paths relative to the manifest; ``domain_specific`` defaults to true for
+``_domain`` matrices, ``domains`` and ``genome_pairs`` are optional).
+
+Each dataset runs in its own worker process, at most ``workers`` at a time,
+and is terminated when it exceeds ``timeout`` seconds. Workers are forked
+where the platform allows it, so pandas/openpyxl and the parsing modules are
+imported once by this process rather than once per dataset. Every dataset's
+graph is written to ``<output_dir>/<name>.json`` and a ``summary.json`` lists
+status, wall time, top-level stage timings and errors per dataset.
+
+    python -m parsing.batch_parse parsing_testing/domain_testing -o /tmp/out -j 8 --timeout 600
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from dataclasses import dataclass
+from multiprocessing.connection import wait
+from typing import Any, Dict, List, Optional
+
+from parsing.general_parse import parse_matrix
+from parsing.domain_parse import domain_parse
+from parsing.block_links import parse_genome_pairs
+from parsing.instrumentation import collect_timings
+
+DATA_EXTENSIONS = ('.xlsx', '.csv', '.tsv', '.pmx')
+
+
+@dataclass
+class Dataset:
+    """One coordinate file plus its matrices."""
+    name: str
+    coords: str
+    matrices: List[str]
+    domain_specific: bool
+    domains: Optional[str] = None  # Long-format domain coordinate file (domain-specific only)
+    genome_pairs: Optional[str] = None  # 'A:B,...' (general only)
+
+
+def discover_datasets(root: str) -> List[Dataset]:
+    """Datasets in a directory tree, one per directory with a coordinate file and matrices."""
+    datasets = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        # Skip Excel lock files ('~$name.xlsx')
+        files = sorted(f for f in filenames if f.lower().endswith(DATA_EXTENSIONS) and not f.startswith('~$'))
+        coords = [f for f in files if 'coord' in f.lower()]
+        if len(coords) != 1:
+            continue
+        domain_matrices = [f for f in files if '_domain' in f.lower() and f not in coords]
+        matrices = domain_matrices or [f for f in files if 'matrix' in f.lower() and f not in coords]
+        if not matrices or (not domain_matrices and len(matrices) != 1):
+            continue
+        name = os.path.relpath(dirpath, root)
+        datasets.append(Dataset(
+            name=os.path.basename(os.path.abspath(root)) if name == '.' else name,
+            coords=os.path.join(dirpath, coords[0]),
+            matrices=[os.path.join(dirpath, f) for f in matrices],
+            domain_specific=bool(domain_matrices),
+        ))
+    return datasets
+
+
+def load_manifest(path: str) -> List[Dataset]:
+    """Datasets listed in a JSON manifest (a list, or {"datasets": [...]})."""
+    with open(path) as f:
+        entries = json.load(f)
+    if isinstance(entries, dict):
+        entries = entries.get('datasets', [])
+    base = os.path.dirname(os.path.abspath(path))
+
+    def resolve(p):
+        return p if os.path.isabs(p) else os.path.join(base, p)
+
+    datasets = []
+    for i, entry in enumerate(entries, 1):
+        if 'coords' not in entry or not entry.get('matrices'):
+            raise ValueError(f"Manifest entry {i} needs 'coords' and 'matrices'")
+        matrices = [resolve(m) for m in entry['matrices']]
+        domain_specific = entry.get('domain_specific')
+        if domain_specific is None:
+            domain_specific = any('_domain' in os.path.basename(m).lower() for m in matrices)
+        datasets.append(Dataset(
+            name=entry.get('name') or f"dataset{i}",
+            coords=resolve(entry['coords']),
+            matrices=matrices,
+            domain_specific=bool(domain_specific),
+            domains=resolve(entry['domains']) if entry.get('domains') else None,
+            genome_pairs=entry.get('genome_pairs'),
+        ))
+    return datasets
+
+
+def parse_dataset(dataset: Dataset):
+    """Graph output for one dataset, as the single-dataset CLIs produce it."""
+    if dataset.domain_specific:
+        matrix_files = [open(m, 'rb') for m in dataset.matrices]
+        domain_file = open(dataset.domains, 'rb') if dataset.domains else None
+        try:
+            with open(dataset.coords, 'rb') as coord_file:
+                return domain_parse(matrix_files, coord_file, [os.path.basename(m) for m in dataset.matrices],
+                                    domain_file=domain_file)
+        finally:
+            for f in matrix_files:
+                f.close()
+            if domain_file:
+                domain_file.close()
+    if len(dataset.matrices) != 1:
+        raise ValueError("Exactly one matrix file is required for non-domain-specific graphs")
+    with open(dataset.matrices[0], 'rb') as matrix_file, open(dataset.coords, 'rb') as coord_file:
+        return parse_matrix(matrix_file, coord_file, parse_genome_pairs(dataset.genome_pairs))
+
+
+def output_path(output_dir: str, dataset: Dataset) -> str:
+    return os.path.join(output_dir, dataset.name.replace(os.sep, '__') + '.json')
+
+
+def _stage_totals(records: List[Dict[str, Any]]) -> Dict[str, float]:
+    """Seconds per top-level stage name."""
+    totals: Dict[str, float] = {}
+    for record in records:
+        if record['depth'] == 0:
+            totals[record['stage']] = round(totals.get(record['stage'], 0.0) + record['seconds'], 6)
+    return totals
+
+
+def _worker(dataset: Dataset, path: str, conn) -> None:
+    """Runs in the child: parse, write the JSON, report a small status dict."""
+    try:
+        with collect_timings(log=False) as collector:
+            result = parse_dataset(dataset)
+        with open(path, 'w') as f:
+            json.dump(result, f)
+        peak = [r['peak_rss_kib'] for r in collector.records if 'peak_rss_kib' in r]
+        conn.send({"status": "ok", "output": path, "stages": _stage_totals(collector.records),
+                   "peak_rss_kib": max(peak) if peak else None})
+    except Exception as e:
+        conn.send({"status": "error", "error": f"{type(e).__name__}: {e}"})
+    finally:
+        conn.close()
+
+
+def _context():
+    # fork shares this process's imports with every worker; fall back to the platform default elsewhere
+    if 'fork' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('fork')
+    return multiprocessing.get_context()
+
+
+def run_batch(datasets: List[Dataset], output_dir: str, workers: Optional[int] = None,
+              timeout: Optional[float] = None, progress=None) -> Dict[str, Any]:
+    """
+    Parse datasets in worker processes and write their outputs plus summary.json.
+
+    Args:
+        datasets: Datasets to parse
+        output_dir: Directory for <name>.json outputs and summary.json
+        workers: Concurrent worker processes (default: CPU count)
+        timeout: Seconds before a dataset's worker is terminated (None: no limit)
+        progress: Optional callable receiving each dataset's summary entry as it finishes
+
+    Returns:
+        The summary dict (also written to summary.json)
+    """
+    names = [d.name for d in datasets]
+    if len(set(names)) != len(names):
+        raise ValueError("Dataset names must be unique")
+    os.makedirs(output_dir, exist_ok=True)
+    workers = max(1, workers or os.cpu_count() or 1)
+    ctx = _context()
+    pending = list(datasets)
+    running = {}  # connection -> (process, dataset, start time)
+    entries = {}
+    started = time.perf_counter()
+
+    def finish(dataset, start, message):
+        entry = {"name": dataset.name, "domain_specific": dataset.domain_specific,
+                 "seconds": round(time.perf_counter() - start, 3), **message}
+        entries[dataset.name] = entry
+        if progress:
+            progress(entry)
+
+    while pending or running:
+        while pending and len(running) < workers:
+            dataset = pending.pop(0)
+            receiver, sender = ctx.Pipe(duplex=False)
+            process = ctx.Process(target=_worker, args=(dataset, output_path(output_dir, dataset), sender),
+                                  daemon=True)
+            process.start()
+            sender.close()
+            running[receiver] = (process, dataset, time.perf_counter())
+
+        wait_for = None
+        if timeout is not None:
+            now = time.perf_counter()
+            wait_for = max(0.0, min(start + timeout - now for _, _, start in running.values()))
+        for conn in wait(list(running), timeout=wait_for):
+            process, dataset, start = running.pop(conn)
+            try:
+                message = conn.recv()
+            except EOFError:
+                message = None
+            process.join()
+            if message is None:
+                message = {"status": "error", "error": f"Worker exited with code {process.exitcode}"}
+            conn.close()
+            finish(dataset, start, message)
+
+        if timeout is not None:
+            now = time.perf_counter()
+            for conn, (process, dataset, start) in list(running.items()):
+                if now - start >= timeout:
+                    process.terminate()
+                    process.join()
+                    conn.close()
+                    del running[conn]
+                    finish(dataset, start, {"status": "timeout", "error": f"Exceeded {timeout:g}s"})
+
+    results = [entries[d.name] for d in datasets]
+    summary = {
+        "total_seconds": round(time.perf_counter() - started, 3),
+        "workers": workers,
+        "timeout": timeout,
+        "ok": sum(r["status"] == "ok" for r in results),
+        "failed": sum(r["status"] != "ok" for r in results),
+        "datasets": results,
+    }
+    with open(os.path.join(output_dir, 'summary.json'), 'w') as f:
+        json.dump(summary, f, indent=2)
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Parse many datasets in parallel worker processes')
+    parser.add_argument('source', type=str, help='Directory tree of datasets, or a JSON manifest')
+    parser.add_argument('--output', '-o', type=str, required=True, help='Output directory')
+    parser.add_argument('--workers', '-j', type=int, help='Concurrent worker processes (default: CPU count)')
+    parser.add_argument('--timeout', type=float, help='Per-dataset time limit in seconds')
+
+    args = parser.parse_args()
+
+    try:
+        datasets = load_manifest(args.source) if os.path.isfile(args.source) else discover_datasets(args.source)
+    except (OSError, ValueError) as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        sys.exit(1)
+    if not datasets:
+        print(f"Error: no datasets found in {args.source}", file=sys.stderr)
+        sys.exit(1)
+    def report(entry):
+        detail = f" ({entry['error']})" if entry['status'] != 'ok' else ''
+        print(f"{entry['status']:>7} {entry['seconds']:8.2f}s {entry['name']}{detail}", file=sys.stderr)
+
+    try:
+        summary = run_batch(datasets, args.output, args.workers, args.timeout, progress=report)
+    except ValueError as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        sys.exit(1)
+    print(f"{summary['ok']} ok, {summary['failed']} failed in {summary['total_seconds']:.1f}s; "
+          f"summary written to {os.path.join(args.output, 'summary.json')}")
+    sys.exit(1 if summary['failed'] else 0)
@@ -0,0 +1,151 @@
+"""
+Link computation by genome-pair block.
+
+calculate_row_maxes/calculate_column_maxes take a row's maximum within each
+column genome and a column's maximum within each row genome, so both maxima
+of a cell depend only on its (row genome, column genome) block. Here the
+matrix is split into those blocks (genome ids from the GeneRegistry), each block's
+maxima and links are computed independently on a thread pool (NumPy releases
+the GIL for the reductions), and the results are merged back into the
+row-major order add_links produces.
+
+Restricting the work to selected genome pairs only computes those blocks;
+their links are exactly the full graph's links between those genomes.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from core.gene_registry import GeneRegistry
+from parsing.instrumentation import stage
+
+GenomePair = Tuple[str, str]
+
+
+def _genome_groups(codes: np.ndarray) -> Dict[int, np.ndarray]:
+    """Positions of each genome id's genes, in first-appearance order (-1: no genome)."""
+    return {int(code): np.flatnonzero(codes == code) for code in pd.unique(codes)}
+
+
+def parse_genome_pairs(value) -> Optional[List[GenomePair]]:
+    """
+    Parse a genome pair selection: 'A:B,A:C' or a list of [a, b] pairs.
+
+    Returns None (all pairs) for an empty selection.
+    """
+    if not value:
+        return None
+    if isinstance(value, str):
+        items = [item.split(':') for item in value.split(',') if item.strip()]
+    else:
+        items = [list(item) for item in value]
+    pairs = []
+    for item in items:
+        if len(item) != 2 or not all(str(genome).strip() for genome in item):
+            raise ValueError(f"Invalid genome pair {':'.join(map(str, item))!r}; expected 'genomeA:genomeB'")
+        pairs.append((str(item[0]).strip(), str(item[1]).strip()))
+    return pairs or None
+
+
+def _selected(row_genome, col_genome, pairs: Optional[set]) -> bool:
+    # Pairs are unordered: A-B links come from both the (A, B) and (B, A) blocks
+    return pairs is None or (row_genome, col_genome) in pairs or (col_genome, row_genome) in pairs
+
+
+def filter_links(links: List[Dict], coords: pd.DataFrame, genome_pairs: Optional[Iterable[GenomePair]]) -> List[Dict]:
+    """Keep the links between selected genome pairs (for link lists computed without a selection)."""
+    if not genome_pairs:
+        return links
+    pairs = set(genome_pairs)
+    registry = GeneRegistry.of(coords)
+    source_genomes = registry.genome_labels(link["source"] for link in links)
+    target_genomes = registry.genome_labels(link["target"] for link in links)
+    return [link for link, source, target in zip(links, source_genomes, target_genomes)
+            if _selected(source, target, pairs)]
+
+
+def _block_hits(values: np.ndarray, row_pos: np.ndarray, col_pos: np.ndarray,
+                row_max_valid: bool, col_max_valid: bool):
+    """Cells of one block that are a row and/or column maximum, as global positions."""
+    block = values[np.ix_(row_pos, col_pos)]
+    with np.errstate(invalid='ignore'):
+        is_row_max = block == np.fmax.reduce(block, axis=1)[:, None] if row_max_valid else np.zeros(block.shape, bool)
+        is_col_max = block == np.fmax.reduce(block, axis=0)[None, :] if col_max_valid else np.zeros(block.shape, bool)
+    r, c = np.nonzero(is_row_max | is_col_max)
+    return row_pos[r], col_pos[c], is_row_max[r, c], is_col_max[r, c], block[r, c]
+
+
+def block_links(df_only_cutoffs: pd.DataFrame, coords: pd.DataFrame, genomes=None, domain=None,
+                return_connections=False, genome_pairs: Optional[Iterable[GenomePair]] = None,
+                max_workers: Optional[int] = None):
+    """
+    Create link dictionaries for graph output, one genome-pair block at a time.
+
+    Same arguments and result as add_links (without the precomputed maxima),
+    plus:
+        genome_pairs: Optional (genome, genome) pairs to compute; None for all
+        max_workers: Thread pool size (None: the executor default, 1: inline)
+    """
+    registry = GeneRegistry.of(coords)
+    row_groups = _genome_groups(registry.genome_codes(registry.ids(df_only_cutoffs.index)))
+    col_groups = _genome_groups(registry.genome_codes(registry.ids(df_only_cutoffs.columns)))
+    genome_names = registry.genome_names + [None]  # code -1 -> None
+    pairs = set(genome_pairs) if genome_pairs else None
+    values = df_only_cutoffs.to_numpy(dtype=np.float64)
+
+    tasks = []
+    for row_code, row_pos in row_groups.items():
+        for col_code, col_pos in col_groups.items():
+            # Genes without a genome are in no group, so they never set a maximum
+            row_max_valid, col_max_valid = col_code >= 0, row_code >= 0
+            if not (row_max_valid or col_max_valid):
+                continue
+            if not _selected(genome_names[row_code], genome_names[col_code], pairs):
+                continue
+            # Domain graphs skip links within a genome (add_links: equal genome lookups, None included)
+            if genomes and row_code == col_code:
+                continue
+            tasks.append((row_pos, col_pos, row_max_valid, col_max_valid))
+
+    with stage('block_links', blocks=len(tasks), rows=values.shape[0], cols=values.shape[1]) as s:
+        if max_workers == 1 or len(tasks) <= 1:
+            results = [_block_hits(values, *task) for task in tasks]
+        else:
+            with ThreadPoolExecutor(max_workers=max_workers) as pool:
+                results = list(pool.map(lambda task: _block_hits(values, *task), tasks))
+
+        if results:
+            rows, cols, row_hits, col_hits, scores = (np.concatenate(parts) for parts in zip(*results))
+        else:
+            rows = cols = np.empty(0, dtype=np.int64)
+            row_hits = col_hits = np.empty(0, dtype=bool)
+            scores = np.empty(0)
+        # Back to add_links' row-major order
+        order = np.argsort(rows * values.shape[1] + cols, kind='stable')
+
+        row_names = df_only_cutoffs.index
+        col_names = df_only_cutoffs.columns
+        links = []
+        domain_connections = {} if return_connections else None
+        for i in order:
+            row_max_hit = bool(row_hits[i])
+            if row_max_hit:
+                source, target = row_names[rows[i]], col_names[cols[i]]
+            else:
+                source, target = col_names[cols[i]], row_names[rows[i]]
+            reciprocal = row_max_hit and bool(col_hits[i])
+            if return_connections and domain:
+                domain_connections[f'{source}#{target}'] = {domain: reciprocal}
+            links.append({
+                "source": source,
+                "target": target,
+                "score": float(scores[i]),
+                "is_reciprocal": reciprocal
+            })
+        s.set(edges=len(links))
+
+    if return_connections and domain:
+        return links, domain_connections, {domain: df_only_cutoffs.index.tolist()}
+    return links
@@ -0,0 +1,231 @@
+"""
+Chunked (out-of-core) processing of CSV/TSV score matrices.
+
+The in-memory path (MatrixFile + parse_matrix_data + add_links) holds the
+whole matrix plus several same-sized copies (cutoff frame, row maxes, column
+maxes). Here the matrix is streamed in row blocks twice:
+
+    pass 1  validate each block, then fold its per-genome column maxima into
+            an (n_genomes x n_columns) accumulator
+    pass 2  re-read each block, compute its row maxima (row-local, so exact
+            within the block) and emit links where a cell is a row or column
+            maximum
+
+Peak memory is one block plus the column-max accumulator, independent of the
+number of rows. Links, their order and reciprocity match add_links exactly.
+"""
+import os
+from contextlib import nullcontext
+from io import BytesIO
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from core.config import FileProcessingConfig
+from core.gene_registry import GeneRegistry
+from parsing.instrumentation import stage
+
+Source = Union[bytes, str, Any]  # raw bytes, a path, or a seekable binary file object
+
+_DELIMITED = ('.csv', '.tsv')
+
+
+def _size_of(file) -> Optional[int]:
+    if hasattr(file, 'getbuffer'):
+        return file.getbuffer().nbytes
+    try:
+        return os.fstat(file.fileno()).st_size
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+def use_chunked(file, config: FileProcessingConfig) -> bool:
+    """Whether a matrix file should take the chunked path under this config."""
+    threshold = config.chunked_min_bytes
+    name = getattr(file, 'name', '') or ''
+    if threshold is None or not name.lower().endswith(_DELIMITED):
+        return False
+    size = _size_of(file)
+    return size is not None and size >= threshold
+
+
+class ChunkedMatrix:
+    """
+    A delimited score matrix read in row blocks.
+
+    Args:
+        source: Raw file bytes, a path, or a seekable file object (read once per pass)
+        sep: ',' or '\\t'
+        chunk_rows: Rows per block; derived from chunk_memory_mb when omitted
+        chunk_memory_mb: Target size of one float64 block
+    """
+
+    def __init__(self, source: Source, sep: str, chunk_rows: Optional[int] = None, chunk_memory_mb: int = 64):
+        self.source = source
+        self.sep = sep
+        with self._open() as handle:
+            header = handle.readline()
+        if isinstance(header, bytes):
+            header = header.decode('utf-8')
+        # Only used to size blocks, so a rough count (quoted separators aside) is fine
+        approx_columns = max(header.count(sep), 1)
+        self.chunk_rows = chunk_rows or max(1, (chunk_memory_mb * 1024 * 1024) // (approx_columns * 8))
+
+    def _open(self):
+        if isinstance(self.source, bytes):
+            return BytesIO(self.source)
+        if isinstance(self.source, (str, os.PathLike)):
+            return open(self.source, 'rb')
+        # Caller's file object: rewind for each pass, but leave it open
+        self.source.seek(0)
+        return nullcontext(self.source)
+
+    def chunks(self) -> Iterator[Tuple[np.ndarray, pd.Index, pd.DataFrame]]:
+        """Yield (row ids, column names, block) with whitespace stripped as MatrixFile.clean does."""
+        with self._open() as handle:
+            reader = pd.read_csv(handle, sep=self.sep, encoding='utf-8', index_col=0, dtype={0: str},
+                                 chunksize=self.chunk_rows)
+            for block in reader:
+                block.columns = block.columns.str.strip()
+                block.index = block.index.str.strip()
+                # load_data drops rows that are entirely empty
+                block = block.dropna(how='all')
+                yield block.index.to_numpy(), block.columns, block
+
+
+def parse_matrix_chunked(source: Source, sep: str, coords: pd.DataFrame, config: FileProcessingConfig = None,
+                         skip_same_genome: bool = False,
+                         chunk_rows: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Compute a matrix's links without holding the matrix in memory.
+
+    Args:
+        source: Raw CSV/TSV bytes, a path or a seekable file object
+        sep: Field separator
+        coords: Cleaned coordinate DataFrame
+        config: FileProcessingConfig (cutoff, chunk size)
+        skip_same_genome: Skip links between genes of the same genome (domain graphs)
+        chunk_rows: Override the block size
+
+    Returns:
+        dict with 'links' and 'cutoff_index' (row identifiers, as the in-memory
+        path's df_only_cutoffs.index)
+    """
+    config = config or FileProcessingConfig()
+    structure = config.matrix_structure
+    cutoff = structure.cutoff_threshold
+    matrix = ChunkedMatrix(source, sep, chunk_rows=chunk_rows, chunk_memory_mb=config.chunk_memory_mb)
+
+    registry = GeneRegistry.of(coords)
+    n_genomes = len(registry.genome_names)
+
+    # Pass 1: validate and accumulate column maxima per row genome
+    columns = None
+    col_codes = None
+    col_groups: List[np.ndarray] = []
+    col_max = None  # (n_genomes + 1) x n_columns; the extra row (code -1) stays NaN
+    col_has_value = None
+    row_ids: List[str] = []
+    seen_ids = set()
+    duplicate_ids = False
+    missing_ids = set()
+    errors = []
+
+    with stage('chunked.pass1') as s:
+        for ids, block_columns, block in matrix.chunks():
+            if columns is None:
+                columns = block_columns
+                col_codes = registry.genome_codes(registry.ids(columns))
+                col_groups = [np.flatnonzero(col_codes == g) for g in range(n_genomes)]
+                col_max = np.full((n_genomes + 1, len(columns)), np.nan)
+                col_has_value = np.zeros(len(columns), dtype=bool)
+            # Same rule as MatrixFile.validate: text scores (including comma-formatted numbers) are rejected
+            non_numeric = structure.non_numeric_error(block)
+            if non_numeric:
+                raise ValueError(f"Matrix file validation failed: {[non_numeric]}")
+
+            gene_ids = registry.ids(ids)
+            for row_id in ids:
+                if row_id in seen_ids:
+                    duplicate_ids = True
+                seen_ids.add(row_id)
+            missing_ids.update(ids[gene_ids < 0])
+            row_ids.extend(ids)
+
+            values = block.to_numpy(dtype=np.float64)
+            col_has_value |= ~np.isnan(values).all(axis=0)
+            values[~(values >= cutoff)] = np.nan
+            codes = registry.genome_codes(gene_ids)
+            for g in np.unique(codes[codes >= 0]):
+                col_max[g] = np.fmax(col_max[g], np.fmax.reduce(values[codes == g], axis=0))
+        s.set(rows=len(row_ids), cols=0 if columns is None else len(columns), chunk_rows=matrix.chunk_rows)
+
+    if columns is None or len(row_ids) < structure.min_rows:
+        errors.append(f"Matrix must have at least {structure.min_rows} rows")
+    n_columns = int(col_has_value.sum()) if col_has_value is not None else 0
+    if n_columns < structure.min_columns:
+        errors.append(f"Matrix must have at least {structure.min_columns} columns")
+    if duplicate_ids and not structure.validation_rules['allow_duplicate_indices']:
+        errors.append("Matrix contains duplicate row identifiers")
+    max_length = structure.validation_rules['max_index_length']
+    if any(len(str(row_id)) > max_length for row_id in row_ids):
+        errors.append(f"Matrix contains row identifiers longer than {max_length} characters")
+    if errors:
+        raise ValueError(f"Matrix file validation failed: {errors}")
+    if missing_ids:
+        raise ValueError(
+            f"Matrix contains {len(missing_ids)} identifiers not found in coordinate file: " +
+            ", ".join(sorted(missing_ids))
+        )
+
+    # Pass 2: row maxima per block, then emit links in row-major order like add_links
+    links = []
+    column_names = list(columns)
+    with stage('chunked.pass2') as s:
+        for ids, _, block in matrix.chunks():
+            values = block.to_numpy(dtype=np.float64)
+            values[~(values >= cutoff)] = np.nan
+            codes = registry.genome_codes(registry.ids(ids))
+
+            is_row_max = np.zeros(values.shape, dtype=bool)
+            for group in col_groups:
+                if len(group):
+                    sub = values[:, group]
+                    is_row_max[:, group] = sub == np.fmax.reduce(sub, axis=1)[:, None]
+            is_col_max = values == col_max[codes]
+
+            candidates = is_row_max | is_col_max
+            if skip_same_genome:
+                candidates &= codes[:, None] != col_codes[None, :]
+            for r, c in zip(*np.nonzero(candidates)):
+                row_max_hit = is_row_max[r, c]
+                col_max_hit = is_col_max[r, c]
+                if row_max_hit:
+                    source, target = ids[r], column_names[c]
+                else:
+                    source, target = column_names[c], ids[r]
+                reciprocal = bool(row_max_hit and col_max_hit)
+                links.append({
+                    "source": source,
+                    "target": target,
+                    "score": float(values[r, c]),
+                    "is_reciprocal": reciprocal
+                })
+        s.set(edges=len(links))
+
+    return {"links": links, "cutoff_index": row_ids}
+
+
+def parse_matrix_file_chunked(matrix_file, coords: pd.DataFrame, config: FileProcessingConfig = None,
+                              skip_same_genome: bool = False) -> Dict[str, Any]:
+    """parse_matrix_chunked for an uploaded file object (CSV or TSV, by name)."""
+    name = getattr(matrix_file, 'name', '').lower()
+    sep = '\t' if name.endswith('.tsv') else ','
+    return parse_matrix_chunked(matrix_file, sep, coords, config, skip_same_genome=skip_same_genome)
+
+
+def chunked_threshold_from_env() -> Optional[int]:
+    """MATRIX_CHUNKED_MIN_BYTES: CSV/TSV matrices at least this large take the chunked path."""
+    value = os.getenv('MATRIX_CHUNKED_MIN_BYTES')
+    return int(value) if value else None
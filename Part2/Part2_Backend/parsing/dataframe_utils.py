@@ -1,14 +1,22 @@
 import pandas as pd
-from typing import Union
+from typing import Iterable, Union
 
-def clean_dataframe_whitespace(df: pd.DataFrame) -> pd.DataFrame:
-    """Clean whitespace from DataFrame index, columns, and string values."""
+def clean_dataframe_whitespace(df: pd.DataFrame, text_columns: Iterable[str] = ()) -> pd.DataFrame:
+    """
+    Clean whitespace from DataFrame index, columns, and string values.
+
+    Object columns made up of digits are converted to numbers, except for
+    text_columns, which are stripped but left as text.
+    """
+    text_columns = set(text_columns)
     if df.index.dtype == "object":
         df.index = df.index.str.strip()
     df.columns = df.columns.str.strip()
     for col in df.columns:
         if df[col].dtype == "object":
             df[col] = df[col].astype(str).str.strip()
+            if col in text_columns:
+                continue
             try:
                 if df[col].str.isnumeric().all():
                     df[col] = pd.to_numeric(df[col])
@@ -1,6 +1,4 @@
-import pandas as pd
-from io import BytesIO
-from flask import jsonify
+import numpy as np
 import json
 import argparse
 import sys
@@ -10,170 +8,288 @@ from core.coordinate_file import CoordinateFile
 from core.config import FileProcessingConfig
 from parsing.graph_utils import create_output, add_nodes
 from parsing.io_utils import parse_filenames
+from parsing.domain_state import DomainState
+from parsing.instrumentation import stage
+from core.gene_registry import GeneRegistry
+from parsing.chunked_matrix import use_chunked, parse_matrix_file_chunked, chunked_threshold_from_env
+from parsing.synteny import synteny_blocks_for
 
-def combine_graphs(all_domain_connections, all_domain_genes, domains):
-    #for each connection in domain 1 check if the connection exists in domains 2/3 and if those are reciprocal
-        #genomeA_gene1-genomeB_gene2 --> domain 1
-        #genomeB_gene2-genomeA_gene1 --> domain 2
-    #for each connection in domain 2:
-        #check if connection has already been parsed through
-
-    # Collect all unique connections across all domains
-    all_keys = set()
-    unique_links = set()
-    # print(all_keys)
-    # print(unique_links)
-    for domain_dict in all_domain_connections:
-        for key, value in domain_dict.items():
-            all_keys.add(key)
-            # unique_links.add((key, value)) # ("src_tgt", {'TIR': True})
-            for key_1, key_2 in value.items():
-                 unique_links.add((key, key_1, key_2)) # ("src_tgt", 'TIR', True})
-            #         unique_links.add((key, item)) # ("source_target", "TIR")
+def combine_domain_links(names, domain_links, domain_gene_ids, domains):
+    """
+    Build the combined ('ALL') graph's links from per-domain links, on gene ids.
 
-    combined = []
-    num_domains = len(domains)
-
-    for key in all_keys:
-        source, target = key.split('#', 1)
-        reverse_key = f"{target}#{source}"
-        # Check if this key exists in all domain dicts
-
-        present_in_domains = [
-            any((u_key == key or u_key == reverse_key) and dom_name == domain
-            for u_key, dom_name, dom_bool in unique_links)
-            for domain in domains
-            # (pair in unique_links) or (reverse_key_pairs[i] in unique_links)
-            # for i, pair in enumerate(key_domain_pairs)
-        ]
-
-        link_type = ""
-
-        if not all(present_in_domains):
-            # Check if connection is reciprocal in domains where it exists AND nodes don't exist in domains where connection is missing
-            if all(dom_bool for u_key, _, dom_bool in unique_links if u_key == key or u_key == reverse_key):
-                # Check if both nodes exist in any domain where the connection is missing
-                if any(source in all_domain_genes[i][domains[i]] and target in all_domain_genes[i][domains[i]]
-                      for i, present in enumerate(present_in_domains) if not present):
-                    link_type = "solid_red"
-                else:
-                    link_type = "solid_color"
-            # At least one reciprocal
-            elif any(dom_bool for u_key, _, dom_bool in unique_links if u_key == key or u_key == reverse_key):
-                if any(source in all_domain_genes[i][domains[i]] and target in all_domain_genes[i][domains[i]]
-                      for i, present in enumerate(present_in_domains) if not present):
-                    link_type = "solid_red"
-                else:
-                    link_type = "dotted_color"
-            else:
-                link_type = "dotted_grey"
-        else:
-            if all(dom_bool for u_key, _, dom_bool in unique_links if u_key == key or u_key == reverse_key):
-                link_type = "solid_color"
-            elif any(dom_bool for u_key, _, dom_bool in unique_links if u_key == key or u_key == reverse_key):
-                link_type = "dotted_color"
+    Args:
+        names: Gene name per id (materialised only for the output)
+        domain_links: Per domain, iterable of (source_id, target_id, is_reciprocal)
+        domain_gene_ids: Per domain, the ids of the genes in that domain's matrix
+        domains: Domain names, in the same order
+
+    Returns:
+        list: One {'source', 'target', 'link_type'} per directed connection,
+        in first-seen order
+    """
+    # A connection seen more than once in a domain keeps its last reciprocity, as a dict would
+    connections = [{(source, target): reciprocal for source, target, reciprocal in links} for links in domain_links]
+    gene_sets = [set(gene_ids) for gene_ids in domain_gene_ids]
+
+    # Per unordered gene pair: domains it occurs in and whether any occurrence is (non-)reciprocal
+    pair_domains = {}
+    pair_reciprocal = {}
+    pair_non_reciprocal = {}
+    keys = {}
+    for domain, domain_connections in zip(domains, connections):
+        for (source, target), reciprocal in domain_connections.items():
+            keys[(source, target)] = None
+            pair = (source, target) if source <= target else (target, source)
+            pair_domains.setdefault(pair, set()).add(domain)
+            if reciprocal:
+                pair_reciprocal[pair] = True
             else:
-                link_type = "dotted_grey"
-        
-        # # Optionally, collect which domains it's missing from
-        # # missing_domains = [i for i, present in enumerate(present_in_domains) if not present]
+                pair_non_reciprocal[pair] = True
+
+    combined = []
+    for source, target in keys:
+        pair = (source, target) if source <= target else (target, source)
+        present = pair_domains[pair]
+        all_reciprocal = pair not in pair_non_reciprocal
+        any_reciprocal = pair in pair_reciprocal
 
-        # # You can also merge the domain info if needed
-        domain_info = {}
-        for i, domain_dict in enumerate(all_domain_connections):
-            if key in domain_dict:
-                domain_info.update(domain_dict[key])
+        if all_reciprocal:
+            link_type = "solid_color"
+        elif any_reciprocal:
+            link_type = "dotted_color"
+        else:
+            link_type = "dotted_grey"
+        if any_reciprocal and len(present) < len(set(domains)):
+            # Missing from a domain whose matrix has both genes: the domains disagree
+            if any(source in genes and target in genes
+                   for domain, genes in zip(domains, gene_sets) if domain not in present):
+                link_type = "solid_red"
 
         combined.append({
-            "source": source,
-            "target": target,
+            "source": names[source],
+            "target": names[target],
             "link_type": link_type
-            # Change to 1 enum with the different types of connection possible: "Solid Red", "Solid Color", "Dotted Color", "Dotted Gray"
         })
-    # print(combined)
-
     return combined
 
-def domain_parse(matrix_files, coord_file, file_names):
+
+def combine_graphs(all_domain_connections, all_domain_genes, domains):
     """
-    Parse domain-specific matrix files and coordinate file using both file_utils and data_structures.
-    
-    Args:
-        matrix_files: List of BytesIO objects containing matrix file data
-        coord_file: BytesIO object containing coordinate file data
-        file_names: List of filenames for domain identification
-    
-    Returns:
-        list: List of graph outputs for each domain plus combined graph
+    combine_domain_links for add_links' connection dicts ({'source#target': {domain: is_reciprocal}})
+    and gene lists ({domain: [gene, ...]}).
     """
-    # Create configuration for enhanced validation
-    config = FileProcessingConfig(
+    registry = GeneRegistry([])
+    domain_links = []
+    for domain_dict in all_domain_connections:
+        links = []
+        for key, value in domain_dict.items():
+            source, target = key.split('#', 1)
+            for reciprocal in value.values():
+                links.append((registry.intern(source), registry.intern(target), reciprocal))
+        domain_links.append(links)
+    domain_gene_ids = [[registry.intern(gene) for gene in genes[domain]]
+                       for genes, domain in zip(all_domain_genes, domains)]
+    return combine_domain_links(registry.names, domain_links, domain_gene_ids, domains)
+
+
+class _DomainGeneIds:
+    """
+    Registry ids for matrix labels, plus ids past the end of the registry for
+    labels the coordinate file doesn't have (matrix columns may include them).
+    The shared registry itself is never extended.
+    """
+
+    def __init__(self, registry):
+        self.registry = registry
+        self.extra = {}
+
+    def ids(self, labels) -> list:
+        labels = list(labels)
+        ids = self.registry.ids(labels).tolist()
+        for i, gene_id in enumerate(ids):
+            if gene_id < 0:
+                ids[i] = len(self.registry) + self.extra.setdefault(labels[i], len(self.extra))
+        return ids
+
+    def links(self, links):
+        """(source_id, target_id, is_reciprocal) per link."""
+        return zip(self.ids(link["source"] for link in links), self.ids(link["target"] for link in links),
+                   (link["is_reciprocal"] for link in links))
+
+    @property
+    def names(self):
+        return np.concatenate([self.registry.names, np.array(list(self.extra), dtype=object)])
+
+
+def combine_domain_results(coords, domain_results):
+    """Combined-graph links for parse_domain_matrix results (uses their 'domain_name', 'links' and 'cutoff_index')."""
+    gene_ids = _DomainGeneIds(GeneRegistry.of(coords))
+    domain_links = [list(gene_ids.links(result["links"])) for result in domain_results]
+    domain_gene_ids = [gene_ids.ids(result["cutoff_index"]) for result in domain_results]
+    domains = [result["domain_name"] for result in domain_results]
+    return combine_domain_links(gene_ids.names, domain_links, domain_gene_ids, domains)
+
+
+def _domain_config():
+    return FileProcessingConfig(
         validation_mode="domain",
         parse_comma_separated_numbers=True,
         clean_whitespace=True,
         normalize_orientations=True,
-        handle_missing_values=True
+        handle_missing_values=True,
+        chunked_min_bytes=chunked_threshold_from_env()
     )
-    
+
+
+def load_domain_coordinates(coord_file, config=None, domain_file=None):
+    """
+    Load, validate and clean a coordinate file for domain-specific parsing.
+
+    Args:
+        coord_file: BytesIO object containing coordinate file data
+        config: Optional FileProcessingConfig (defaults to domain validation mode)
+        domain_file: Optional BytesIO with long-format domain coordinates
+            (protein, start, end, domain), pivoted into the domain columns
+
+    Returns:
+        pd.DataFrame: Cleaned coordinate data including domain columns
+    """
+    config = config or _domain_config()
+
     # Use data_structures for enhanced coordinate file validation and processing
-    coord_data_file = CoordinateFile(coord_file, config)
-    coord_data_file.load_data()
+    coord_data_file = CoordinateFile(coord_file, config, domain_file=domain_file)
+    with stage('coordinates.load') as s:
+        coord_data_file.load_data()
+        s.set(rows=len(coord_data_file.data))
     
     # Validate coordinate file with enhanced validation
-    if not coord_data_file.validate():
-        raise ValueError(f"Coordinate file validation failed: {', '.join(coord_data_file.validation_errors)}")
+    with stage('coordinates.validate'):
+        if not coord_data_file.validate():
+            raise ValueError(f"Coordinate file validation failed: {', '.join(coord_data_file.validation_errors)}")
     
     # Clean coordinate data with enhanced cleaning and domain columns
-    coords = coord_data_file.clean_with_domains()
-    domains = parse_filenames(file_names)
-    genomes = coords['genome'].unique().tolist()
+    with stage('coordinates.clean_with_domains') as s:
+        coords = coord_data_file.clean_with_domains()
+        s.set(rows=len(coords))
+    return coords
 
-    all_outputs = {}
 
-    genomes_output = []
-    all_domain_connections = []
-    all_domain_genes = []
-    total_genomes = set()
-    total_gene_list = []
+def parse_domain_matrix(matrix_file, coords, domain, config=None, label=None):
+    """
+    Compute the intermediate results for a single domain matrix.
 
-    for idx, matrix_file in enumerate(matrix_files, 1):
-        # Use data_structures for enhanced matrix validation
+    Everything returned here depends only on this matrix and the cleaned
+    coordinates, so it can be cached and reused when another domain's matrix
+    is replaced.
+
+    Args:
+        matrix_file: BytesIO object containing the domain's matrix file
+        coords: Cleaned coordinate DataFrame from load_domain_coordinates
+        domain: Domain name (e.g. 'LRR')
+        config: Optional FileProcessingConfig
+        label: How to refer to the matrix in error messages
+
+    Returns:
+        dict: 'domain_name', 'genomes', 'nodes', 'links' and 'cutoff_index'
+        for this domain (the combined graph is derived from links and cutoff_index)
+    """
+    config = config or _domain_config()
+    label = label or f"for domain {domain}"
+    genomes = coords['genome'].unique().tolist()
+
+    # Use data_structures for enhanced matrix validation
+    if use_chunked(matrix_file, config):
+        # Large CSV/TSV: stream the matrix in row blocks instead of loading it
+        with stage('domain_matrix', domain=domain, chunked=True):
+            result = parse_matrix_file_chunked(matrix_file, coords, config, skip_same_genome=True)
+            with stage('add_nodes', rows=len(coords), domain=domain):
+                nodes = add_nodes(coords, cutoff_index=set(result["cutoff_index"]), include_gene_type=True, include_domains=True)
+        return {
+            "domain_name": domain,
+            "genomes": genomes,
+            "nodes": nodes,
+            "links": result["links"],
+            "cutoff_index": list(result["cutoff_index"]),
+        }
+
+    with stage('domain_matrix', domain=domain):
         matrix_data_file = MatrixFile(matrix_file, config)
-        matrix_data_file.load_data()
+        with stage('matrix.precheck_load', domain=domain):
+            matrix_data_file.load_data()
         
         # Validate matrix file with enhanced validation
-        if not matrix_data_file.validate():
-            raise ValueError(f"Matrix file {idx} validation failed: {', '.join(matrix_data_file.validation_errors)}")
+        with stage('matrix.precheck_validate', domain=domain):
+            if not matrix_data_file.validate():
+                raise ValueError(f"Matrix file {label} validation failed: {', '.join(matrix_data_file.validation_errors)}")
         
         # Clean matrix data with enhanced cleaning
-        matrix_data_file.clean()
+        with stage('matrix.precheck_clean', domain=domain):
+            matrix_data_file.clean()
         
-        graph_output = {"domain_name": domains[idx - 1]}
         matrix_file.seek(0)
-        nodes, links, domain_connections, domain_genes, total_gene_list = create_output(parse_matrix_data(matrix_file, genomes, coords), coords, domains[idx - 1])
-        all_domain_connections.append(domain_connections)
-        all_domain_genes.append(domain_genes)
-        total_genomes.update(genomes)
-        graph_output["genomes"] = genomes
-        graph_output["nodes"] = nodes
-        graph_output["links"] = links
-        genomes_output.append(graph_output)
+        with stage('parse_matrix_data', domain=domain):
+            matrix_data = parse_matrix_data(matrix_file, genomes, coords, compute_maxes=config.link_engine != "blocks",
+                                            config=config)
+        nodes, links, _, _, cutoff_index = create_output(
+            matrix_data, coords, domain, max_workers=config.link_workers, connections=False)
+    return {
+        "domain_name": domain,
+        "genomes": genomes,
+        "nodes": nodes,
+        "links": links,
+        "cutoff_index": list(cutoff_index),
+    }
 
-    
-    #print(total_genomes)
 
+def assemble_domain_graphs(coords, domain_results, config=None):
+    """
+    Build the per-domain graphs plus the combined 'ALL' graph.
+
+    Args:
+        coords: Cleaned coordinate DataFrame
+        domain_results: List of parse_domain_matrix results, in domain order
+        config: FileProcessingConfig for the synteny block settings (domain defaults when None)
+
+    Returns:
+        list: List of graph outputs for each domain plus combined graph
+    """
+    config = config or _domain_config()
+    genomes_output = []
+    total_genomes = set()
+    for result in domain_results:
+        total_genomes.update(result["genomes"])
+        graph = {
+            "domain_name": result["domain_name"],
+            "genomes": result["genomes"],
+            "nodes": result["nodes"],
+            "links": result["links"],
+        }
+        # The ALL graph has no reciprocity flags, so blocks are per domain only
+        blocks = synteny_blocks_for(result["links"], coords, config)
+        if blocks is not None:
+            graph["blocks"] = blocks
+        genomes_output.append(graph)
+
+    # is_present on the combined graph is recomputed below, so the last domain's index is only a placeholder
+    total_gene_list = set(domain_results[-1]["cutoff_index"]) if domain_results else set()
     domain_graph_nodes = add_nodes(coords, cutoff_index=total_gene_list, include_gene_type=True, include_domains=True)
+    present_ids = set()
+    for graph in genomes_output:
+        present_ids.update(n["id"] for n in graph["nodes"] if n["is_present"])
     for node in domain_graph_nodes:
-        # Check if the node is present in all domain graphs
-        node["is_present"] = any(
-            any(n["id"] == node["id"] and n["is_present"] for n in graph["nodes"])
-            for graph in genomes_output
-        )
+        # Check if the node is present in any domain graph
+        node["is_present"] = node["id"] in present_ids
+
+    domains = [result["domain_name"] for result in domain_results]
+    with stage('combine_graphs', domains=len(domains)) as s:
+        combined_links = combine_domain_results(coords, domain_results)
+        s.set(edges=len(combined_links))
     domain_graph = {
         "domain_name": "ALL",
         "genomes": list(total_genomes),
         "nodes": domain_graph_nodes,
-        "links": combine_graphs(all_domain_connections, all_domain_genes, domains)
+        "links": combined_links
     }
 
     genomes_output.append(domain_graph)
@@ -181,11 +297,90 @@ def domain_parse(matrix_files, coord_file, file_names):
     return genomes_output
 
 
+def domain_parse(matrix_files, coord_file, file_names, return_state=False, domain_file=None, config=None):
+    """
+    Parse domain-specific matrix files and coordinate file using both file_utils and data_structures.
+    
+    Args:
+        matrix_files: List of BytesIO objects containing matrix file data
+        coord_file: BytesIO object containing coordinate file data
+        file_names: List of filenames for domain identification
+        return_state: Also return the per-domain intermediate results (for incremental re-generation)
+        domain_file: Optional BytesIO with long-format domain coordinates (Part1 combine_coords.py output)
+        config: Optional FileProcessingConfig replacing the default domain one
+    
+    Returns:
+        list: List of graph outputs for each domain plus combined graph, or a
+        (graphs, DomainState) tuple when return_state is True
+    """
+    # Create configuration for enhanced validation
+    config = config or _domain_config()
+    coords = load_domain_coordinates(coord_file, config, domain_file)
+    domains = parse_filenames(file_names)
+
+    domain_results = []
+    for idx, matrix_file in enumerate(matrix_files, 1):
+        domain_results.append(parse_domain_matrix(matrix_file, coords, domains[idx - 1], config, label=str(idx)))
+
+    genomes_output = assemble_domain_graphs(coords, domain_results, config)
+    if return_state:
+        return genomes_output, DomainState(coords, domain_results)
+    return genomes_output
+
+
+def regenerate_domain(state, action, domain=None, matrix_file=None, file_name=None):
+    """
+    Incrementally update a domain-specific parse.
+
+    Only the affected domain is recomputed; the cached coordinates and the
+    other domains' intermediate results are reused before the combined graph
+    is rebuilt.
+
+    Args:
+        state: DomainState from a previous domain_parse/regenerate_domain
+        action: 'replace', 'add' or 'remove'
+        domain: Domain name; derived from file_name when omitted
+        matrix_file: BytesIO with the new matrix (replace/add)
+        file_name: Matrix filename, used to derive the domain name
+
+    Returns:
+        tuple: (graphs, updated DomainState)
+    """
+    if domain is None and file_name:
+        parsed = parse_filenames([file_name])
+        domain = parsed[0] if parsed else None
+    if not domain:
+        raise ValueError("Could not determine which domain to update")
+
+    domain_results = list(state.domain_results)
+    if action == "remove":
+        del domain_results[state.index_of(domain)]
+        if not domain_results:
+            raise ValueError("Cannot remove the last domain of a project")
+    elif action in ("replace", "add"):
+        if matrix_file is None:
+            raise ValueError(f"A matrix file is required to {action} a domain")
+        if action == "add" and domain in state.domains:
+            raise ValueError(f"Domain {domain} already exists; use replace instead")
+        result = parse_domain_matrix(matrix_file, state.coords, domain)
+        if action == "replace":
+            domain_results[state.index_of(domain)] = result
+        else:
+            domain_results.append(result)
+    else:
+        raise ValueError(f"Unknown action: {action}")
+
+    new_state = DomainState(state.coords, domain_results)
+    return assemble_domain_graphs(new_state.coords, new_state.domain_results), new_state
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Parse matrix and coordinate files for genome visualization')
     parser.add_argument('matrix_files', type=str, nargs='+', help='Path(s) to 2 or 3 matrix Excel files')
     parser.add_argument('coord_file', type=str, help='Path to the coordinate Excel file')
     parser.add_argument('--output', '-o', type=str, help='Output JSON file path (optional, defaults to stdout)')
+    parser.add_argument('--domains', type=str,
+                        help='Long-format domain coordinate file (protein, start, end, domain) to add to the coordinates')
 
     args = parser.parse_args()
 
@@ -198,8 +393,9 @@ if __name__ == "__main__":
         # Open matrix files and coordinate file
         matrix_files = [open(f, 'rb') for f in args.matrix_files]
         file_names = [f.name for f in matrix_files]
+        domain_file = open(args.domains, 'rb') if args.domains else None
         with open(args.coord_file, 'rb') as coord_file:
-            result_obj = domain_parse(matrix_files, coord_file, file_names)
+            result_obj = domain_parse(matrix_files, coord_file, file_names, domain_file=domain_file)
             output_json = json.dumps(result_obj, indent=2)
 
             if args.output:
@@ -212,6 +408,8 @@ if __name__ == "__main__":
         # Close matrix files
         for f in matrix_files:
             f.close()
+        if domain_file:
+            domain_file.close()
 
     except Exception as e:
         print(f"Error: {str(e)}", file=sys.stderr)
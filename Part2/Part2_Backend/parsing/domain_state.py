@@ -0,0 +1,46 @@
+import json
+from typing import Any, Dict, List
+import pandas as pd
+
+STATE_VERSION = 2
+
+
+class DomainState:
+    """
+    Cached intermediate results of a domain-specific parse.
+
+    Holds the cleaned coordinate frame and, per domain, the outputs of
+    parse_domain_matrix (nodes, links, cutoff_index). Replacing one domain's matrix only needs that domain to
+    be recomputed before combine_graphs is rerun over the cached rest.
+    """
+
+    def __init__(self, coords: pd.DataFrame, domain_results: List[Dict[str, Any]]):
+        self.coords = coords
+        self.domain_results = list(domain_results)
+
+    @property
+    def domains(self) -> List[str]:
+        return [result["domain_name"] for result in self.domain_results]
+
+    def index_of(self, domain: str) -> int:
+        try:
+            return self.domains.index(domain)
+        except ValueError:
+            raise ValueError(f"Domain {domain} is not part of this project (domains: {', '.join(self.domains)})")
+
+    def to_bytes(self) -> bytes:
+        return json.dumps({
+            "version": STATE_VERSION,
+            # orient='split' keeps column order and writes NaN as null
+            "coords": json.loads(self.coords.to_json(orient='split')),
+            "domain_results": self.domain_results,
+        }).encode('utf-8')
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'DomainState':
+        payload = json.loads(data)
+        if payload.get("version") != STATE_VERSION:
+            raise ValueError("Cached domain state is from an incompatible version; please regenerate the graph")
+        split = payload["coords"]
+        coords = pd.DataFrame(split["data"], columns=split["columns"], index=split["index"])
+        return cls(coords, payload["domain_results"])
@@ -3,6 +3,8 @@ from core.coordinate_file import CoordinateFile
 from core.matrix_file import MatrixFile
 from core.config import FileProcessingConfig
 from core.domain_processor import DomainProcessor
+from core.gene_registry import GeneRegistry
+from parsing.instrumentation import stage
 
 
 def validate_matrix_coordinate_mapping(matrix_df: pd.DataFrame, coord_df: pd.DataFrame) -> None:
@@ -18,19 +20,10 @@ def validate_matrix_coordinate_mapping(matrix_df: pd.DataFrame, coord_df: pd.Dat
         )
 
 def create_genome_mappings(df_only_cutoffs, coords):
-    # Create a mapping of gene names to their genomes
-    gene_to_genome = dict(zip(coords['name'], coords['genome']))
-    
-    # Create the mappings using the gene_to_genome dictionary
-    row_to_subsection = pd.Series(index=df_only_cutoffs.index, dtype="object")
-    col_to_subsection = pd.Series(index=df_only_cutoffs.columns, dtype="object")
-
-    # Map each row and column to its genome using the gene_to_genome dictionary
-    for idx in df_only_cutoffs.index:
-        row_to_subsection[idx] = gene_to_genome.get(idx)
-    
-    for col in df_only_cutoffs.columns:
-        col_to_subsection[col] = gene_to_genome.get(col)
+    # Map each row and column to its genome through the shared gene registry
+    registry = GeneRegistry.of(coords)
+    row_to_subsection = pd.Series(registry.genome_labels(df_only_cutoffs.index), index=df_only_cutoffs.index, dtype="object")
+    col_to_subsection = pd.Series(registry.genome_labels(df_only_cutoffs.columns), index=df_only_cutoffs.columns, dtype="object")
 
     return row_to_subsection, col_to_subsection
 
@@ -112,7 +105,7 @@ def parse_coordinates(coord_file, include_domains=False):
             raise ValueError(f"Error processing coordinate file: {str(e)}")
         raise
 
-def parse_matrix_data(matrix_file, genomes, coord_df):
+def parse_matrix_data(matrix_file, genomes, coord_df, compute_maxes=True, config=None):
     """
     Parse matrix data using the new data structures.
     
@@ -120,37 +113,53 @@ def parse_matrix_data(matrix_file, genomes, coord_df):
         matrix_file: File object to parse
         genomes: List of genome names
         coord_df: Coordinate DataFrame for validation
+        compute_maxes: Build the row/column max frames; False leaves them to the
+            genome-pair block path (parsing/block_links.py) in create_output
+        config: Optional FileProcessingConfig (ingest settings; defaults when None)
     
     Returns:
         dict: Dictionary containing processed matrix data
     """
     try:
         # Create configuration
-        config = FileProcessingConfig()
+        config = config or FileProcessingConfig()
         
         # Create matrix file object
         matrix_file_obj = MatrixFile(matrix_file, config)
         
         # Load and validate data
-        matrix_file_obj.load_data()
+        with stage('matrix.load') as s:
+            matrix_file_obj.load_data()
+            s.set(rows=matrix_file_obj.data.shape[0], cols=matrix_file_obj.data.shape[1])
         
-        if not matrix_file_obj.validate():
-            validation_report = matrix_file_obj.get_validation_report()
-            raise ValueError(f"Matrix file validation failed: {validation_report['errors']}")
+        with stage('matrix.validate'):
+            if not matrix_file_obj.validate():
+                validation_report = matrix_file_obj.get_validation_report()
+                raise ValueError(f"Matrix file validation failed: {validation_report['errors']}")
         
         # Clean data (this applies cutoff)
-        cleaned_data = matrix_file_obj.clean()
+        with stage('matrix.clean') as s:
+            cleaned_data = matrix_file_obj.clean()
+            s.set(cells_above_cutoff=int(cleaned_data.notna().sum().sum()))
         
         # Validate matrix indices against coordinate names
-        validate_matrix_coordinate_mapping(cleaned_data, coord_df)
+        with stage('validate_matrix_coordinate_mapping'):
+            validate_matrix_coordinate_mapping(cleaned_data, coord_df)
 
         # Get data above cutoff (already done in clean(), but get it explicitly)
         df_only_cutoffs = cleaned_data
+        shape = {"rows": df_only_cutoffs.shape[0], "cols": df_only_cutoffs.shape[1]}
+
+        if not compute_maxes:
+            return {'df_only_cutoffs': df_only_cutoffs, 'row_max': None, 'col_max': None}
 
         # Create genome mappings and calculate maxes
-        row_to_subsection, col_to_subsection = create_genome_mappings(df_only_cutoffs, coord_df)
-        col_max = calculate_column_maxes(df_only_cutoffs, row_to_subsection)
-        row_max = calculate_row_maxes(df_only_cutoffs, col_to_subsection)
+        with stage('create_genome_mappings', **shape):
+            row_to_subsection, col_to_subsection = create_genome_mappings(df_only_cutoffs, coord_df)
+        with stage('calculate_column_maxes', **shape):
+            col_max = calculate_column_maxes(df_only_cutoffs, row_to_subsection)
+        with stage('calculate_row_maxes', **shape):
+            row_max = calculate_row_maxes(df_only_cutoffs, col_to_subsection)
 
         return {
             'df_only_cutoffs': df_only_cutoffs,
@@ -5,55 +5,95 @@ from parsing.file_utils import parse_matrix_data
 from core.matrix_file import MatrixFile
 from core.coordinate_file import CoordinateFile
 from core.config import FileProcessingConfig
-from parsing.graph_utils import create_output
+from parsing.graph_utils import create_output, add_nodes
+from parsing.chunked_matrix import use_chunked, parse_matrix_file_chunked, chunked_threshold_from_env
+from parsing.block_links import filter_links, parse_genome_pairs
+from parsing.synteny import synteny_blocks_for
+from parsing.instrumentation import stage
 
 
-def parse_matrix(matrix_file, coord_file):
+def parse_matrix(matrix_file, coord_file, genome_pairs=None, config=None):
     """
     Parse matrix and coordinate files using both file_utils and data_structures.
     
     Args:
         matrix_file: BytesIO object containing matrix file data
         coord_file: BytesIO object containing coordinate file data
+        genome_pairs: Optional list of (genome, genome) pairs; only links between
+            these genomes are computed (all nodes are still returned)
+        config: Optional FileProcessingConfig replacing the default general one
+            (e.g. to benchmark other ingest settings)
     
     Returns:
         dict: Graph data with nodes and links
     """
     # Create configuration for enhanced validation
-    config = FileProcessingConfig(
+    config = config or FileProcessingConfig(
         validation_mode="general",
         parse_comma_separated_numbers=True,
         clean_whitespace=True,
         normalize_orientations=True,
-        handle_missing_values=True
+        handle_missing_values=True,
+        chunked_min_bytes=chunked_threshold_from_env()
     )
     
     # Use data_structures for enhanced validation and processing
     coord_data_file = CoordinateFile(coord_file, config)
-    coord_data_file.load_data()
+    with stage('coordinates.load') as s:
+        coord_data_file.load_data()
+        s.set(rows=len(coord_data_file.data))
     
     # Validate coordinate file with enhanced validation
-    if not coord_data_file.validate():
-        raise ValueError(f"Coordinate file validation failed: {', '.join(coord_data_file.validation_errors)}")
+    with stage('coordinates.validate'):
+        if not coord_data_file.validate():
+            raise ValueError(f"Coordinate file validation failed: {', '.join(coord_data_file.validation_errors)}")
     
     # Clean coordinate data with enhanced cleaning
-    coords = coord_data_file.clean()
+    with stage('coordinates.clean') as s:
+        coords = coord_data_file.clean()
+        s.set(rows=len(coords))
+    
+    if use_chunked(matrix_file, config):
+        # Large CSV/TSV: stream the matrix in row blocks instead of loading it
+        result = parse_matrix_file_chunked(matrix_file, coords, config)
+        with stage('add_nodes', rows=len(coords)):
+            nodes = add_nodes(coords)
+        links = filter_links(result["links"], coords, genome_pairs)
+        return _with_blocks({"genomes": coords['genome'].unique().tolist(), "nodes": nodes, "links": links},
+                            coords, config)
     
     # Use data_structures for matrix validation
     matrix_data_file = MatrixFile(matrix_file, config)
-    matrix_data_file.load_data()
+    with stage('matrix.precheck_load'):
+        matrix_data_file.load_data()
     
     # Validate matrix file with enhanced validation
-    if not matrix_data_file.validate():
-        raise ValueError(f"Matrix file validation failed: {', '.join(matrix_data_file.validation_errors)}")
+    with stage('matrix.precheck_validate'):
+        if not matrix_data_file.validate():
+            raise ValueError(f"Matrix file validation failed: {', '.join(matrix_data_file.validation_errors)}")
     
     # Clean matrix data with enhanced cleaning
-    matrix_df = matrix_data_file.clean()
+    with stage('matrix.precheck_clean'):
+        matrix_df = matrix_data_file.clean()
     
     # Use file_utils for the core processing logic
-    matrix_data = parse_matrix_data(matrix_file, coords['genome'].unique().tolist(), coords)
+    with stage('parse_matrix_data'):
+        matrix_data = parse_matrix_data(matrix_file, coords['genome'].unique().tolist(), coords,
+                                        compute_maxes=config.link_engine != "blocks", config=config)
     
-    return create_output(matrix_data, coords)
+    with stage('create_output'):
+        output = create_output(matrix_data, coords, genome_pairs=genome_pairs, max_workers=config.link_workers)
+    if matrix_data['row_max'] is not None:
+        output["links"] = filter_links(output["links"], coords, genome_pairs)
+    return _with_blocks(output, coords, config)
+
+
+def _with_blocks(output, coords, config):
+    """Add the synteny blocks chained from the graph's reciprocal links (unless disabled)."""
+    blocks = synteny_blocks_for(output["links"], coords, config)
+    if blocks is not None:
+        output["blocks"] = blocks
+    return output
 
 
 if __name__ == "__main__":
@@ -65,13 +105,14 @@ if __name__ == "__main__":
     parser.add_argument('matrix_file', type=str, help='Path to matrix Excel file')
     parser.add_argument('coord_file', type=str, help='Path to the coordinate Excel file')
     parser.add_argument('--output', '-o', type=str, help='Output JSON file path (optional, defaults to stdout)')
+    parser.add_argument('--pairs', type=str, help="Only compute links between these genome pairs, e.g. 'A:B,A:C'")
 
     args = parser.parse_args()
 
     try:
         # Open matrix file and coordinate file
         with open(args.matrix_file, 'rb') as matrix_file, open(args.coord_file, 'rb') as coord_file:
-            result_obj = parse_matrix(matrix_file, coord_file)
+            result_obj = parse_matrix(matrix_file, coord_file, parse_genome_pairs(args.pairs))
             output_json = json.dumps(result_obj, indent=2)
 
             if args.output:
@@ -0,0 +1,214 @@
+"""
+Differences between two graph results (two saved projects, two staged
+results, or two runs at different cutoffs).
+
+Graphs are paired by domain_name. Node ids are interned to ints shared by
+both sides, each link becomes one int64 key (source id * n + target id), and
+added/removed/common links fall out of merges on the sorted key arrays, so
+the cost is a sort per side rather than a Python set of tuples. Link rows are
+compact lists, ``[source, target, type, score]``. The type is the combined
+graph's link_type (solid_color, dotted_color, ...) or reciprocal/one_way for
+per-domain and general graphs.
+
+``iter_diff_json`` streams the document in chunks for large graphs.
+"""
+import json
+from typing import Any, Dict, Iterator, List, Tuple
+
+import numpy as np
+
+LINK_COLUMNS = ["source", "target", "type", "score"]
+
+
+def link_type(link: Dict[str, Any]) -> str:
+    """A link's type: link_type on combined graphs, reciprocity elsewhere."""
+    if link.get("link_type"):
+        return link["link_type"]
+    return "reciprocal" if link.get("is_reciprocal") else "one_way"
+
+
+def _as_graph_list(result) -> List[Dict[str, Any]]:
+    if isinstance(result, dict):
+        # A stored response body ({"graphs": [...]}) or a single graph
+        return result["graphs"] if "graphs" in result else [result]
+    return list(result)
+
+
+class _Interner:
+    """Dense int ids for names, shared by both sides of a diff."""
+
+    def __init__(self):
+        self.index: Dict[Any, int] = {}
+        self.names: List[Any] = []
+
+    def add(self, names) -> None:
+        index = self.index
+        for name in names:
+            if name not in index:
+                index[name] = len(self.names)
+                self.names.append(name)
+
+    def ids(self, names: List[Any]) -> np.ndarray:
+        index = self.index
+        return np.fromiter((index[name] for name in names), dtype=np.int64, count=len(names))
+
+
+def _link_keys(links: List[Dict[str, Any]], interner: _Interner) -> Tuple[np.ndarray, np.ndarray]:
+    """Sorted unique link keys and the position of each key's first link."""
+    size = max(len(interner.names), 1)
+    keys = interner.ids([link["source"] for link in links]) * size + interner.ids([link["target"] for link in links])
+    return np.unique(keys, return_index=True)
+
+
+def _row(link: Dict[str, Any]) -> list:
+    return [link["source"], link["target"], link_type(link), link.get("score")]
+
+
+def diff_graph(base: Dict[str, Any], compare: Dict[str, Any], score_tolerance: float = 0.0) -> Dict[str, Any]:
+    """
+    Node and link changes from one graph to another.
+
+    Args:
+        base: Graph dict ('nodes', 'links')
+        compare: Graph dict to compare with base
+        score_tolerance: Score differences up to this are not reported
+
+    Returns:
+        dict with 'nodes' (added/removed ids, changed fields as [old, new]),
+        'links' (added/removed rows, type_changed and score_changed as
+        [source, target, old, new]) and 'summary' counts
+    """
+    base_nodes = {node["id"]: node for node in base.get("nodes", [])}
+    compare_nodes = {node["id"]: node for node in compare.get("nodes", [])}
+    base_links, compare_links = base.get("links", []), compare.get("links", [])
+
+    interner = _Interner()
+    for graph_nodes, graph_links in ((base_nodes, base_links), (compare_nodes, compare_links)):
+        interner.add(graph_nodes)
+        interner.add(link["source"] for link in graph_links)
+        interner.add(link["target"] for link in graph_links)
+
+    # Nodes
+    base_ids = np.unique(interner.ids(list(base_nodes)))
+    compare_ids = np.unique(interner.ids(list(compare_nodes)))
+    added_nodes = [interner.names[i] for i in np.setdiff1d(compare_ids, base_ids, assume_unique=True)]
+    removed_nodes = [interner.names[i] for i in np.setdiff1d(base_ids, compare_ids, assume_unique=True)]
+    changed_nodes = []
+    for i in np.intersect1d(base_ids, compare_ids, assume_unique=True):
+        name = interner.names[i]
+        old, new = base_nodes[name], compare_nodes[name]
+        if old != new:
+            fields = {key: [old.get(key), new.get(key)] for key in old.keys() | new.keys() if old.get(key) != new.get(key)}
+            changed_nodes.append({"id": name, "fields": dict(sorted(fields.items()))})
+
+    # Links: merges on sorted int keys
+    base_keys, base_first = _link_keys(base_links, interner)
+    compare_keys, compare_first = _link_keys(compare_links, interner)
+    _, in_base, in_compare = np.intersect1d(base_keys, compare_keys, assume_unique=True, return_indices=True)
+    # Added/removed in their graph's order
+    added = np.sort(compare_first[~np.isin(compare_keys, base_keys, assume_unique=True)])
+    removed = np.sort(base_first[~np.isin(base_keys, compare_keys, assume_unique=True)])
+
+    type_changed, score_changed = [], []
+    # Common links in base order
+    order = np.argsort(base_first[in_base], kind='stable')
+    for b, c in zip(base_first[in_base][order].tolist(), compare_first[in_compare][order].tolist()):
+        old, new = base_links[b], compare_links[c]
+        old_type, new_type = link_type(old), link_type(new)
+        if old_type != new_type:
+            type_changed.append([old["source"], old["target"], old_type, new_type])
+        old_score, new_score = old.get("score"), new.get("score")
+        if old_score != new_score and (old_score is None or new_score is None
+                                       or abs(new_score - old_score) > score_tolerance):
+            score_changed.append([old["source"], old["target"], old_score, new_score])
+
+    links = {
+        "columns": LINK_COLUMNS,
+        "added": [_row(compare_links[i]) for i in added.tolist()],
+        "removed": [_row(base_links[i]) for i in removed.tolist()],
+        "type_changed": type_changed,
+        "score_changed": score_changed,
+    }
+    return {
+        "domain_name": compare.get("domain_name", base.get("domain_name")),
+        "summary": {
+            "nodes_added": len(added_nodes),
+            "nodes_removed": len(removed_nodes),
+            "nodes_changed": len(changed_nodes),
+            "links_added": len(links["added"]),
+            "links_removed": len(links["removed"]),
+            "links_type_changed": len(type_changed),
+            "links_score_changed": len(score_changed),
+        },
+        "nodes": {"added": added_nodes, "removed": removed_nodes, "changed": changed_nodes},
+        "links": links,
+    }
+
+
+def _pair_graphs(base_result, compare_result):
+    base = {graph.get("domain_name", "general"): graph for graph in _as_graph_list(base_result)}
+    compare = {graph.get("domain_name", "general"): graph for graph in _as_graph_list(compare_result)}
+    pairs = [(name, base[name], compare[name]) for name in compare if name in base]
+    header = {
+        "added_graphs": [name for name in compare if name not in base],
+        "removed_graphs": [name for name in base if name not in compare],
+    }
+    return header, pairs
+
+
+def diff_results(base_result, compare_result, score_tolerance: float = 0.0) -> Dict[str, Any]:
+    """
+    Diff two graph results (lists of graphs, as /generate_graph and saved projects hold them).
+
+    Returns:
+        dict: 'added_graphs'/'removed_graphs' (domain names on one side only)
+        and 'graphs', one diff_graph document per domain present in both
+    """
+    header, pairs = _pair_graphs(base_result, compare_result)
+    return {**header, "graphs": [diff_graph(base, compare, score_tolerance) for _, base, compare in pairs]}
+
+
+def _iter_json(value, chunk_rows: int) -> Iterator[str]:
+    """JSON text for value, with long lists emitted chunk_rows items at a time."""
+    if isinstance(value, dict):
+        yield "{"
+        for i, (key, item) in enumerate(value.items()):
+            yield ("," if i else "") + json.dumps(key) + ":"
+            yield from _iter_json(item, chunk_rows)
+        yield "}"
+    elif isinstance(value, list) and len(value) > chunk_rows:
+        yield "["
+        for start in range(0, len(value), chunk_rows):
+            yield ("," if start else "") + ",".join(json.dumps(item) for item in value[start:start + chunk_rows])
+        yield "]"
+    else:
+        yield json.dumps(value)
+
+
+def iter_diff_json(base_result, compare_result, score_tolerance: float = 0.0,
+                   chunk_rows: int = 5000) -> Iterator[bytes]:
+    """
+    Stream the diff_results document as UTF-8 JSON chunks.
+
+    Graphs are diffed one at a time as the stream is consumed, and long
+    node/link lists are written chunk_rows rows per chunk.
+    """
+    header, pairs = _pair_graphs(base_result, compare_result)
+    yield (json.dumps(header)[:-1] + ',"graphs":[').encode('utf-8')
+    for i, (_, base, compare) in enumerate(pairs):
+        if i:
+            yield b","
+        parts = []
+        for text in _iter_json(diff_graph(base, compare, score_tolerance), chunk_rows):
+            parts.append(text)
+            if len(parts) >= 64:
+                yield "".join(parts).encode('utf-8')
+                parts = []
+        if parts:
+            yield "".join(parts).encode('utf-8')
+    yield b"]}"
+
+
+def load_result(data) -> List[Dict[str, Any]]:
+    """Graph list from stored/staged result bytes."""
+    return _as_graph_list(json.loads(data))
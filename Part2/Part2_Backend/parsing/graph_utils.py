@@ -1,14 +1,31 @@
 import pandas as pd
+from core.coordinate_index import CoordinateIndex
+from parsing.instrumentation import stage
+from parsing.layout import compute_layout
 
 
-def create_output(matrix_data, coords, domain=None):
+def _links(matrix_data, coords, genome_pairs=None, max_workers=None, **kwargs):
+    # Without precomputed maxima, compute links per genome-pair block
+    if matrix_data.get('row_max') is None:
+        from parsing.block_links import block_links
+        return block_links(matrix_data['df_only_cutoffs'], coords, genome_pairs=genome_pairs,
+                           max_workers=max_workers, **kwargs)
+    return add_links(matrix_data['df_only_cutoffs'], matrix_data['row_max'], matrix_data['col_max'], coords, **kwargs)
+
+
+def create_output(matrix_data, coords, domain=None, genome_pairs=None, max_workers=None, connections=True):
     """
     Create graph output from matrix and coordinate data.
     
     Args:
-        matrix_data: Dictionary containing 'df_only_cutoffs', 'row_max', 'col_max'
+        matrix_data: Dictionary containing 'df_only_cutoffs' and optionally 'row_max', 'col_max'
+            (when they are absent, links are computed per genome-pair block)
         coords: DataFrame with coordinate data
         domain: Optional domain name for domain-specific processing
+        genome_pairs: Optional (genome, genome) pairs to limit links to (block path only)
+        max_workers: Worker threads for the block path
+        connections: Domain case only; False skips building domain_connections/domain_genes
+            (returned as None)
     
     Returns:
         For general case: dict with 'genomes', 'nodes', 'links'
@@ -19,34 +36,57 @@ def create_output(matrix_data, coords, domain=None):
     if domain is None:
         # General case
         output = {"genomes": genomes}
-        output["nodes"] = add_nodes(coords)
-        output["links"] = add_links(
-            matrix_data['df_only_cutoffs'], 
-            matrix_data['row_max'], 
-            matrix_data['col_max'], 
-            coords
-        )
+        with stage('add_nodes', rows=len(coords)) as s:
+            output["nodes"] = add_nodes(coords)
+            s.set(nodes=len(output["nodes"]))
+        with stage('add_links', rows=matrix_data['df_only_cutoffs'].shape[0], cols=matrix_data['df_only_cutoffs'].shape[1]) as s:
+            output["links"] = _links(matrix_data, coords, genome_pairs, max_workers)
+            s.set(edges=len(output["links"]))
         return output
     else:
         # Domain case
-        nodes = add_nodes(
-            coords, 
-            cutoff_index=matrix_data['df_only_cutoffs'].index, 
-            include_gene_type=True, 
-            include_domains=True
-        )
-        links, domain_connections, domain_genes = add_links(
-            matrix_data['df_only_cutoffs'],
-            matrix_data['row_max'],
-            matrix_data['col_max'],
-            coords,
-            genomes=genomes,
-            domain=domain,
-            return_connections=True
-        )
+        with stage('add_nodes', rows=len(coords), domain=domain) as s:
+            nodes = add_nodes(
+                coords, 
+                cutoff_index=matrix_data['df_only_cutoffs'].index, 
+                include_gene_type=True, 
+                include_domains=True
+            )
+            s.set(nodes=len(nodes))
+        with stage('add_links', rows=matrix_data['df_only_cutoffs'].shape[0], cols=matrix_data['df_only_cutoffs'].shape[1], domain=domain) as s:
+            if connections:
+                links, domain_connections, domain_genes = _links(
+                    matrix_data,
+                    coords,
+                    genome_pairs,
+                    max_workers,
+                    genomes=genomes,
+                    domain=domain,
+                    return_connections=True
+                )
+            else:
+                links = _links(matrix_data, coords, genome_pairs, max_workers, genomes=genomes)
+                domain_connections = domain_genes = None
+            s.set(edges=len(links))
         return nodes, links, domain_connections, domain_genes, matrix_data['df_only_cutoffs'].index
 
 
+def add_layout(graphs):
+    """
+    Attach the precomputed diagram layout (see parsing/layout.py) to each graph.
+
+    Args:
+        graphs: Graph dicts with 'genomes', 'nodes' and 'links'
+
+    Returns:
+        The same graphs, each with a 'layout' key
+    """
+    for graph in graphs:
+        with stage('layout', nodes=len(graph["nodes"]), edges=len(graph["links"])):
+            graph["layout"] = compute_layout(graph)
+    return graphs
+
+
 def add_nodes(coords, cutoff_index=None, include_gene_type=False, include_domains=False):
     """
     Create node dictionaries for graph output.
@@ -58,27 +98,7 @@ def add_nodes(coords, cutoff_index=None, include_gene_type=False, include_domain
     Returns:
         List of node dicts
     """
-    nodes = []
-    for i in range(len(coords)):
-        node_data = {
-            "id": coords['name'][i],
-            "genome_name": coords['genome'][i],
-            "protein_name": coords['protein_name'][i],
-            "direction": coords['orientation'][i],
-            "rel_position": int(coords['rel_position'][i]),
-        }
-        if include_gene_type and 'gene_type' in coords.columns:
-            node_data["gene_type"] = coords['gene_type'][i]
-        if cutoff_index is not None:
-            node_data["is_present"] = coords['name'][i] in cutoff_index
-        if include_domains:
-            domain_cols = [col for col in coords.columns if 'domain' in col]
-            for col in domain_cols:
-                if col.endswith('_start') or col.endswith('_end'):
-                    value = coords[col][i]
-                    node_data[col] = None if pd.isna(value) else value
-        nodes.append(node_data)
-    return nodes
+    return CoordinateIndex.of(coords).nodes(cutoff_index, include_gene_type, include_domains)
 
 
 def add_links(df_only_cutoffs, row_max, col_max, coords, genomes=None, domain=None, return_connections=False):
@@ -0,0 +1,187 @@
+"""
+Hot-path instrumentation for graph generation.
+
+Parsing code wraps each stage in ``stage(...)``:
+
+    with stage('calculate_row_maxes', rows=len(df)) as s:
+        row_max = ...
+        s.set(cells=row_max.size)
+
+Nothing is recorded unless a collector is active for the current context
+(see ``collect_timings``); otherwise ``stage`` returns a shared no-op object,
+so the disabled cost is one context-variable lookup per stage.
+
+tracemalloc is process-wide, so allocation deltas are only recorded while the
+tracing collector is the only one active: a collector asking for memory while
+another is running gets timings only, and a stage that overlaps another
+collector's run drops its memory fields.
+"""
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+logger = logging.getLogger('pipeline.timings')
+
+_collector: ContextVar[Optional['TimingCollector']] = ContextVar('pipeline_timing_collector', default=None)
+
+# Collectors currently active in the process, and how many have ever started (to spot overlapping runs)
+_active_lock = threading.Lock()
+_active_collectors = 0
+_collectors_started = 0
+
+
+def timings_enabled_by_default() -> bool:
+    """PIPELINE_TIMINGS=1 turns on collection (and structured logs) for every request."""
+    return os.getenv('PIPELINE_TIMINGS', '').lower() in ('1', 'true', 'yes')
+
+
+def _peak_rss_kib() -> Optional[int]:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS, KiB on Linux
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+class _NoopStage:
+    """Returned by stage() when instrumentation is off."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **sizes):
+        pass
+
+
+_NOOP = _NoopStage()
+
+
+class _Stage:
+    def __init__(self, collector: 'TimingCollector', name: str, sizes: Dict[str, Any]):
+        self.collector = collector
+        self.name = name
+        self.sizes = sizes
+
+    def set(self, **sizes):
+        """Record input/output sizes (rows, cols, edges, ...) discovered inside the stage."""
+        self.sizes.update(sizes)
+
+    def __enter__(self):
+        self.depth = self.collector._depth
+        self.collector._depth += 1
+        if self.collector.trace_memory:
+            self.mem_start = tracemalloc.get_traced_memory()[0]
+            self.collectors_started = _collectors_started
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self.start
+        self.collector._depth -= 1
+        record = {
+            "stage": self.name,
+            "seconds": round(seconds, 6),
+            "depth": self.depth,
+            **self.sizes,
+        }
+        if self.collector.trace_memory and _collectors_started == self.collectors_started:
+            current, peak = tracemalloc.get_traced_memory()
+            record["alloc_kib"] = round((current - self.mem_start) / 1024, 1)
+            record["traced_peak_kib"] = round(peak / 1024, 1)
+        peak_rss = _peak_rss_kib()
+        if peak_rss is not None:
+            record["peak_rss_kib"] = peak_rss
+        if exc_type is not None:
+            record["error"] = exc_type.__name__
+        self.collector.records.append(record)
+        if self.collector.log:
+            logger.info(json.dumps({"event": "pipeline_stage", **self.collector.context, **record}))
+        return False
+
+
+class TimingCollector:
+    """Collects stage records for one request/run."""
+
+    def __init__(self, trace_memory: bool = False, log: bool = False, context: Dict[str, Any] = None):
+        self.trace_memory = trace_memory
+        self.log = log
+        self.context = context or {}
+        self.records: List[Dict[str, Any]] = []
+        self._depth = 0
+        self._start = time.perf_counter()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "total_seconds": round(time.perf_counter() - self._start, 6),
+            "stages": self.records,
+        }
+
+
+def stage(name: str, **sizes):
+    """Time a pipeline stage if a collector is active, otherwise do nothing."""
+    collector = _collector.get()
+    if collector is None:
+        return _NOOP
+    return _Stage(collector, name, sizes)
+
+
+@contextmanager
+def collect_timings(enabled: bool = True, trace_memory: bool = False, log: bool = None, **context):
+    """
+    Activate stage collection for the duration of the block.
+
+    Args:
+        enabled: When False, yields None and instrumentation stays a no-op
+        trace_memory: Also record tracemalloc allocation deltas (slower); ignored
+            while another collector is active
+        log: Emit one structured JSON log line per stage (defaults to PIPELINE_TIMINGS)
+        context: Extra fields attached to every log line (e.g. request id)
+
+    Yields:
+        The TimingCollector, or None when disabled
+    """
+    global _active_collectors, _collectors_started
+    if not enabled:
+        yield None
+        return
+
+    with _active_lock:
+        _active_collectors += 1
+        _collectors_started += 1
+        trace_memory = trace_memory and _active_collectors == 1
+        started_tracing = trace_memory and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+    collector = TimingCollector(
+        trace_memory=trace_memory,
+        log=timings_enabled_by_default() if log is None else log,
+        context=context,
+    )
+    token = _collector.set(collector)
+    try:
+        yield collector
+    finally:
+        _collector.reset(token)
+        with _active_lock:
+            _active_collectors -= 1
+            if started_tracing:
+                tracemalloc.stop()
+        if collector.log:
+            summary = collector.to_dict()
+            logger.info(json.dumps({"event": "pipeline_summary", **context,
+                                    "total_seconds": summary["total_seconds"], "stage_count": len(summary["stages"])}))
@@ -1,5 +1,10 @@
 import pandas as pd
 from io import BytesIO
+from parsing.instrumentation import stage
+from parsing.xlsx_reader import read_xlsx
+from core.binary_matrix import BinaryMatrix, is_binary_matrix
+
+DOMAIN_COORDINATE_COLUMNS = ['protein_id', 'start', 'end', 'domain']
 
 def parse_filenames(file_names):
     domains = []
@@ -15,8 +20,9 @@ def parse_filenames(file_names):
 
 def validate_file_extension(filename: str, file_type: str) -> None:
     valid_extensions = {
-        'matrix': ['.xlsx', '.csv', '.tsv'],
-        'coordinate': ['.xlsx', '.csv', '.tsv']
+        'matrix': ['.xlsx', '.csv', '.tsv', '.pmx'],
+        'coordinate': ['.xlsx', '.csv', '.tsv'],
+        'domain_coordinate': ['.xlsx', '.csv', '.tsv']
     }
     if not any(filename.lower().endswith(ext) for ext in valid_extensions[file_type]):
         raise ValueError(
@@ -24,20 +30,130 @@ def validate_file_extension(filename: str, file_type: str) -> None:
             ", ".join(ext.upper() for ext in valid_extensions[file_type])
         )
 
-def read_file(file, file_type: str) -> pd.DataFrame:
-    """Read a file into a pandas DataFrame based on its extension."""
-    if hasattr(file, 'name'):
-        filename = file.name.lower()
+def _csv_engine(config) -> str:
+    engine = getattr(config, 'csv_engine', 'c') if config else 'c'
+    if engine in ('pyarrow', 'auto'):
+        try:
+            import pyarrow  # noqa: F401
+            return 'pyarrow'
+        except ImportError:
+            if engine == 'pyarrow':
+                raise ValueError("csv_engine='pyarrow' requires the pyarrow package")
+    return 'c'
+
+def _read_pyarrow(raw: bytes, sep: str, text_columns) -> pd.DataFrame:
+    """
+    Read CSV/TSV bytes with pyarrow.csv (multithreaded), typing text columns up front.
+
+    pandas' pyarrow engine infers every column and only applies dtype
+    afterwards, so a label like '000123' would come back as '123'. text_columns
+    takes the header names and returns the ones to read as strings.
+    """
+    import pyarrow as pa
+    from pyarrow import csv as pa_csv
+
+    parse_options = pa_csv.ParseOptions(delimiter=sep)
+    try:
+        names = pa_csv.read_csv(BytesIO(raw.split(b'\n', 1)[0] + b'\n'), parse_options=parse_options).column_names
+        table = pa_csv.read_csv(BytesIO(raw), parse_options=parse_options, convert_options=pa_csv.ConvertOptions(
+            column_types={name: pa.string() for name in text_columns(names)},
+            strings_can_be_null=True,
+        ))
+    except pa.ArrowInvalid as e:
+        raise pd.errors.ParserError(str(e)) from e
+    # Columns with no values at all come back as null; read them as empty scores like the C parser
+    return table.cast(pa.schema([field.with_type(pa.float64()) if pa.types.is_null(field.type) else field
+                                 for field in table.schema])).to_pandas()
+
+def _read_matrix(raw: bytes, sep: str, config) -> pd.DataFrame:
+    """
+    Read a delimited score matrix: row identifiers as text, scores as one float block.
+
+    The C parser hands back one block per column; copying the scores into a
+    single float array up front makes the later dropna/copy/cutoff passes over
+    the matrix several times faster. Non-numeric matrices are returned as
+    parsed so validation can report them.
+    """
+    engine = _csv_engine(config)
+    if engine == 'pyarrow':
+        df = _read_pyarrow(raw, sep, lambda names: names[:1])
+        df = df.set_index(df.columns[0])
+        if df.index.name == '':
+            df.index.name = None
+    else:
+        df = pd.read_csv(BytesIO(raw), sep=sep, encoding='utf-8', index_col=0, dtype={0: str})
+
+    if len(df.columns) and all(pd.api.types.is_numeric_dtype(dtype) for dtype in df.dtypes):
+        body = pd.DataFrame(df.to_numpy(dtype=config.matrix_float_dtype), columns=df.columns)
+    else:
+        body = df.reset_index(drop=True)
+    body.insert(0, df.index.name if df.index.name is not None else 'Unnamed: 0', df.index.to_numpy(),
+                allow_duplicates=True)
+    return body
+
+def _read_delimited(raw: bytes, sep: str, file_type: str, config) -> pd.DataFrame:
+    """
+    Read CSV/TSV bytes, with an explicit schema when a config is given.
+
+    Matrix files get a text first column and float scores (see _read_matrix);
+    coordinate files get text for every string/categorical column in
+    column_specifications. If a coordinate file doesn't fit the schema, fall
+    back to plain inference so validation reports the problem as it always has.
+    """
+    if config is None or not config.typed_ingest:
+        return pd.read_csv(BytesIO(raw), sep=sep, encoding='utf-8')
+    if file_type == 'matrix':
+        return _read_matrix(raw, sep, config)
+
+    # Header only, to map dtypes onto the (de-duplicated) column names
+    columns = list(pd.read_csv(BytesIO(raw), sep=sep, encoding='utf-8', nrows=0).columns)
+    engine = _csv_engine(config)
+    dtype = config.coordinate_structure.get_read_dtypes(columns)
+    options = {}
+    if config.parse_comma_separated_numbers and engine == 'c':
+        # Quoted "1,253,689" positions parse as numbers directly
+        options['thousands'] = ','
+
+    try:
+        if engine == 'pyarrow':
+            return _read_pyarrow(raw, sep, lambda names: [name for name in names if name in dtype])
+        return pd.read_csv(BytesIO(raw), sep=sep, encoding='utf-8', dtype=dtype, engine=engine, **options)
+    except pd.errors.ParserError:
+        raise
+    except (ValueError, TypeError):
+        return pd.read_csv(BytesIO(raw), sep=sep, encoding='utf-8')
+
+def read_file(file, file_type: str, config=None, filename: str = None) -> pd.DataFrame:
+    """
+    Read a file into a pandas DataFrame based on its extension.
+
+    Args:
+        file: File object to read
+        file_type: 'matrix' or 'coordinate'
+        config: Optional FileProcessingConfig; enables the typed CSV/TSV ingest path
+        filename: Name used for format detection when the file object has none
+    """
+    name = getattr(file, 'name', None) or (filename if filename and filename != 'unknown' else None)
+    if name:
+        filename = name.lower()
         validate_file_extension(filename, file_type)
     else:
         filename = 'temp.xlsx'
     try:
-        if filename.endswith('.csv'):
-            df = pd.read_csv(BytesIO(file.read()), encoding='utf-8')
-        elif filename.endswith('.tsv'):
-            df = pd.read_csv(BytesIO(file.read()), sep='\t', encoding='utf-8')
-        else:
-            df = pd.read_excel(BytesIO(file.read()), engine='openpyxl')
+        with stage('read_file', file_type=file_type, format=filename.rsplit('.', 1)[-1]) as s:
+            if is_binary_matrix(filename):
+                # Label column + scores, the same shape the other readers return
+                df = BinaryMatrix.open(file).to_frame().reset_index(names='Unnamed: 0')
+                s.set(rows=len(df), cols=len(df.columns))
+                return df
+            raw = file.read()
+            if filename.endswith('.csv'):
+                df = _read_delimited(raw, ',', file_type, config)
+            elif filename.endswith('.tsv'):
+                df = _read_delimited(raw, '\t', file_type, config)
+            else:
+                df = read_xlsx(raw, file_type, config)
+            s.set(bytes=len(raw), rows=len(df), cols=len(df.columns))
         return df
     except UnicodeDecodeError:
         raise ValueError("File encoding error. Please ensure the file is UTF-8 encoded.")
@@ -47,4 +163,42 @@ def read_file(file, file_type: str) -> pd.DataFrame:
         elif filename.endswith('.tsv'):
             raise ValueError("TSV parsing error. Please ensure the file is properly formatted with tab separators.")
         else:
-            raise ValueError(f"Excel parsing error: {str(e)}") 
\ No newline at end of file
+            raise ValueError(f"Excel parsing error: {str(e)}")
+
+
+def read_domain_coordinates(file, filename: str = None) -> pd.DataFrame:
+    """
+    Read a long-format domain coordinate file: one (protein, start, end, domain) row
+    per domain hit, as written by Part1's combine_coords.py.
+
+    The file may be CSV, TSV or xlsx, with or without a header row. start/end are
+    returned as floats, NaN where they are not numbers (reported by validation).
+    """
+    name = getattr(file, 'name', None) or (filename if filename and filename != 'unknown' else None)
+    filename = name.lower() if name else 'temp.csv'
+    validate_file_extension(filename, 'domain_coordinate')
+    raw = file.read()
+    try:
+        with stage('read_file', file_type='domain_coordinate', format=filename.rsplit('.', 1)[-1]) as s:
+            if filename.endswith('.xlsx'):
+                df = pd.read_excel(BytesIO(raw), header=None, dtype=str)
+            else:
+                df = pd.read_csv(BytesIO(raw), sep='\t' if filename.endswith('.tsv') else ',', header=None,
+                                 dtype=str, encoding='utf-8', skipinitialspace=True)
+            s.set(bytes=len(raw), rows=len(df))
+    except UnicodeDecodeError:
+        raise ValueError("File encoding error. Please ensure the file is UTF-8 encoded.")
+    except pd.errors.ParserError:
+        raise ValueError("Domain coordinate file parsing error. Expected rows of protein, start, end, domain.")
+    if df.shape[1] != len(DOMAIN_COORDINATE_COLUMNS):
+        raise ValueError(f"Domain coordinate file must have 4 columns (protein, start, end, domain), found {df.shape[1]}")
+
+    df.columns = DOMAIN_COORDINATE_COLUMNS
+    # A header row is one whose start is not a number
+    if len(df) and pd.isna(pd.to_numeric(df['start'].iloc[0], errors='coerce')):
+        df = df.iloc[1:].reset_index(drop=True)
+    for column in ('protein_id', 'domain'):
+        df[column] = df[column].str.strip()
+    for column in ('start', 'end'):
+        df[column] = pd.to_numeric(df[column], errors='coerce').astype('float64')
+    return df
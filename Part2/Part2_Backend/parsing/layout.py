@@ -0,0 +1,83 @@
+"""
+Precomputed track layout for the diagram view.
+
+The frontend (Part2_Frontend/src/lib/Chart.svelte) lays a graph out as one
+horizontal track per genome with nodes at their rel_position. With more than
+two genomes the first genome is repeated as a bottom track, and links that
+skip a track are redrawn to that copy. Links within one genome are hidden.
+Doing this per load in the browser means id lookups for every link, which
+hangs on 20k-node graphs. compute_layout does the same work with vectorized
+index lookups and returns flat arrays:
+
+    {
+      "rows": ["A", "B", "C", "A"],        # track order (last row: copy of the first genome)
+      "nodes": {"row": [...]},             # track per layout node: graph nodes, then the copies
+      "duplicates": [...],                 # graph node index of each copy, in order
+      "links": {"source": [...], "target": [...],          # layout node indices (-1: unknown node)
+                "visible": [...]}
+    }
+
+Link arrays follow the graph's link order. x positions are the nodes'
+rel_position and are not repeated here. The diagram shows a 2-3 genome
+selection, so the browser (Part2_Frontend/src/lib/layout.ts) redoes the track
+assignment for that selection from these endpoint indices, which is linear in
+nodes and links.
+"""
+import os
+from typing import Any, Dict
+
+import numpy as np
+import pandas as pd
+
+
+def layout_enabled_by_default() -> bool:
+    """GRAPH_LAYOUT=1 adds the layout to every generated graph unless the request says otherwise."""
+    return os.getenv('GRAPH_LAYOUT', '').lower() in ('1', 'true', 'yes')
+
+
+def compute_layout(graph: Dict[str, Any]) -> Dict[str, Any]:
+    """Track order, node tracks and link endpoints for one graph dict."""
+    genomes = list(graph.get("genomes") or [])
+    nodes, links = graph.get("nodes", []), graph.get("links", [])
+    n = len(nodes)
+
+    node_ids = pd.Index([node["id"] for node in nodes])
+    node_genomes = np.array([node.get("genome_name") for node in nodes], dtype=object)
+    rows = pd.Index(genomes).get_indexer(node_genomes) if n else np.empty(0, dtype=np.intp)
+
+    # First-genome nodes are repeated on a bottom track when there are more than two genomes
+    duplicate = len(genomes) > 2
+    duplicates = np.flatnonzero(rows == 0) if duplicate else np.empty(0, dtype=np.intp)
+    # Layout node arrays end with a sentinel, so index -1 (unknown node) reads the fill value
+    copy_of = np.append(np.full(n, -1, dtype=np.intp), -1)
+    copy_of[duplicates] = n + np.arange(len(duplicates))
+    all_rows = np.concatenate([rows, np.full(len(duplicates), len(genomes)), [-1]]).astype(np.intp)
+
+    # Link endpoints as node indices (first occurrence of a repeated id)
+    first = np.flatnonzero(~node_ids.duplicated())
+    lookup = pd.Index(node_ids[first])
+    first = np.append(first, -1)
+    source = first[lookup.get_indexer([link["source"] for link in links])] if links else np.empty(0, np.intp)
+    target = first[lookup.get_indexer([link["target"] for link in links])] if links else np.empty(0, np.intp)
+
+    source_rows, target_rows = all_rows[source], all_rows[target]
+    visible = (source_rows >= 0) & (target_rows >= 0) & (source_rows != target_rows)
+    if duplicate:
+        # A link skipping a track goes to the first genome's copy: the source's if it is in
+        # the first genome, otherwise the target's
+        skips = (source_rows >= 0) & (target_rows >= 0) & (np.abs(source_rows - target_rows) > 1)
+        to_source = skips & (source_rows == 0)
+        to_target = skips & ~to_source & (target_rows == 0)
+        source = np.where(to_source, copy_of[source], source)
+        target = np.where(to_target, copy_of[target], target)
+
+    return {
+        "rows": genomes + genomes[:1] if duplicate else genomes,
+        "nodes": {"row": all_rows[:-1].tolist()},
+        "duplicates": duplicates.tolist(),
+        "links": {
+            "source": source.tolist(),
+            "target": target.tolist(),
+            "visible": visible.astype(np.int8).tolist(),
+        },
+    }
@@ -0,0 +1,158 @@
+"""
+Synteny blocks from reciprocal links.
+
+Each reciprocal link between two genomes is an anchor (x, y): the rel_position
+of its gene in the first and in the second genome. A collinear block is a
+chain of anchors where both coordinates advance (or, for an inverted block, x
+advances while y retreats) with at most ``max_gap`` skipped genes between
+consecutive anchors on either genome.
+
+Chains are built per genome pair in one sweep over the anchors sorted by x,
+LIS-style: the open chains are kept sorted by their last y, and each anchor
+extends the chain ending just below it (found by bisection) if that chain is
+within the gap on both axes, or starts a new chain. That is O(E log E) for E
+anchors; inverted blocks are the same sweep with y negated. With
+``strand_match``, anchors whose genes are on the same strand can only join
+collinear blocks and anchors on opposite strands only inverted ones.
+"""
+from bisect import bisect_left, insort
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from core.coordinate_index import CoordinateIndex
+from parsing.instrumentation import stage
+
+
+def _chain(x: np.ndarray, y: np.ndarray, max_gap: int) -> List[List[int]]:
+    """Collinear chains (lists of anchor positions) with x and y both increasing."""
+    limit = max_gap + 1
+    order = np.lexsort((y, x))
+    xs, ys = x.tolist(), y.tolist()
+    ends = []  # (last y, chain id), sorted
+    last_x = []
+    chains: List[List[int]] = []
+    for anchor in order.tolist():
+        ax, ay = xs[anchor], ys[anchor]
+        chosen = None
+        j = bisect_left(ends, (ay, -1)) - 1
+        while j >= 0 and ends[j][0] >= ay - limit:
+            chain_id = ends[j][1]
+            if last_x[chain_id] < ax - limit:
+                # Too far behind to be extended by this or any later anchor
+                del ends[j]
+            elif last_x[chain_id] < ax:
+                chosen = chain_id
+                del ends[j]
+                break
+            j -= 1
+        if chosen is None:
+            chosen = len(chains)
+            chains.append([])
+            last_x.append(ax)
+        chains[chosen].append(anchor)
+        last_x[chosen] = ax
+        insort(ends, (ay, chosen))
+    return chains
+
+
+def find_synteny_blocks(links: List[Dict[str, Any]], coords, max_gap: int = 5, min_anchors: int = 3,
+                        strand_match: bool = True) -> List[Dict[str, Any]]:
+    """
+    Chain reciprocal links into collinear blocks between each pair of genomes.
+
+    Args:
+        links: Graph links ('source', 'target', 'score', 'is_reciprocal')
+        coords: Cleaned coordinate DataFrame
+        max_gap: Genes that may be skipped between consecutive anchors, on either genome
+        min_anchors: Smallest chain reported as a block
+        strand_match: Collinear blocks only take same-strand anchors, inverted blocks opposite-strand ones
+
+    Returns:
+        List of blocks, ordered by genome pair and start in the first genome
+    """
+    index = CoordinateIndex.of(coords)
+    registry = index.registry
+    reciprocal = [link for link in links if link.get("is_reciprocal")]
+    with stage('synteny_blocks', anchors=len(reciprocal)) as s:
+        if not reciprocal:
+            s.set(blocks=0)
+            return []
+        sources = registry.ids(link["source"] for link in reciprocal).astype(np.int64)
+        targets = registry.ids(link["target"] for link in reciprocal).astype(np.int64)
+        scores = np.fromiter((link["score"] for link in reciprocal), dtype=np.float64, count=len(reciprocal))
+
+        known = (sources >= 0) & (targets >= 0)
+        sources, targets, scores = sources[known], targets[known], scores[known]
+        genome_a, genome_b = index.genome_ids[sources], index.genome_ids[targets]
+        keep = (genome_a >= 0) & (genome_b >= 0) & (genome_a != genome_b)
+        sources, targets, scores = sources[keep], targets[keep], scores[keep]
+        genome_a, genome_b = genome_a[keep], genome_b[keep]
+
+        # Orient every anchor from the lower to the higher genome id, then drop A->B / B->A duplicates
+        swap = genome_a > genome_b
+        sources, targets = np.where(swap, targets, sources), np.where(swap, sources, targets)
+        genome_a, genome_b = np.minimum(genome_a, genome_b), np.maximum(genome_a, genome_b)
+        _, first = np.unique(sources * len(index) + targets, return_index=True)
+        first.sort()
+        sources, targets, scores = sources[first], targets[first], scores[first]
+        genome_a, genome_b = genome_a[first], genome_b[first]
+
+        x = index.rel_position[sources]
+        y = index.rel_position[targets]
+        if index.orientations is None:
+            same_strand = np.ones(len(sources), dtype=bool)
+        else:
+            same_strand = index.orientations[sources] == index.orientations[targets]
+
+        blocks = []
+        pair_codes = genome_a.astype(np.int64) * len(index.genome_names) + genome_b
+        for pair in np.unique(pair_codes):
+            members = np.flatnonzero(pair_codes == pair)
+            used = np.empty(0, dtype=np.int64)  # Anchors already in a chain of this pair
+            if strand_match:
+                groups = [("plus", members[same_strand[members]]), ("minus", members[~same_strand[members]])]
+            else:
+                groups = [("plus", members), ("minus", None)]
+            for orientation, group in groups:
+                if group is None:
+                    # Without strand matching, inverted chains are built from what collinear ones left over
+                    group = np.setdiff1d(members, used)
+                sign = 1 if orientation == "plus" else -1
+                chains = [chain for chain in _chain(x[group], sign * y[group], max_gap) if len(chain) >= min_anchors]
+                used = np.concatenate([group[chain] for chain in chains]) if chains else np.empty(0, dtype=np.int64)
+                for chain in chains:
+                    anchors = group[chain]
+                    blocks.append(_block(index, sources[anchors], targets[anchors], scores[anchors], orientation))
+        blocks.sort(key=lambda block: (block["genome_a"], block["genome_b"], block["rel_start_a"]))
+        s.set(blocks=len(blocks))
+    return blocks
+
+
+def _block(index: CoordinateIndex, sources: np.ndarray, targets: np.ndarray, scores: np.ndarray,
+           orientation: str) -> Dict[str, Any]:
+    # Anchors are in chain order: x increasing, y increasing (plus) or decreasing (minus)
+    first, last = 0, len(sources) - 1
+    return {
+        "genome_a": index.genome_names[index.genome_ids[sources[first]]],
+        "genome_b": index.genome_names[index.genome_ids[targets[first]]],
+        "orientation": orientation,
+        "anchors": len(sources),
+        "start_a": index.names[sources[first]],
+        "end_a": index.names[sources[last]],
+        "start_b": index.names[targets[first]],
+        "end_b": index.names[targets[last]],
+        "rel_start_a": int(index.rel_position[sources[first]]),
+        "rel_end_a": int(index.rel_position[sources[last]]),
+        "rel_start_b": int(index.rel_position[targets[first]]),
+        "rel_end_b": int(index.rel_position[targets[last]]),
+        "mean_score": round(float(scores.mean()), 6),
+    }
+
+
+def synteny_blocks_for(links: List[Dict[str, Any]], coords, config) -> Optional[List[Dict[str, Any]]]:
+    """find_synteny_blocks with the settings from a FileProcessingConfig; None when disabled."""
+    if not config.synteny_blocks:
+        return None
+    return find_synteny_blocks(links, coords, max_gap=config.synteny_max_gap,
+                               min_anchors=config.synteny_min_anchors, strand_match=config.synteny_strand_match)
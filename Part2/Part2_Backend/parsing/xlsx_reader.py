@@ -0,0 +1,190 @@
+"""
+Streaming xlsx ingest.
+
+pd.read_excel(engine='openpyxl') loads the full workbook object model before
+building the frame, which dominates parse time (and memory) for large matrix
+workbooks. The readers here walk the first sheet's rows once, either with
+openpyxl's read_only row iterator or with python-calamine when it is
+installed, writing matrix scores straight into a preallocated NumPy array.
+The array is sized from the sheet's stored dimension, capped at
+MAX_PREALLOCATED_CELLS since that element can be missing or wrong, and
+doubled whenever the rows outgrow it.
+
+Selected with FileProcessingConfig.xlsx_reader:
+    'openpyxl'  pd.read_excel, the original path
+    'stream'    openpyxl read_only=True row iterator
+    'calamine'  python-calamine (pip install python-calamine)
+    'auto'      calamine when installed, otherwise stream
+"""
+from io import BytesIO
+from numbers import Number
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+XLSX_READERS = ('openpyxl', 'stream', 'calamine', 'auto')
+MAX_PREALLOCATED_CELLS = 1 << 22  # Upfront score buffer limit (32 MiB of float64); larger sheets grow into it
+
+_NUMBER_TYPES = {int, float}
+_NUMBER_OR_BLANK_TYPES = {int, float, type(None)}
+
+
+class NonNumericMatrixError(ValueError):
+    """A matrix cell could not be stored as a float; the caller falls back to pd.read_excel."""
+
+
+def _resolve_reader(reader: str) -> str:
+    if reader not in XLSX_READERS:
+        raise ValueError(f"Unknown xlsx_reader '{reader}'. Expected one of: {', '.join(XLSX_READERS)}")
+    if reader in ('calamine', 'auto'):
+        try:
+            import python_calamine  # noqa: F401
+            return 'calamine'
+        except ImportError:
+            if reader == 'calamine':
+                raise ValueError("xlsx_reader='calamine' requires the python-calamine package")
+            return 'stream'
+    return reader
+
+
+def _iter_rows_openpyxl(raw: bytes) -> Tuple[Iterator[Sequence], Optional[int]]:
+    import openpyxl
+    workbook = openpyxl.load_workbook(BytesIO(raw), read_only=True, data_only=True)
+    sheet = workbook.worksheets[0]
+    # max_row comes from the sheet's stored dimension and is only a capacity hint
+    capacity = sheet.max_row
+    # read_only sheets clip rows to that dimension; read whatever cells are actually there
+    sheet.reset_dimensions()
+
+    def rows():
+        try:
+            yield from sheet.iter_rows(values_only=True)
+        finally:
+            workbook.close()
+
+    return rows(), capacity
+
+
+def _iter_rows_calamine(raw: bytes) -> Tuple[Iterator[Sequence], Optional[int]]:
+    from python_calamine import CalamineWorkbook
+    sheet = CalamineWorkbook.from_filelike(BytesIO(raw)).get_sheet_by_index(0)
+    # calamine reports empty cells as ''
+    rows = ([None if value == '' else value for value in row] for row in sheet.iter_rows())
+    return rows, sheet.height
+
+
+def _header_names(header: Sequence) -> List[str]:
+    """Column names the way pd.read_excel builds them (blank -> 'Unnamed: i', duplicates -> 'x.1')."""
+    names = []
+    seen = {}
+    for i, value in enumerate(header):
+        name = f"Unnamed: {i}" if value is None else value
+        if isinstance(name, float) and name.is_integer():
+            name = int(name)
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def _trim_header(header: Sequence) -> Sequence:
+    # Trailing blank header cells are only part of the sheet's used range
+    end = len(header)
+    while end > 0 and header[end - 1] is None:
+        end -= 1
+    return header[:end]
+
+
+def read_matrix_rows(rows: Iterator[Sequence], capacity: Optional[int], float_dtype: str = 'float64') -> pd.DataFrame:
+    """
+    Build a matrix frame (first column of row identifiers, then one float block) from sheet rows.
+
+    Raises:
+        NonNumericMatrixError: if a score cell is not a number
+    """
+    header = next(rows, None)
+    if header is None:
+        raise pd.errors.EmptyDataError("No columns to parse from file")
+    names = _header_names(_trim_header(header))
+    n_cols = len(names) - 1
+
+    # The dimension-based row count is only trusted up to the preallocation limit
+    capacity = max(min((capacity or 0) - 1, MAX_PREALLOCATED_CELLS // max(n_cols, 1)), 16)
+    values = np.full((capacity, n_cols), np.nan, dtype=float_dtype)
+    row_ids = []
+    n_rows = 0
+    for row in rows:
+        if n_rows == capacity:
+            capacity *= 2
+            grown = np.full((capacity, n_cols), np.nan, dtype=float_dtype)
+            grown[:n_rows] = values[:n_rows]
+            values = grown
+        row_ids.append(row[0] if row else None)
+        cells = row[1:n_cols + 1]
+        types = set(map(type, cells))
+        if types <= _NUMBER_TYPES:
+            values[n_rows, :len(cells)] = cells
+        elif types <= _NUMBER_OR_BLANK_TYPES:
+            values[n_rows, :len(cells)] = [np.nan if value is None else value for value in cells]
+        else:
+            for j, value in enumerate(cells):
+                if value is None:
+                    continue
+                if not isinstance(value, Number) or isinstance(value, bool):
+                    raise NonNumericMatrixError(f"Non-numeric value {value!r} in row {n_rows + 2}")
+                values[n_rows, j] = value
+        n_rows += 1
+
+    # Trailing blank rows are part of the used range but not of the data
+    while n_rows and row_ids[n_rows - 1] is None and np.isnan(values[n_rows - 1]).all():
+        n_rows -= 1
+        row_ids.pop()
+
+    body = pd.DataFrame(values[:n_rows], columns=names[1:])
+    body.insert(0, names[0], pd.Index(row_ids).to_numpy(), allow_duplicates=True)
+    return body
+
+
+def read_table_rows(rows: Iterator[Sequence]) -> pd.DataFrame:
+    """
+    Build a frame from sheet rows (coordinate files).
+
+    Rows go through the same TextParser pd.read_excel uses, so header handling
+    and dtype inference match the openpyxl path exactly.
+    """
+    from pandas.io.parsers import TextParser
+
+    # read_excel hands blank cells to the parser as '' and drops trailing blank cells and rows
+    data = []
+    for row in rows:
+        row = ['' if value is None else value for value in row]
+        while row and row[-1] == '':
+            row.pop()
+        data.append(row)
+    while data and not data[-1]:
+        data.pop()
+    if not data:
+        raise pd.errors.EmptyDataError("No columns to parse from file")
+    width = max(len(row) for row in data)
+    data = [row + [''] * (width - len(row)) for row in data]
+    return TextParser(data, header=0).read()
+
+
+def read_xlsx(raw: bytes, file_type: str, config) -> pd.DataFrame:
+    """Read the first sheet of an xlsx workbook with the reader selected in config."""
+    reader = _resolve_reader(getattr(config, 'xlsx_reader', 'openpyxl') if config else 'openpyxl')
+    if reader == 'openpyxl':
+        return pd.read_excel(BytesIO(raw), engine='openpyxl')
+
+    rows, capacity = _iter_rows_calamine(raw) if reader == 'calamine' else _iter_rows_openpyxl(raw)
+    if file_type == 'matrix':
+        try:
+            return read_matrix_rows(rows, capacity, config.matrix_float_dtype)
+        except NonNumericMatrixError:
+            # Let pandas build the mixed-type frame so validation reports it as usual
+            return pd.read_excel(BytesIO(raw), engine='openpyxl')
+    return read_table_rows(rows)
@@ -0,0 +1,112 @@
+"""
+Run every parsing fixture and compare it against golden output hashes.
+
+Fixtures are discovered under parsing_testing/ with the batch parser's rules
+(one dataset per directory: a coords file plus a matrix or _domainN_NAME
+matrices) and parsed in parallel worker processes. Each output is reduced to
+an order-insensitive SHA-256 of every graph's nodes and links, so changes to
+list order (or to other keys) don't count, and compared with
+golden_hashes.json. The report lists status and runtime per fixture.
+
+    python parsing_testing/fixture_runner.py            # compare
+    python parsing_testing/fixture_runner.py --update   # rewrite the golden hashes
+"""
+import sys
+import os
+import json
+import hashlib
+import tempfile
+import argparse
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from parsing.batch_parse import discover_datasets, output_path, run_batch
+
+FIXTURE_ROOT = os.path.dirname(os.path.abspath(__file__))
+GOLDEN_FILE = os.path.join(FIXTURE_ROOT, 'golden_hashes.json')
+
+
+def _digest(items) -> str:
+    """SHA-256 of a list, independent of its order."""
+    encoded = sorted(json.dumps(item, sort_keys=True) for item in items)
+    return hashlib.sha256('\n'.join(encoded).encode('utf-8')).hexdigest()
+
+
+def output_hash(output) -> str:
+    """Canonical hash of a parse result (one graph dict or a list of domain graphs)."""
+    graphs = output if isinstance(output, list) else [output]
+    parts = [
+        f"{graph.get('domain_name', 'general')}:{_digest(graph['nodes'])}:{_digest(graph['links'])}"
+        for graph in graphs
+    ]
+    return hashlib.sha256('\n'.join(parts).encode('utf-8')).hexdigest()
+
+
+def _result_key(entry, output_dir, dataset) -> str:
+    # Fixtures that are expected to fail are pinned by status and exception type
+    # (messages can list columns in set order)
+    if entry['status'] != 'ok':
+        return f"{entry['status']}: {entry.get('error', '').split(':')[0]}"
+    with open(output_path(output_dir, dataset)) as f:
+        return output_hash(json.load(f))
+
+
+def run_fixtures(root: str = FIXTURE_ROOT, golden_file: str = GOLDEN_FILE, workers: int = None,
+                 timeout: float = None, update: bool = False):
+    """
+    Parse every fixture and compare with the golden hashes.
+
+    Returns:
+        dict: 'fixtures' (name, status, seconds, hash, expected) and counts per status.
+        Status is 'match', 'mismatch', 'new' (no golden hash) or 'missing'
+        (golden hash without a fixture).
+    """
+    golden = {}
+    if os.path.exists(golden_file):
+        with open(golden_file) as f:
+            golden = json.load(f)
+
+    datasets = discover_datasets(root)
+    with tempfile.TemporaryDirectory() as output_dir:
+        summary = run_batch(datasets, output_dir, workers=workers, timeout=timeout)
+        results = {
+            dataset.name: (entry, _result_key(entry, output_dir, dataset))
+            for dataset, entry in zip(datasets, summary['datasets'])
+        }
+
+    fixtures = []
+    for name, (entry, key) in results.items():
+        expected = golden.get(name)
+        status = 'new' if expected is None else ('match' if key == expected else 'mismatch')
+        fixtures.append({"name": name, "status": status, "seconds": entry['seconds'],
+                         "stages": entry.get('stages', {}), "hash": key, "expected": expected})
+    for name in golden.keys() - results.keys():
+        fixtures.append({"name": name, "status": "missing", "seconds": None, "hash": None, "expected": golden[name]})
+
+    if update:
+        with open(golden_file, 'w') as f:
+            json.dump({name: key for name, (_, key) in sorted(results.items())}, f, indent=2)
+            f.write('\n')
+
+    counts = {}
+    for fixture in fixtures:
+        counts[fixture['status']] = counts.get(fixture['status'], 0) + 1
+    return {"total_seconds": summary['total_seconds'], "counts": counts, "fixtures": fixtures}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Run all parsing fixtures against the golden output hashes')
+    parser.add_argument('--update', action='store_true', help='Rewrite golden_hashes.json from this run')
+    parser.add_argument('--workers', '-j', type=int, help='Concurrent worker processes (default: CPU count)')
+    parser.add_argument('--timeout', type=float, help='Per-fixture time limit in seconds')
+    parser.add_argument('--report', type=str, help='Also write the JSON report to this path')
+    args = parser.parse_args()
+
+    report = run_fixtures(workers=args.workers, timeout=args.timeout, update=args.update)
+    for fixture in sorted(report['fixtures'], key=lambda f: f['name']):
+        seconds = f"{fixture['seconds']:8.2f}s" if fixture['seconds'] is not None else ' ' * 9
+        print(f"{fixture['status']:>8} {seconds} {fixture['name']}")
+    print(f"{report['counts']} in {report['total_seconds']:.1f}s")
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent=2)
+    failed = report['counts'].get('mismatch', 0) + report['counts'].get('missing', 0)
+    sys.exit(1 if failed and not args.update else 0)
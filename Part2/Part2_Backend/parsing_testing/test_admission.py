@@ -0,0 +1,79 @@
+import sys
+import os
+import threading
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import pytest
+from benchmarks.synthetic import DatasetSpec, generate_dataset, named_file
+from exception_templates.admission_exception import AdmissionRejected
+from services.admission import AdmissionConfig, AdmissionController, Estimate, estimate_request
+
+
+def _estimate(cells):
+    return Estimate(cells=cells, bytes=0, domains=0, sniffed=True, cost=cells)
+
+
+@pytest.mark.parametrize("file_format", ["csv", "tsv", "xlsx"])
+def test_estimate_from_sniffed_shape(file_format):
+    _, matrices = generate_dataset(DatasetSpec(n_genes=120, n_domains=2, file_format=file_format))
+    files = [named_file(data, name) for name, data in matrices]
+    estimate = estimate_request(files, True, AdmissionConfig())
+    assert estimate.sniffed and estimate.cells == 2 * 120 * 120
+    assert estimate.cost == pytest.approx(estimate.cells * 1.2)
+    assert all(f.tell() == 0 for f in files)
+
+
+def test_large_requests_do_not_block_small_lane():
+    controller = AdmissionController(AdmissionConfig(small_max_cells=100, small_slots=1, large_slots=2,
+                                                     large_cells_per_slot=1000, max_wait_seconds=0.2))
+    large = controller.acquire(_estimate(5000), client="a")
+    assert large.lane == "large" and large.weight == 2  # Capped at the lane's slots
+
+    # The large lane is full: a second large request waits, then is rejected with 503
+    with pytest.raises(AdmissionRejected) as rejected:
+        controller.acquire(_estimate(500), client="b")
+    assert rejected.value.status_code == 503 and rejected.value.retry_after >= 1
+
+    # The same client may not queue a second large request
+    with pytest.raises(AdmissionRejected) as rejected:
+        controller.acquire(_estimate(500), client="a")
+    assert rejected.value.status_code == 429
+
+    small = controller.acquire(_estimate(50), client="a")
+    assert small.lane == "small" and small.queued_seconds < 0.1
+    controller.release(small)
+    controller.release(large)
+    assert controller.snapshot()["large"]["in_use"] == 0
+
+
+def test_queued_request_is_admitted_on_release():
+    controller = AdmissionController(AdmissionConfig(small_slots=1, max_wait_seconds=5))
+    first = controller.acquire(_estimate(10))
+    admitted = []
+    waiter = threading.Thread(target=lambda: admitted.append(controller.acquire(_estimate(10))))
+    waiter.start()
+    while controller.snapshot()["small"]["queued"] == 0:
+        pass
+    controller.release(first)
+    waiter.join(timeout=5)
+    assert admitted and admitted[0].queued_seconds > 0
+    controller.release(admitted[0])
+
+
+def test_queue_limit():
+    controller = AdmissionController(AdmissionConfig(small_slots=1, max_queue=0))
+    ticket = controller.acquire(_estimate(10))
+    with pytest.raises(AdmissionRejected) as rejected:
+        controller.acquire(_estimate(10))
+    assert rejected.value.status_code == 503
+    controller.release(ticket)
+
+
+def test_client_id_ignores_forwarded_for():
+    from server import app, _client_id
+    spoofed = {"X-Forwarded-For": "198.51.100.1"}
+    with app.test_request_context('/', environ_base={"REMOTE_ADDR": "10.0.0.9"}, headers=spoofed):
+        assert _client_id() == "10.0.0.9"
+    event = {"requestContext": {"identity": {"sourceIp": "203.0.113.7"}}}
+    with app.test_request_context('/', environ_base={"REMOTE_ADDR": "10.0.0.9", "lambda.event": event},
+                                  headers=spoofed):
+        assert _client_id() == "203.0.113.7"
@@ -0,0 +1,55 @@
+import sys
+import os
+import json
+import shutil
+import time
+import multiprocessing
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import pytest
+from parsing import batch_parse
+from parsing.batch_parse import discover_datasets, load_manifest, run_batch
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def _tree(tmp_path):
+    shutil.copytree(os.path.join(HERE, "general_testing", "Gentest1"), tmp_path / "data" / "Gentest1")
+    shutil.copytree(os.path.join(HERE, "domain_testing", "Domtest1"), tmp_path / "data" / "Domtest1")
+    broken = tmp_path / "data" / "Broken"
+    broken.mkdir()
+    (broken / "brokencoords.csv").write_text("name\nx\n")
+    (broken / "brokenmatrix.csv").write_text(",x\nx,1\n")
+    return tmp_path / "data"
+
+
+def test_discover_and_run(tmp_path):
+    datasets = discover_datasets(str(_tree(tmp_path)))
+    assert [(d.name, d.domain_specific, len(d.matrices)) for d in datasets] == [
+        ("Broken", False, 1), ("Domtest1", True, 2), ("Gentest1", False, 1)]
+
+    summary = run_batch(datasets, str(tmp_path / "out"), workers=2)
+    statuses = {entry["name"]: entry["status"] for entry in summary["datasets"]}
+    assert statuses == {"Broken": "error", "Domtest1": "ok", "Gentest1": "ok"}
+    assert (summary["ok"], summary["failed"]) == (2, 1)
+
+    graphs = json.loads((tmp_path / "out" / "Domtest1.json").read_text())
+    assert [g["domain_name"] for g in graphs] == ["NBS", "LRR", "ALL"]
+    assert json.loads((tmp_path / "out" / "summary.json").read_text())["failed"] == 1
+
+
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="needs forked workers")
+def test_timeout_and_manifest(tmp_path, monkeypatch):
+    root = _tree(tmp_path)
+    manifest = tmp_path / "manifest.json"
+    manifest.write_text(json.dumps({"datasets": [
+        {"name": "slow", "coords": "data/Gentest1/gentest1coords.xlsx", "matrices": ["data/Gentest1/gentest1matrix.xlsx"]},
+    ]}))
+    datasets = load_manifest(str(manifest))
+    assert datasets[0].coords == str(root / "Gentest1" / "gentest1coords.xlsx")
+
+    # Forked workers see the patched function
+    monkeypatch.setattr(batch_parse, "parse_dataset", lambda dataset: time.sleep(30))
+    started = time.perf_counter()
+    summary = run_batch(datasets, str(tmp_path / "out"), workers=1, timeout=0.5)
+    assert summary["datasets"][0]["status"] == "timeout"
+    assert time.perf_counter() - started < 10
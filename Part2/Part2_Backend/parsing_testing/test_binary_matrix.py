@@ -0,0 +1,57 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import numpy as np
+from benchmarks.synthetic import DatasetSpec, generate_dataset, named_file
+from core.binary_matrix import BinaryMatrix, write_binary_matrix
+from core.config import FileProcessingConfig
+from core.coordinate_file import CoordinateFile
+from core.matrix_file import MatrixFile
+from parsing.file_utils import parse_matrix_data
+from parsing.graph_utils import create_output
+
+
+def _load(matrix_file, coord_file):
+    config = FileProcessingConfig()
+    coord_data_file = CoordinateFile(named_file(coord_file[1], coord_file[0]), config)
+    coord_data_file.load_data()
+    assert coord_data_file.validate()
+    matrix_data_file = MatrixFile(named_file(matrix_file[1], matrix_file[0]), config)
+    matrix_data_file.load_data()
+    return matrix_data_file.data, coord_data_file.clean()
+
+
+def test_binary_matrix_links_match_csv(tmp_path):
+    spec = DatasetSpec(n_genes=40, n_genomes=3, density=0.3, seed=7)
+    coord_file, (matrix_file,) = generate_dataset(spec)
+    df, coords = _load(matrix_file, coord_file)
+    genomes = coords['genome'].unique().tolist()
+
+    path = tmp_path / "matrix.pmx"
+    write_binary_matrix(df, str(path), dtype='float64', genomes=dict(zip(coords['name'], coords['genome'])))
+
+    expected = create_output(parse_matrix_data(named_file(matrix_file[1], matrix_file[0]), genomes, coords), coords)
+    for source in (open(path, 'rb'), named_file(path.read_bytes(), "matrix.pmx")):
+        with source:
+            result = create_output(parse_matrix_data(source, genomes, coords), coords)
+        assert sorted(map(str, result["links"])) == sorted(map(str, expected["links"]))
+
+
+def test_genome_blocks_are_views(tmp_path):
+    spec = DatasetSpec(n_genes=30, n_genomes=3, density=0.5, seed=1)
+    coord_file, (matrix_file,) = generate_dataset(spec)
+    df, coords = _load(matrix_file, coord_file)
+    genome_of = dict(zip(coords['name'], coords['genome']))
+
+    path = tmp_path / "matrix.pmx"
+    write_binary_matrix(df, str(path), genomes=genome_of)
+    matrix = BinaryMatrix.open(str(path))
+
+    first, second = list(matrix.row_blocks)[:2]
+    block = matrix.block(first, second)
+    assert np.shares_memory(block, matrix.values)
+    rows = [name for name in df.index if genome_of[name] == first]
+    cols = [name for name in df.columns if genome_of[name] == second]
+    np.testing.assert_array_equal(block, df.loc[rows, cols].to_numpy(dtype='float32'))
+    frame = matrix.to_frame(rows)
+    assert list(frame.index) == rows and list(frame.columns) == [name for name in matrix.columns if name in rows]
@@ -0,0 +1,42 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.synthetic import DatasetSpec, generate_dataset, named_file
+from core.config import FileProcessingConfig
+from core.coordinate_file import CoordinateFile
+from parsing.block_links import block_links, filter_links
+from parsing.file_utils import parse_matrix_data
+from parsing.graph_utils import add_links
+
+
+def _dataset(seed):
+    spec = DatasetSpec(n_genes=60, n_genomes=4, density=0.3, seed=seed)
+    coord_file, (matrix_file,) = generate_dataset(spec)
+    coord_data_file = CoordinateFile(named_file(coord_file[1], coord_file[0]), FileProcessingConfig())
+    coord_data_file.load_data()
+    assert coord_data_file.validate()
+    coords = coord_data_file.clean()
+    matrix_data = parse_matrix_data(named_file(matrix_file[1], matrix_file[0]),
+                                    coords['genome'].unique().tolist(), coords)
+    return matrix_data, coords
+
+
+def test_block_links_match_add_links():
+    matrix_data, coords = _dataset(seed=11)
+    df = matrix_data['df_only_cutoffs']
+    genomes = coords['genome'].unique().tolist()
+
+    assert block_links(df, coords, max_workers=4) == add_links(df, matrix_data['row_max'], matrix_data['col_max'], coords)
+    assert block_links(df, coords, genomes=genomes, domain="NBS", return_connections=True, max_workers=4) == add_links(
+        df, matrix_data['row_max'], matrix_data['col_max'], coords, genomes=genomes, domain="NBS", return_connections=True)
+
+
+def test_selected_genome_pairs():
+    matrix_data, coords = _dataset(seed=2)
+    df = matrix_data['df_only_cutoffs']
+    genomes = coords['genome'].unique().tolist()
+    pairs = [(genomes[0], genomes[1]), (genomes[2], genomes[2])]
+
+    expected = filter_links(add_links(df, matrix_data['row_max'], matrix_data['col_max'], coords), coords, pairs)
+    assert expected
+    assert block_links(df, coords, genome_pairs=pairs) == expected
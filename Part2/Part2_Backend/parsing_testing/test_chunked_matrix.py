@@ -0,0 +1,78 @@
+import sys
+import os
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.synthetic import DatasetSpec, generate_dataset, named_file
+from core.config import FileProcessingConfig
+from parsing.chunked_matrix import parse_matrix_chunked
+from parsing.domain_parse import load_domain_coordinates, parse_domain_matrix
+from parsing.file_utils import parse_matrix_data
+from parsing.general_parse import parse_matrix
+from parsing.graph_utils import create_output
+
+
+def _general_coords(coord_file):
+    from core.coordinate_file import CoordinateFile
+    coord_data_file = CoordinateFile(named_file(coord_file[1], coord_file[0]), FileProcessingConfig())
+    coord_data_file.load_data()
+    assert coord_data_file.validate()
+    return coord_data_file.clean()
+
+
+def test_chunked_links_match_in_memory_general():
+    # Ties and sub-cutoff cells are common at this density/size, and 7-row blocks straddle genomes
+    spec = DatasetSpec(n_genes=60, n_genomes=4, density=0.3, seed=3)
+    coord_file, (matrix_file,) = generate_dataset(spec)
+    coords = _general_coords(coord_file)
+
+    expected = create_output(parse_matrix_data(named_file(matrix_file[1], matrix_file[0]),
+                                               coords['genome'].unique().tolist(), coords), coords)
+    result = parse_matrix_chunked(matrix_file[1], ',', coords, chunk_rows=7)
+
+    assert result["links"] == expected["links"]
+
+
+def test_chunked_links_match_in_memory_domain():
+    spec = DatasetSpec(n_genes=50, n_genomes=3, n_domains=1, density=0.3, seed=5)
+    coord_file, (matrix_file,) = generate_dataset(spec)
+    coords = load_domain_coordinates(named_file(coord_file[1], coord_file[0]))
+
+    expected = parse_domain_matrix(named_file(matrix_file[1], matrix_file[0]), coords, "NBS")
+    result = parse_matrix_chunked(matrix_file[1], ',', coords, skip_same_genome=True, chunk_rows=4)
+
+    assert result["links"] == expected["links"]
+    assert list(result["cutoff_index"]) == expected["cutoff_index"]
+
+
+def test_parse_matrix_switches_to_chunked_above_threshold(monkeypatch):
+    spec = DatasetSpec(n_genes=40, n_genomes=3, density=0.2, seed=1)
+    coord_file, (matrix_file,) = generate_dataset(spec)
+
+    full = parse_matrix(named_file(matrix_file[1], matrix_file[0]), named_file(coord_file[1], coord_file[0]))
+    monkeypatch.setenv("MATRIX_CHUNKED_MIN_BYTES", "1")
+    chunked = parse_matrix(named_file(matrix_file[1], matrix_file[0]), named_file(coord_file[1], coord_file[0]))
+
+    assert chunked == full
+
+
+@pytest.mark.parametrize("score", ['"1,234"', '"95,5"'])
+def test_comma_formatted_scores_are_rejected_on_both_paths(monkeypatch, score):
+    spec = DatasetSpec(n_genes=30, n_genomes=3, density=0.2, seed=2)
+    coord_file, (matrix_file,) = generate_dataset(spec)
+    lines = matrix_file[1].decode('utf-8').split('\n')
+    cells = lines[1].split(',')
+    cells[2] = score
+    lines[1] = ','.join(cells)
+    matrix_bytes = '\n'.join(lines).encode('utf-8')
+
+    errors = []
+    for threshold in (None, "1"):
+        if threshold:
+            monkeypatch.setenv("MATRIX_CHUNKED_MIN_BYTES", threshold)
+        with pytest.raises(ValueError) as error:
+            parse_matrix(named_file(matrix_bytes, matrix_file[0]), named_file(coord_file[1], coord_file[0]))
+        errors.append(str(error.value))
+
+    assert all("comma-formatted scores" in message for message in errors)
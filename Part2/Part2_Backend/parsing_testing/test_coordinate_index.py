@@ -0,0 +1,75 @@
+import sys
+import os
+from io import BytesIO
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.config import FileProcessingConfig
+from core.coordinate_file import CoordinateFile
+from core.coordinate_index import CoordinateIndex
+from parsing.graph_utils import add_nodes
+
+HEADER = "name,protein_name,genome,gene_type,position,orientation,domain1_NBS_start,domain1_NBS_end\n"
+ROWS = [
+    "a1,p1,A,NL,300,plus,10,90",
+    "a2,p2,A,NL,100,minus,,",
+    "b1,p3,B,TNL,50,plus,5,60",
+    "a3,p4,A,CNL,200,plus,20,80",
+]
+
+
+def _coordinate_file(rows):
+    file = BytesIO((HEADER + "\n".join(rows) + "\n").encode("utf-8"))
+    file.name = "coords.csv"
+    return CoordinateFile(file, FileProcessingConfig(validation_mode="domain"))
+
+
+def test_positional_queries_and_nodes():
+    coord_file = _coordinate_file(ROWS)
+    coord_file.load_data()
+    assert coord_file.validate(), coord_file.validation_errors
+    coords = coord_file.clean_with_domains()
+    index = CoordinateIndex.of(coords)
+
+    assert index is CoordinateIndex.of(coords)
+    assert index.genome_order("A") == ["a2", "a3", "a1"]
+    assert list(coords["rel_position"]) == [3, 1, 1, 2]
+    assert index.window("A", 150, 300) == ["a3", "a1"]
+    assert index.neighbours("a3") == ["a2", "a1"]
+    assert index.domain_interval("NBS", "a1") == (10.0, 90.0)
+    assert index.domain_interval("NBS", "a2") is None
+
+    nodes = add_nodes(coords, cutoff_index=["a1"], include_gene_type=True, include_domains=True)
+    assert nodes[1] == {"id": "a2", "genome_name": "A", "protein_name": "p2", "direction": "minus",
+                        "rel_position": 1, "gene_type": "NL", "is_present": False,
+                        "domain1_NBS_start": None, "domain1_NBS_end": None}
+
+
+def test_inverted_domain_interval_is_a_warning():
+    coord_file = _coordinate_file(ROWS[:3] + ["a3,p4,A,CNL,200,plus,80,20"])
+    coord_file.load_data()
+
+    assert coord_file.validate(), coord_file.validation_errors
+    assert any("start >= end" in warning and "a3" in warning for warning in coord_file.processing_warnings)
+    index = CoordinateIndex.of(coord_file.clean_with_domains())
+    assert index.domain_interval("NBS", "a3") is None
+    assert index.domain_interval("NBS", "a1") == (10.0, 90.0)
+
+
+def test_bundled_sample_parses():
+    from parsing.domain_parse import domain_parse
+
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    names = ["MatrixChr8segment_domain1_TIR.xlsx", "MatrixChr8segment_domain2_NBS.xlsx",
+             "MatrixChr8segment_domain3_LRR.xlsx"]
+    matrices = []
+    for name in names:
+        with open(os.path.join(backend, name), "rb") as f:
+            matrix = BytesIO(f.read())
+        matrix.name = name
+        matrices.append(matrix)
+    with open(os.path.join(backend, "MatrixChr8segment_INFO_with_domain_coordinates.xlsx"), "rb") as f:
+        coords = BytesIO(f.read())
+    coords.name = "MatrixChr8segment_INFO_with_domain_coordinates.xlsx"
+
+    graphs = domain_parse(matrices, coords, names)
+    assert [graph["domain_name"] for graph in graphs] == ["TIR", "NBS", "LRR", "ALL"]
+    assert all(graph["nodes"] for graph in graphs)
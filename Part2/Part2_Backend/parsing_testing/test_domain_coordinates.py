@@ -0,0 +1,55 @@
+import sys
+import os
+import math
+from io import BytesIO
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import pytest
+from core.config import FileProcessingConfig
+from core.coordinate_file import CoordinateFile
+
+COORDS = """name,protein_name,genome,gene_type,position,orientation,domain1_NBS
+A_g1,g1,A,NL,100,plus,yes
+A_g2,g2,A,TNL,200,minus,yes
+B_g3,g3,B,NL,50,plus,no
+"""
+
+# combine_coords.py output: no header, TIR2 is a second TIR run of the same protein
+HITS = """g1,188,401,NBS
+g1,547,803,LRR
+A_g2,19,203,TIR
+A_g2,219,451,NBS
+A_g2,1145,1312,TIR2
+missing,1,50,NBS
+"""
+
+
+def _file(text, name):
+    file = BytesIO(text.encode("utf-8"))
+    file.name = name
+    return file
+
+
+def test_long_format_domains_are_pivoted():
+    coord_file = CoordinateFile(_file(COORDS, "coords.csv"), FileProcessingConfig(validation_mode="domain"),
+                                domain_file=_file(HITS, "domains.csv"))
+    coord_file.load_data()
+    assert coord_file.validate(), coord_file.validation_errors
+    coords = coord_file.clean_with_domains()
+
+    # NBS keeps its number; new domains follow in order of first appearance
+    assert [c for c in coords.columns if c.startswith("domain")] == [
+        "domain1_NBS", "domain1_NBS_start", "domain1_NBS_end",
+        "domain2_LRR_start", "domain2_LRR_end", "domain3_TIR_start", "domain3_TIR_end",
+        "domain4_TIR2_start", "domain4_TIR2_end"]
+    assert coords["domain1_NBS_start"].tolist()[:2] == [188.0, 219.0]
+    assert coords["domain3_TIR_end"].tolist()[1] == 203.0
+    assert math.isnan(coords["domain2_LRR_start"].tolist()[2])
+    assert coords["domain4_TIR2_start"].tolist()[1] == 1145.0
+    assert any("missing" in w for w in coord_file.processing_warnings)
+
+
+def test_bad_rows_are_rejected():
+    coord_file = CoordinateFile(_file(COORDS, "coords.csv"), FileProcessingConfig(validation_mode="domain"),
+                                domain_file=_file("protein\tstart\tend\tdomain\ng1\tx\t10\tNBS\n", "domains.tsv"))
+    with pytest.raises(ValueError, match="numeric start/end"):
+        coord_file.load_data()
@@ -0,0 +1,17 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from fixture_runner import output_hash, run_fixtures
+
+
+def test_output_hash_ignores_order():
+    graph = {"nodes": [{"id": "a"}, {"id": "b"}], "links": [{"source": "a", "target": "b", "score": 1.0}]}
+    reordered = {"links": graph["links"], "nodes": graph["nodes"][::-1], "genomes": ["X"]}
+    assert output_hash(graph) == output_hash(reordered)
+    assert output_hash(graph) != output_hash({**graph, "links": []})
+
+
+def test_fixtures_match_golden_hashes():
+    report = run_fixtures()
+    failures = [(f["name"], f["status"]) for f in report["fixtures"] if f["status"] != "match"]
+    assert not failures, failures
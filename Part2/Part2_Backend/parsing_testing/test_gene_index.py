@@ -0,0 +1,32 @@
+import sys
+import os
+import json
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from parsing.batch_parse import discover_datasets, parse_dataset
+from services.gene_index import extract_genes
+
+DOMAIN_FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'domain_testing', 'Domtest11')
+
+
+def test_extract_genes_from_domain_result():
+    result = parse_dataset(discover_datasets(DOMAIN_FIXTURE)[0])
+    genes = extract_genes(json.dumps(result).encode('utf-8'))
+
+    combined = next(graph for graph in result if graph['domain_name'] == 'ALL')
+    assert sorted(gene['gene_id'] for gene in genes) == sorted(node['id'] for node in combined['nodes'])
+    first = combined['nodes'][0]
+    entry = next(gene for gene in genes if gene['gene_id'] == first['id'])
+    assert entry == {"gene_id": first['id'], "protein_name": first['protein_name'], "genome_name": first['genome_name']}
+
+
+def test_extract_genes_deduplicates_across_graphs():
+    graphs = [
+        {"domain_name": "NBS", "nodes": [{"id": "g1", "genome_name": "A", "protein_name": "p1"}], "links": []},
+        {"domain_name": "ALL", "nodes": [{"id": "g1", "genome_name": "A", "protein_name": "p1"},
+                                         {"id": "g2", "genome_name": "B"}], "links": []},
+    ]
+    assert extract_genes(graphs) == [
+        {"gene_id": "g1", "protein_name": "p1", "genome_name": "A"},
+        {"gene_id": "g2", "protein_name": None, "genome_name": "B"},
+    ]
+    assert extract_genes({"graphs": graphs}) == extract_genes(graphs)
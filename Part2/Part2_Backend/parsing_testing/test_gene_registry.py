@@ -0,0 +1,119 @@
+import sys
+import os
+import random
+from collections import Counter
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import numpy as np
+import pandas as pd
+from core.coordinate_index import CoordinateIndex
+from core.gene_registry import GeneRegistry
+from parsing.domain_parse import combine_graphs
+
+
+def _baseline_combine_graphs(all_domain_connections, all_domain_genes, domains):
+    """combine_graphs as it was before the id-based rewrite (comments trimmed)."""
+    all_keys = set()
+    unique_links = set()
+    for domain_dict in all_domain_connections:
+        for key, value in domain_dict.items():
+            all_keys.add(key)
+            for key_1, key_2 in value.items():
+                unique_links.add((key, key_1, key_2))
+
+    combined = []
+    for key in all_keys:
+        source, target = key.split('#', 1)
+        reverse_key = f"{target}#{source}"
+        present_in_domains = [
+            any((u_key == key or u_key == reverse_key) and dom_name == domain
+                for u_key, dom_name, dom_bool in unique_links)
+            for domain in domains
+        ]
+        if not all(present_in_domains):
+            if all(dom_bool for u_key, _, dom_bool in unique_links if u_key == key or u_key == reverse_key):
+                if any(source in all_domain_genes[i][domains[i]] and target in all_domain_genes[i][domains[i]]
+                       for i, present in enumerate(present_in_domains) if not present):
+                    link_type = "solid_red"
+                else:
+                    link_type = "solid_color"
+            elif any(dom_bool for u_key, _, dom_bool in unique_links if u_key == key or u_key == reverse_key):
+                if any(source in all_domain_genes[i][domains[i]] and target in all_domain_genes[i][domains[i]]
+                       for i, present in enumerate(present_in_domains) if not present):
+                    link_type = "solid_red"
+                else:
+                    link_type = "dotted_color"
+            else:
+                link_type = "dotted_grey"
+        else:
+            if all(dom_bool for u_key, _, dom_bool in unique_links if u_key == key or u_key == reverse_key):
+                link_type = "solid_color"
+            elif any(dom_bool for u_key, _, dom_bool in unique_links if u_key == key or u_key == reverse_key):
+                link_type = "dotted_color"
+            else:
+                link_type = "dotted_grey"
+        combined.append({"source": source, "target": target, "link_type": link_type})
+    return combined
+
+
+def _random_domains(rng):
+    genes = [f"g{i}" for i in range(rng.randint(2, 9))]
+    domains = [f"D{i}" for i in range(rng.randint(1, 4))]
+    all_domain_connections, all_domain_genes = [], []
+    for domain in domains:
+        domain_genes = rng.sample(genes, rng.randint(0, len(genes)))
+        connections = {}
+        for _ in range(rng.randint(0, 2 * len(domain_genes))):
+            source, target = rng.choice(domain_genes), rng.choice(domain_genes)
+            if source != target:
+                connections[f"{source}#{target}"] = {domain: rng.random() < 0.5}
+        all_domain_connections.append(connections)
+        all_domain_genes.append({domain: domain_genes})
+    return all_domain_connections, all_domain_genes, domains
+
+
+def _as_tuples(links):
+    return [(link["source"], link["target"], link["link_type"]) for link in links]
+
+
+def test_combine_graphs_matches_baseline():
+    rng = random.Random(20240611)
+    for _ in range(500):
+        args = _random_domains(rng)
+        combined = _as_tuples(combine_graphs(*args))
+        # The baseline iterated a set, so only the multiset of links is comparable
+        assert Counter(combined) == Counter(_as_tuples(_baseline_combine_graphs(*args))), args
+        first_seen = list(dict.fromkeys(key for connections in args[0] for key in connections))
+        assert [f"{source}#{target}" for source, target, _ in combined] == first_seen
+
+
+def test_registry_ids_and_genomes():
+    registry = GeneRegistry(["a", "b", "c", "a"], ["X", "Y", None, "Y"])
+    assert len(registry) == 4
+    assert registry.ids(["a", "b", "c", "zz"]).tolist() == [3, 1, 2, -1]  # Last occurrence wins
+    assert registry.genome_names == ["X", "Y"]
+    assert registry.genome_codes(np.array([0, 1, 2, -1])).tolist() == [0, 1, -1, -1]
+    assert registry.genome_labels(["a", "b", "c", "zz"]).tolist() == ["Y", "Y", None, None]
+
+    assert registry.intern("b") == 1
+    new_id = registry.intern("d")
+    assert new_id == 4 and registry.intern("d") == 4
+    assert registry.names[new_id] == "d" and registry.genome_codes([new_id]).tolist() == [-1]
+    assert [registry.intern(name) for name in ("e", "a", "f")] == [5, 3, 6]
+    assert len(registry) == 7 and registry.names.tolist()[4:] == ["d", "e", "f"]
+    assert registry.genome_ids.tolist()[4:] == [-1, -1, -1]
+
+
+def test_of_is_cached_per_frame_and_rebuilt_on_reshape():
+    coords = pd.DataFrame({"name": ["a", "b"], "genome": ["X", "Y"], "position": [1, 2]})
+    registry = GeneRegistry.of(coords)
+    assert GeneRegistry.of(coords) is registry
+    assert GeneRegistry.of(coords.copy()) is not registry
+
+    coords.loc[2] = ["c", "Z", 3]
+    rebuilt = GeneRegistry.of(coords)
+    assert rebuilt is not registry and rebuilt.ids(["c"]).tolist() == [2]
+
+    index = CoordinateIndex.of(coords)
+    assert CoordinateIndex.of(coords) is index
+    coords["extra"] = 0
+    assert CoordinateIndex.of(coords) is not index
@@ -0,0 +1,52 @@
+import sys
+import os
+import json
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from parsing.graph_diff import diff_graph, diff_results, iter_diff_json
+
+
+def _graph(domain_name, nodes, links):
+    return {
+        "domain_name": domain_name,
+        "nodes": [{"id": name, "genome_name": genome} for name, genome in nodes],
+        "links": [{"source": s, "target": t, "score": score, "is_reciprocal": reciprocal}
+                  for s, t, score, reciprocal in links],
+    }
+
+
+BASE = [
+    _graph("NBS", [("a1", "A"), ("a2", "A"), ("b1", "B")],
+           [("a1", "b1", 90.0, True), ("a2", "b1", 80.0, False), ("b1", "a1", 90.0, True)]),
+    _graph("LRR", [("a1", "A")], []),
+]
+COMPARE = [
+    _graph("NBS", [("a1", "A"), ("b1", "C"), ("b2", "B")],
+           [("a1", "b1", 90.4, True), ("a1", "b2", 70.0, True), ("b1", "a1", 95.0, False)]),
+    _graph("TIR", [("a1", "A")], []),
+]
+
+
+def test_diff_graph():
+    diff = diff_graph(BASE[0], COMPARE[0], score_tolerance=0.5)
+    assert diff["nodes"]["added"] == ["b2"]
+    assert diff["nodes"]["removed"] == ["a2"]
+    assert diff["nodes"]["changed"] == [{"id": "b1", "fields": {"genome_name": ["B", "C"]}}]
+    assert diff["links"]["added"] == [["a1", "b2", "reciprocal", 70.0]]
+    assert diff["links"]["removed"] == [["a2", "b1", "one_way", 80.0]]
+    assert diff["links"]["type_changed"] == [["b1", "a1", "reciprocal", "one_way"]]
+    # 90.0 -> 90.4 is within the tolerance
+    assert diff["links"]["score_changed"] == [["b1", "a1", 90.0, 95.0]]
+    assert diff["summary"]["links_added"] == 1 and diff["summary"]["nodes_changed"] == 1
+
+
+def test_identical_graphs():
+    diff = diff_graph(BASE[0], BASE[0])
+    assert all(count == 0 for count in diff["summary"].values())
+
+
+def test_streamed_diff_matches():
+    expected = diff_results(BASE, COMPARE)
+    assert expected["added_graphs"] == ["TIR"] and expected["removed_graphs"] == ["LRR"]
+    assert [graph["domain_name"] for graph in expected["graphs"]] == ["NBS"]
+    streamed = b"".join(iter_diff_json(BASE, COMPARE, chunk_rows=1))
+    assert json.loads(streamed) == expected
@@ -0,0 +1,51 @@
+import json
+import sys
+import os
+from io import BytesIO
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from parsing.domain_parse import domain_parse, regenerate_domain
+from parsing.domain_state import DomainState
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "domain_testing", "Domtest10")
+MATRICES = ["domtest10_domain1_NBS.xlsx", "domtest10_domain2_LRR.xlsx", "domtest10_domain3_TIR.xlsx"]
+COORDS = "domtest10coords.xlsx"
+
+
+def _open(name):
+    file = BytesIO(open(os.path.join(FIXTURE_DIR, name), "rb").read())
+    file.name = name
+    return file
+
+
+def _canonical(graphs):
+    """Graphs with node/link order (and the set-derived genome order) ignored."""
+    return sorted(
+        (
+            g["domain_name"],
+            sorted(g["genomes"]),
+            sorted(json.dumps(n, sort_keys=True) for n in g["nodes"]),
+            sorted(json.dumps(l, sort_keys=True) for l in g["links"]),
+        )
+        for g in json.loads(json.dumps(graphs))
+    )
+
+
+def test_replace_matches_full_parse():
+    full, state = domain_parse([_open(m) for m in MATRICES], _open(COORDS), MATRICES, return_state=True)
+    state = DomainState.from_bytes(state.to_bytes())
+
+    graphs, _ = regenerate_domain(state, "replace", matrix_file=_open(MATRICES[1]), file_name=MATRICES[1])
+
+    assert _canonical(graphs) == _canonical(full)
+
+
+def test_remove_and_add_match_full_parse():
+    _, state = domain_parse([_open(m) for m in MATRICES], _open(COORDS), MATRICES, return_state=True)
+
+    graphs, state = regenerate_domain(state, "remove", domain="TIR")
+    two_domains = domain_parse([_open(m) for m in MATRICES[:2]], _open(COORDS), MATRICES[:2])
+    assert _canonical(graphs) == _canonical(two_domains)
+
+    graphs, _ = regenerate_domain(state, "add", matrix_file=_open(MATRICES[2]), file_name=MATRICES[2])
+    full = domain_parse([_open(m) for m in MATRICES], _open(COORDS), MATRICES)
+    assert _canonical(graphs) == _canonical(full)
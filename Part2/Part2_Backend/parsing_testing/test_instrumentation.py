@@ -0,0 +1,75 @@
+import threading
+
+from parsing.instrumentation import collect_timings, stage
+
+
+def test_stages_are_noops_without_a_collector():
+    with collect_timings(enabled=False) as timings:
+        with stage('outer') as s:
+            s.set(rows=1)
+    assert timings is None
+
+
+def test_nested_stage_depth_and_sizes():
+    with collect_timings(log=False) as timings:
+        with stage('outer', rows=3):
+            with stage('middle') as s:
+                with stage('inner'):
+                    pass
+                s.set(edges=5)
+        with stage('after'):
+            pass
+
+    records = {record["stage"]: record for record in timings.records}
+    # Records are appended as stages finish, so children come before their parents
+    assert [record["stage"] for record in timings.records] == ['inner', 'middle', 'outer', 'after']
+    assert [records[name]["depth"] for name in ('outer', 'middle', 'inner', 'after')] == [0, 1, 2, 0]
+    assert records['outer']["rows"] == 3 and records['middle']["edges"] == 5
+    assert all(record["seconds"] >= 0 for record in timings.records)
+    assert timings.to_dict()["stages"] is timings.records
+
+
+def test_failed_stage_is_recorded():
+    with collect_timings(log=False) as timings:
+        try:
+            with stage('broken'):
+                raise ValueError("bad matrix")
+        except ValueError:
+            pass
+    assert timings.records[0]["error"] == "ValueError"
+
+
+def test_memory_is_traced_for_a_single_collector():
+    with collect_timings(trace_memory=True, log=False) as timings:
+        with stage('allocate'):
+            data = [bytes(1024) for _ in range(100)]
+    assert timings.trace_memory
+    assert timings.records[0]["alloc_kib"] > 50
+    del data
+
+
+def test_memory_is_dropped_while_collectors_overlap():
+    inside, release = threading.Event(), threading.Event()
+
+    def other_request():
+        with collect_timings(log=False):
+            inside.set()
+            release.wait(5)
+
+    with collect_timings(trace_memory=True, log=False) as timings:
+        with stage('overlapped'):
+            thread = threading.Thread(target=other_request)
+            thread.start()
+            inside.wait(5)
+            # A collector starting now can't trace either: tracemalloc would mix both requests
+            with collect_timings(trace_memory=True, log=False) as second:
+                pass
+            release.set()
+            thread.join()
+        with stage('alone'):
+            pass
+
+    assert not second.trace_memory
+    records = {record["stage"]: record for record in timings.records}
+    assert "alloc_kib" not in records['overlapped']
+    assert "alloc_kib" in records['alone']
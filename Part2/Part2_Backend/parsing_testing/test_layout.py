@@ -0,0 +1,62 @@
+import sys
+import os
+import random
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import pytest
+from parsing.layout import compute_layout
+
+
+def _chart_layout(graph):
+    """The frontend's massage()/rowOf logic (Chart.svelte), one link at a time."""
+    genomes = graph["genomes"]
+    nodes = list(graph["nodes"])
+    copies = {}
+    if len(genomes) > 2:
+        for i, node in enumerate(graph["nodes"]):
+            if node["genome_name"] == genomes[0]:
+                copies[node["id"]] = len(nodes)
+                nodes.append({**node, "_dup": True})
+    index = {node["id"]: i for i, node in enumerate(graph["nodes"])}
+
+    def row(i):
+        return len(genomes) if nodes[i].get("_dup") else genomes.index(nodes[i]["genome_name"])
+
+    endpoints = []
+    for link in graph["links"]:
+        source, target = index[link["source"]], index[link["target"]]
+        visible = nodes[source]["genome_name"] != nodes[target]["genome_name"]
+        if len(genomes) > 2 and abs(row(source) - row(target)) > 1:
+            if nodes[source]["genome_name"] == genomes[0]:
+                source = copies[link["source"]]
+            elif nodes[target]["genome_name"] == genomes[0]:
+                target = copies[link["target"]]
+        endpoints.append((source, target, int(visible)))
+    return endpoints
+
+
+@pytest.mark.parametrize("n_genomes", [2, 4])
+def test_layout_matches_chart(n_genomes):
+    rng = random.Random(n_genomes)
+    genomes = [f"G{i}" for i in range(n_genomes)]
+    nodes = [{"id": f"n{i}", "genome_name": genomes[i % n_genomes], "rel_position": i // n_genomes + 1,
+              "direction": rng.choice(["plus", "minus"])} for i in range(60)]
+    links = [{"source": f"n{rng.randrange(60)}", "target": f"n{rng.randrange(60)}"} for _ in range(300)]
+    graph = {"genomes": genomes, "nodes": nodes, "links": links}
+
+    layout = compute_layout(graph)
+    expected_copies = [i for i, node in enumerate(nodes) if node["genome_name"] == "G0"] if n_genomes > 2 else []
+    assert layout["duplicates"] == expected_copies
+    assert layout["rows"] == (genomes + ["G0"] if n_genomes > 2 else genomes)
+    assert layout["nodes"]["row"] == ([genomes.index(node["genome_name"]) for node in nodes]
+                                      + [n_genomes] * len(expected_copies))
+
+    links_layout = layout["links"]
+    actual = list(zip(links_layout["source"], links_layout["target"], links_layout["visible"]))
+    assert actual == _chart_layout(graph)
+
+
+def test_unknown_link_endpoint():
+    graph = {"genomes": ["A", "B"], "nodes": [{"id": "a", "genome_name": "A", "rel_position": 1}],
+             "links": [{"source": "a", "target": "missing"}]}
+    links = compute_layout(graph)["links"]
+    assert links["target"] == [-1] and links["visible"] == [0]
@@ -0,0 +1,39 @@
+from flask import Flask
+
+from profiling.request_profiler import init_profiling, KEY_HEADER
+
+
+def _app():
+    app = Flask(__name__)
+
+    @app.route('/ping')
+    def ping():
+        return "pong"
+
+    init_profiling(app)
+    return app
+
+
+def test_profiling_is_a_noop_when_unset(monkeypatch, tmp_path):
+    monkeypatch.delenv('REQUEST_PROFILING', raising=False)
+    monkeypatch.setenv('REQUEST_PROFILING_DIR', str(tmp_path))
+    app = _app()
+
+    assert not app.before_request_funcs and not app.after_request_funcs and not app.teardown_request_funcs
+    response = app.test_client().get('/ping', headers={'X-Profile': 'cprofile'})
+    assert response.status_code == 200 and KEY_HEADER not in response.headers
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_profile_key_is_generated_server_side(monkeypatch, tmp_path):
+    monkeypatch.setenv('REQUEST_PROFILING', '1')
+    monkeypatch.delenv('REQUEST_PROFILING_TOKEN', raising=False)
+    monkeypatch.setenv('REQUEST_PROFILING_DIR', str(tmp_path))
+    client = _app().test_client()
+
+    headers = {'X-Profile': 'cprofile', 'X-Request-Id': 'abc'}
+    keys = [client.get('/ping', headers=headers).headers[KEY_HEADER] for _ in range(2)]
+
+    assert keys[0] != keys[1]
+    assert all(key.startswith('abc-') and key.endswith('.pstats') for key in keys)
+    assert sorted(p.name for p in tmp_path.glob('*.pstats')) == sorted(keys)
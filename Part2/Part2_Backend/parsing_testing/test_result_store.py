@@ -0,0 +1,82 @@
+import pytest
+
+from services.result_store import LocalResultStore, ResultExpiredError
+
+
+def test_staged_result_is_bound_to_its_owner(tmp_path):
+    store = LocalResultStore(str(tmp_path))
+    result_id = store.put(b'{"graphs": []}', owner="user-a")
+
+    assert store.get(result_id, "user-a") == b'{"graphs": []}'
+    with pytest.raises(ResultExpiredError):
+        store.get(result_id, "user-b")
+    with pytest.raises(ResultExpiredError):
+        store.get(result_id)
+
+    store.delete(result_id)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_anonymous_result_is_readable_by_id(tmp_path):
+    store = LocalResultStore(str(tmp_path))
+    result_id = store.put(b'[]')
+    assert store.get(result_id) == b'[]'
+    assert store.get(result_id, "user-a") == b'[]'
+
+
+def test_promote_can_return_the_staged_bytes(tmp_path, monkeypatch):
+    uploads = []
+    monkeypatch.setattr("services.s3_service.upload_bytes",
+                        lambda data, ext, content_encoding=None: uploads.append(data) or "graphs/key.json")
+    store = LocalResultStore(str(tmp_path))
+    result_id = store.put(b'{"graphs": []}', owner="user-a")
+
+    s3_key, _, data = store.promote(result_id, "identity", "user-a", return_data=True)
+    assert (s3_key, data, uploads) == ("graphs/key.json", b'{"graphs": []}', [b'{"graphs": []}'])
+    with pytest.raises(ResultExpiredError):
+        store.get(result_id, "user-a")
+
+
+def _save(tmp_path, monkeypatch, commit_fails):
+    from contextlib import contextmanager, nullcontext
+    from types import SimpleNamespace
+    from server import app
+    import controllers.group.controller as group_controller
+
+    store = LocalResultStore(str(tmp_path))
+    result_id = store.put(b'[{"nodes": [], "links": []}]', owner="user-a")
+    deleted = []
+
+    @contextmanager
+    def session_scope():
+        yield SimpleNamespace(begin_nested=nullcontext)
+        if commit_fails:
+            raise RuntimeError("commit failed")
+
+    monkeypatch.setattr("services.s3_service.upload_bytes", lambda data, ext, content_encoding=None: "graphs/key.json")
+    monkeypatch.setattr(group_controller, "session_scope", session_scope)
+    monkeypatch.setattr(group_controller, "get_result_store", lambda: store)
+    monkeypatch.setattr(group_controller, "get_first_or_none", lambda *args, **kwargs: SimpleNamespace(id="user-a"))
+    monkeypatch.setattr(group_controller, "create_group", lambda *args: SimpleNamespace(id="group-1"))
+    monkeypatch.setattr(group_controller, "add_file", lambda *args: None)
+    monkeypatch.setattr(group_controller, "index_group", lambda *args: 0)
+    monkeypatch.setattr(group_controller, "upload_to_s3", lambda file: ("uploads/file", "file"))
+    monkeypatch.setattr(group_controller, "delete_key", deleted.append)
+    with app.app_context():
+        _, status = group_controller.save_group("user-a", "t", "", object(), [object()], False, [], 0, 0, None,
+                                                result_id=result_id)
+    return store, result_id, status, deleted
+
+
+def test_failed_save_keeps_the_staged_result(tmp_path, monkeypatch):
+    store, result_id, status, deleted = _save(tmp_path, monkeypatch, commit_fails=True)
+    assert status == 500
+    assert deleted == ["graphs/key.json"]
+    assert store.get(result_id, "user-a")  # The client can retry with the same id
+
+
+def test_committed_save_deletes_the_staged_result(tmp_path, monkeypatch):
+    store, result_id, status, deleted = _save(tmp_path, monkeypatch, commit_fails=False)
+    assert status == 200 and deleted == []
+    with pytest.raises(ResultExpiredError):
+        store.get(result_id, "user-a")
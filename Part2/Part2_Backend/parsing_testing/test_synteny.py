@@ -0,0 +1,50 @@
+import sys
+import os
+from io import BytesIO
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.config import FileProcessingConfig
+from core.coordinate_file import CoordinateFile
+from parsing.synteny import find_synteny_blocks
+
+# A: a1..a8 on the plus strand; B: b1..b5 plus, b6..b8 minus
+ROWS = ([f"a{i},p,A,{i * 100},plus" for i in range(1, 9)]
+        + [f"b{i},p,B,{i * 100},{'plus' if i <= 5 else 'minus'}" for i in range(1, 9)])
+
+
+def _coords():
+    file = BytesIO(("name,protein_name,genome,position,orientation\n" + "\n".join(ROWS) + "\n").encode("utf-8"))
+    file.name = "coords.csv"
+    coord_file = CoordinateFile(file, FileProcessingConfig())
+    coord_file.load_data()
+    return coord_file.clean()
+
+
+def _link(source, target, reciprocal=True, score=90.0):
+    return {"source": source, "target": target, "score": score, "is_reciprocal": reciprocal}
+
+
+def test_collinear_and_inverted_blocks():
+    links = [_link(f"a{i}", f"b{i}") for i in range(1, 5)]
+    links += [_link("b2", "a2"), _link("a5", "b1"), _link("a5", "b5", reciprocal=False)]
+    links += [_link("a6", "b8"), _link("a7", "b7"), _link("b6", "a8", score=60.0)]
+
+    blocks = find_synteny_blocks(links, _coords(), max_gap=1, min_anchors=3)
+
+    assert [(b["orientation"], b["anchors"], b["start_a"], b["end_a"], b["start_b"], b["end_b"]) for b in blocks] == [
+        ("plus", 4, "a1", "a4", "b1", "b4"),
+        ("minus", 3, "a6", "a8", "b8", "b6"),
+    ]
+    assert blocks[1]["genome_a"] == "A" and blocks[1]["genome_b"] == "B"
+    assert (blocks[1]["rel_start_b"], blocks[1]["rel_end_b"]) == (8, 6)
+    assert blocks[1]["mean_score"] == 80.0
+
+
+def test_gap_and_strand_limits():
+    links = [_link("a1", "b1"), _link("a2", "b2"), _link("a5", "b5")]
+    assert find_synteny_blocks(links, _coords(), max_gap=1, min_anchors=3) == []
+    assert len(find_synteny_blocks(links, _coords(), max_gap=2, min_anchors=3)) == 1
+
+    # Opposite strands can only form an inverted block when strands are checked
+    links = [_link("a3", "b6"), _link("a4", "b7"), _link("a5", "b8")]
+    assert find_synteny_blocks(links, _coords(), max_gap=1) == []
+    assert [b["orientation"] for b in find_synteny_blocks(links, _coords(), max_gap=1, strand_match=False)] == ["plus"]
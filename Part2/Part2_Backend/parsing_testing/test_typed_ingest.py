@@ -0,0 +1,71 @@
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.config import FileProcessingConfig
+from core.file_structures import CoordinateFileStructure
+from parsing.io_utils import read_file
+
+COORDS = b"""name,protein_name,genome,gene_type,orientation,position
+g1,000123,0042,1,plus,"1,253,689"
+g2,1e5,0042,2,minus,2500
+g3,NA_1,7,1,plus,3750
+"""
+
+MATRIX = b""",0123,1e5,g3
+0123,100,55.5,
+1e5,55.5,100,60
+g3,,60,100
+"""
+
+
+def _named(data, name):
+    file = BytesIO(data)
+    file.name = name
+    return file
+
+
+def _read(data, name, file_type, **options):
+    return read_file(_named(data, name), file_type, FileProcessingConfig(**options))
+
+
+def test_read_dtypes_cover_string_columns_only():
+    structure = CoordinateFileStructure()
+    dtypes = structure.get_read_dtypes(['name', 'protein_name', 'genome', 'position', 'domain1_TIR_start', 'extra'])
+    assert dtypes == {'name': str, 'protein_name': str, 'genome': str}
+
+
+def test_numeric_looking_coordinate_text_stays_text():
+    coords = _read(COORDS, 'coords.csv', 'coordinate')
+    assert coords['protein_name'].tolist() == ['000123', '1e5', 'NA_1']
+    assert coords['genome'].tolist() == ['0042', '0042', '7']
+    assert coords['gene_type'].tolist() == ['1', '2', '1']
+    assert pd.api.types.is_numeric_dtype(coords['position'])
+    assert coords['position'].tolist() == [1253689, 2500, 3750]
+
+
+def test_matrix_labels_are_text_and_scores_one_float_block():
+    matrix = _read(MATRIX, 'matrix.csv', 'matrix')
+    assert matrix.iloc[:, 0].tolist() == ['0123', '1e5', 'g3']
+    assert list(matrix.columns[1:]) == ['0123', '1e5', 'g3']
+    assert (matrix.dtypes.iloc[1:] == np.float64).all()
+    assert matrix.iloc[0, 1:].tolist()[:2] == [100.0, 55.5] and np.isnan(matrix.iloc[0, 3])
+
+    float32 = _read(MATRIX, 'matrix.csv', 'matrix', matrix_float_dtype='float32')
+    assert (float32.dtypes.iloc[1:] == np.float32).all()
+
+
+def test_tsv_matches_csv():
+    tsv = _read(MATRIX.replace(b',', b'\t'), 'matrix.tsv', 'matrix')
+    pd.testing.assert_frame_equal(tsv, _read(MATRIX, 'matrix.csv', 'matrix'))
+
+
+def test_pyarrow_engine_matches_c_engine():
+    pytest.importorskip('pyarrow')
+    plain_coords = COORDS.replace(b'"1,253,689"', b'1253689')
+    pd.testing.assert_frame_equal(_read(plain_coords, 'coords.csv', 'coordinate', csv_engine='pyarrow'),
+                                  _read(plain_coords, 'coords.csv', 'coordinate'), check_dtype=False)
+    pd.testing.assert_frame_equal(_read(MATRIX, 'matrix.csv', 'matrix', csv_engine='pyarrow'),
+                                  _read(MATRIX, 'matrix.csv', 'matrix'))
@@ -0,0 +1,77 @@
+import os
+import re
+import zipfile
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.config import FileProcessingConfig
+from parsing import xlsx_reader
+from parsing.xlsx_reader import read_xlsx, read_matrix_rows
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+FIXTURES = [os.path.join(HERE, path) for path in (
+    'general_testing/Gentest1/gentest1matrix.xlsx',
+    'general_testing/Gentest1/gentest1coords.xlsx',
+    'general_testing/Gentest10/gentest10matrix.xlsx',
+    'domain_testing/Domtest1/domtest1_domain1_NBS.xlsx',
+    'domain_testing/Domtest1/domtest1coords.xlsx',
+)]
+
+
+def _readers():
+    readers = ['stream']
+    try:
+        import python_calamine  # noqa: F401
+        readers.append('calamine')
+    except ImportError:
+        pass
+    return readers
+
+
+def _file_type(path):
+    return 'coordinate' if 'coords' in os.path.basename(path) else 'matrix'
+
+
+@pytest.mark.parametrize('reader', _readers())
+@pytest.mark.parametrize('path', FIXTURES, ids=os.path.basename)
+def test_streaming_readers_match_read_excel(path, reader):
+    with open(path, 'rb') as f:
+        raw = f.read()
+    expected = pd.read_excel(BytesIO(raw), engine='openpyxl')
+    result = read_xlsx(raw, _file_type(path), FileProcessingConfig(xlsx_reader=reader))
+    # Matrix scores are always one float block; read_excel may infer ints
+    pd.testing.assert_frame_equal(result, expected, check_dtype=_file_type(path) != 'matrix')
+
+
+def _with_dimension(raw, ref):
+    """Copy of a workbook whose first sheet claims a different (or no) <dimension>."""
+    source, out = zipfile.ZipFile(BytesIO(raw)), BytesIO()
+    with zipfile.ZipFile(out, 'w') as target:
+        for item in source.infolist():
+            data = source.read(item.filename)
+            if item.filename == 'xl/worksheets/sheet1.xml':
+                replacement = b'' if ref is None else b'<dimension ref="' + ref + b'"/>'
+                data = re.sub(rb'<dimension ref="[^"]*"/>', replacement, data)
+            target.writestr(item, data)
+    return out.getvalue()
+
+
+@pytest.mark.parametrize('ref', [None, b'A1:B2', b'A1:XFD1048576'])
+def test_missing_or_bogus_dimension(ref):
+    with open(FIXTURES[0], 'rb') as f:
+        raw = f.read()
+    expected = read_xlsx(raw, 'matrix', FileProcessingConfig(xlsx_reader='stream'))
+    result = read_xlsx(_with_dimension(raw, ref), 'matrix', FileProcessingConfig(xlsx_reader='stream'))
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_preallocation_is_capped(monkeypatch):
+    monkeypatch.setattr(xlsx_reader, 'MAX_PREALLOCATED_CELLS', 64)
+    rows = iter([(None, 'a', 'b')] + [(f'g{i}', float(i), None) for i in range(100)])
+    # A claimed billion rows must not be allocated up front
+    frame = read_matrix_rows(rows, 10 ** 9)
+    assert frame.shape == (100, 3)
+    assert frame['a'].tolist() == [float(i) for i in range(100)] and np.isnan(frame['b']).all()
@@ -0,0 +1,144 @@
+"""
+Startup profiler for the Flask/Zappa server.
+
+Runs a fresh interpreter with ``-X importtime`` and reports how long each module
+takes to import, split into stages: the server module itself (what every cold
+start pays) followed by the modules each endpoint imports lazily on first use.
+
+Usage:
+    python -m profiling.import_profiler
+    python -m profiling.import_profiler --top 15 --json
+    python -m profiling.import_profiler server parsing.general_parse
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from dataclasses import dataclass, asdict
+from typing import Dict, List, Optional
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Imported in this order: the server module first, then whatever the endpoints
+# import on their first request.
+DEFAULT_STAGES = [
+    'server',
+    'controllers.auth.controller',
+    'controllers.group.controller',
+    'controllers.graph.controller',
+    'parsing.general_parse',
+    'parsing.domain_parse',
+]
+
+_STAGE_MARKER = '@@import-stage '
+
+
+@dataclass
+class ModuleImport:
+    """Import timing for a single module, in microseconds."""
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+@dataclass
+class StageReport:
+    """All modules first imported while importing one stage target."""
+    stage: str
+    total_us: int
+    modules: List[ModuleImport]
+
+    def top(self, limit: int) -> List[ModuleImport]:
+        return sorted(self.modules, key=lambda m: m.self_us, reverse=True)[:limit]
+
+
+def _parse_importtime_line(line: str) -> Optional[ModuleImport]:
+    # Format: "import time:   self [us] |  cumulative | imported package"
+    if not line.startswith('import time:'):
+        return None
+    parts = line[len('import time:'):].split('|')
+    if len(parts) != 3:
+        return None
+    try:
+        self_us = int(parts[0].strip())
+        cumulative_us = int(parts[1].strip())
+    except ValueError:
+        return None  # header line
+    name = parts[2].rstrip()
+    depth = (len(name) - len(name.lstrip())) // 2
+    return ModuleImport(module=name.strip(), self_us=self_us, cumulative_us=cumulative_us, depth=depth)
+
+
+def profile_imports(stages: List[str] = None, env: Dict[str, str] = None) -> List[StageReport]:
+    """
+    Import each stage module in a fresh interpreter and collect per-module timings.
+
+    Args:
+        stages: Module names to import, in order
+        env: Extra environment variables for the child interpreter
+
+    Returns:
+        One StageReport per stage, each only counting modules that were not
+        already imported by an earlier stage
+    """
+    stages = stages or DEFAULT_STAGES
+    code = '; '.join(
+        f"import sys; sys.stderr.write({(_STAGE_MARKER + stage)!r} + '\\n'); sys.stderr.flush(); import {stage}"
+        for stage in stages
+    )
+    child_env = {**os.environ, **(env or {})}
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=BACKEND_DIR,
+        env=child_env,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"Import of {stages} failed:\n{proc.stderr[-2000:]}")
+
+    reports: List[StageReport] = []
+    current: Optional[StageReport] = None
+    for line in proc.stderr.splitlines():
+        if line.startswith(_STAGE_MARKER):
+            current = StageReport(stage=line[len(_STAGE_MARKER):], total_us=0, modules=[])
+            reports.append(current)
+            continue
+        record = _parse_importtime_line(line)
+        if record is None or current is None:
+            continue
+        current.modules.append(record)
+        if record.depth == 0:
+            current.total_us += record.cumulative_us
+    return reports
+
+
+def format_report(reports: List[StageReport], top: int = 10) -> str:
+    lines = []
+    for report in reports:
+        lines.append(f"{report.stage}: {report.total_us / 1000:.1f} ms ({len(report.modules)} new modules)")
+        for module in report.top(top):
+            lines.append(f"    {module.self_us / 1000:8.1f} ms self  {module.cumulative_us / 1000:8.1f} ms cumulative  {module.module}")
+    return '\n'.join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Report per-module import time for server cold starts')
+    parser.add_argument('stages', nargs='*', help='Modules to import in order (defaults to the server and its lazily imported controllers)')
+    parser.add_argument('--top', type=int, default=10, help='Number of slowest modules to list per stage')
+    parser.add_argument('--json', action='store_true', help='Emit machine-readable JSON instead of a table')
+
+    args = parser.parse_args()
+
+    try:
+        results = profile_imports(args.stages or None)
+    except RuntimeError as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        sys.exit(1)
+
+    if args.json:
+        print(json.dumps([asdict(r) for r in results], indent=2))
+    else:
+        print(format_report(results, args.top))
@@ -0,0 +1,253 @@
+"""
+Opt-in per-request profiler for the Flask server.
+
+Profiling is armed with REQUEST_PROFILING=1 and then only runs for requests
+that carry an ``X-Profile`` header, so a single slow upload can be captured in
+production without redeploying or slowing down everyone else:
+
+    curl -H 'X-Profile: cprofile' -H 'X-Profile-Token: ...' -F ... $API/generate_graph
+
+Modes (value of the X-Profile header):
+    cprofile  deterministic cProfile, written as a .pstats file
+              (open with ``python -m pstats`` or snakeviz)
+    sample    wall-clock stack sampler, written as speedscope JSON
+              (drop it on https://www.speedscope.app)
+
+Configuration:
+    REQUEST_PROFILING           '1' to enable the hook at all
+    REQUEST_PROFILING_TOKEN     if set, X-Profile-Token must match it
+    REQUEST_PROFILING_SINK      'local' (default) or 's3'
+    REQUEST_PROFILING_DIR       directory for the local sink (default <tmp>/request-profiles)
+    REQUEST_PROFILING_INTERVAL  sampling interval in seconds (default 0.005)
+
+Profiles are stored under a server-generated key: the request id (the
+X-Request-Id header or the Lambda request id under Zappa) for correlation,
+followed by a fresh uuid so a client can't pick or overwrite another
+profile's key. The key is returned in the X-Profile-Key response header.
+"""
+import cProfile
+import hmac
+import json
+import logging
+import marshal
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger('request.profiler')
+
+PROFILE_HEADER = 'X-Profile'
+TOKEN_HEADER = 'X-Profile-Token'
+KEY_HEADER = 'X-Profile-Key'
+S3_PREFIX = 'profiles'
+MODES = ('cprofile', 'sample')
+DEFAULT_INTERVAL = 0.005
+MAX_STACK_DEPTH = 256
+
+
+def profiling_enabled() -> bool:
+    return os.getenv('REQUEST_PROFILING', '').lower() in ('1', 'true', 'yes')
+
+
+class SamplingProfiler:
+    """
+    Samples one thread's Python stack on a background thread.
+
+    Cheaper than cProfile on call-heavy code (pandas, row loops) and measures
+    wall time, so time spent waiting on S3 or the database shows up too.
+    """
+
+    def __init__(self, thread_id: int, interval: float = DEFAULT_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.frames: List[Dict] = []
+        self._frame_index: Dict[Tuple[str, str, int], int] = {}
+        self.samples: List[List[int]] = []
+        self.weights: List[float] = []
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.started_at = 0.0
+        self.stopped_at = 0.0
+
+    def _frame_id(self, code) -> int:
+        key = (code.co_name, code.co_filename, code.co_firstlineno)
+        index = self._frame_index.get(key)
+        if index is None:
+            index = len(self.frames)
+            self._frame_index[key] = index
+            self.frames.append({"name": code.co_name, "file": code.co_filename, "line": code.co_firstlineno})
+        return index
+
+    def _run(self):
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            now = time.perf_counter()
+            if frame is None:
+                break
+            stack = []
+            while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                stack.append(self._frame_id(frame.f_code))
+                frame = frame.f_back
+            stack.reverse()  # speedscope wants root first
+            self.samples.append(stack)
+            self.weights.append(now - last)
+            last = now
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name='request-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.stopped_at = time.perf_counter()
+
+    def to_speedscope(self, name: str) -> Dict:
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "exporter": "request_profiler",
+            "name": name,
+            "shared": {"frames": self.frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": name,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": round(self.stopped_at - self.started_at, 6),
+                "samples": self.samples,
+                "weights": [round(w, 6) for w in self.weights],
+            }],
+        }
+
+
+class RequestProfile:
+    """A running profile for one request."""
+
+    def __init__(self, mode: str, request_id: str, interval: float = DEFAULT_INTERVAL):
+        self.mode = mode
+        self.request_id = request_id
+        self.key = profile_key(request_id)
+        self.interval = interval
+        self._profiler = None
+
+    def start(self):
+        self.start_time = time.perf_counter()
+        if self.mode == 'cprofile':
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        else:
+            self._profiler = SamplingProfiler(threading.get_ident(), self.interval)
+            self._profiler.start()
+
+    def stop(self) -> float:
+        if self.mode == 'cprofile':
+            self._profiler.disable()
+        else:
+            self._profiler.stop()
+        return time.perf_counter() - self.start_time
+
+    def dump(self, name: str) -> Tuple[bytes, str]:
+        """Return (profile bytes, file extension)."""
+        if self.mode == 'cprofile':
+            # Same on-disk format as pstats.Stats.dump_stats
+            self._profiler.create_stats()
+            return marshal.dumps(self._profiler.stats), 'pstats'
+        return json.dumps(self._profiler.to_speedscope(name)).encode('utf-8'), 'speedscope.json'
+
+
+def _request_id(request) -> str:
+    request_id = request.headers.get('X-Request-Id')
+    if not request_id:
+        # Zappa exposes the Lambda context in the WSGI environ
+        context = request.environ.get('lambda.context')
+        request_id = getattr(context, 'aws_request_id', None)
+    # Ends up in file names and S3 keys
+    return ''.join(c if c.isalnum() or c in '-_' else '_' for c in request_id or '')[:64]
+
+
+def profile_key(request_id: str) -> str:
+    """Storage key for a profile: the (sanitized) request id plus a server-side uuid."""
+    return f"{request_id}-{uuid.uuid4().hex}" if request_id else uuid.uuid4().hex
+
+
+def write_profile(key: str, data: bytes, extension: str, metadata: Dict[str, str]) -> str:
+    """Store a profile in the configured sink and return where it went."""
+    sink = os.getenv('REQUEST_PROFILING_SINK', 'local').lower()
+    if sink == 's3':
+        from services import s3_service
+        s3_key = f"{S3_PREFIX}/{key}.{extension}"
+        s3_service.put_bytes(s3_key, data, extension.rsplit('.', 1)[-1], metadata=metadata)
+        return f"s3://{os.getenv('S3_BUCKET_NAME')}/{s3_key}"
+
+    directory = os.getenv('REQUEST_PROFILING_DIR') or os.path.join(tempfile.gettempdir(), 'request-profiles')
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{key}.{extension}")
+    with open(path, 'wb') as f:
+        f.write(data)
+    with open(os.path.join(directory, f"{key}.meta.json"), 'w') as f:
+        json.dump(metadata, f)
+    return path
+
+
+def init_profiling(app):
+    """
+    Register the profiling hooks on a Flask app.
+
+    Does nothing unless REQUEST_PROFILING is set, so the disabled cost is zero.
+    """
+    if not profiling_enabled():
+        return
+
+    from flask import g, request
+
+    token = os.getenv('REQUEST_PROFILING_TOKEN')
+    interval = float(os.getenv('REQUEST_PROFILING_INTERVAL', DEFAULT_INTERVAL))
+
+    @app.before_request
+    def _start_profile():
+        mode = request.headers.get(PROFILE_HEADER, '').lower()
+        if mode not in MODES:
+            return
+        if token and not hmac.compare_digest(request.headers.get(TOKEN_HEADER, ''), token):
+            return
+        profile = RequestProfile(mode, _request_id(request), interval)
+        profile.start()
+        g.request_profile = profile
+
+    @app.after_request
+    def _finish_profile(response):
+        profile = g.pop('request_profile', None)
+        if profile is None:
+            return response
+        seconds = profile.stop()
+        name = f"{request.method} {request.path}"
+        metadata = {
+            "request_id": profile.request_id,
+            "mode": profile.mode,
+            "endpoint": name,
+            "status": str(response.status_code),
+            "seconds": f"{seconds:.6f}",
+        }
+        try:
+            data, extension = profile.dump(name)
+            location = write_profile(profile.key, data, extension, metadata)
+            response.headers[KEY_HEADER] = f"{profile.key}.{extension}"
+            logger.info(json.dumps({"event": "request_profile", "location": location, **metadata}))
+        except Exception as e:
+            # Never fail the request because the profile could not be written
+            print(f"Error writing request profile: {str(e)}")
+        return response
+
+    @app.teardown_request
+    def _discard_profile(exc):
+        # after_request is skipped when the handler raises; make sure profilers stop
+        profile = g.pop('request_profile', None)
+        if profile is not None:
+            profile.stop()
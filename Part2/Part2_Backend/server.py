@@ -1,43 +1,158 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
 
 import json
+import os
 
 from auth_utils import authenticate_user
 
-from controllers.group.controller import get_group_graph
-from controllers.group.controller import save_group
-from controllers.group.controller import get_user_file_groups
-from controllers.group.controller import delete_group
-from controllers.graph.controller import generate_graph
-from controllers.graph.controller import download
-from controllers.auth.controller import verify_user_entry
-
 from exception_templates.auth_exception import AuthenticationError
+from exception_templates.admission_exception import AdmissionRejected
+from profiling.request_profiler import init_profiling
+
+# Controllers are imported inside the route handlers rather than here. Each one
+# drags in a different part of the stack (pandas/openpyxl for parsing, boto3 for
+# S3, SQLAlchemy models for the DB), and importing them all at module load made
+# every Lambda cold start pay for all of it. Run `python -m profiling.import_profiler`
+# to see what each endpoint costs on first use.
 
 
 # Initialize Flask app
 app = Flask(__name__)
-CORS(app)
+CORS(app, expose_headers=["Retry-After"])  # Lets the frontend back off on 429/503
+# No-op unless REQUEST_PROFILING is set; see profiling/request_profiler.py
+init_profiling(app)
+# Behind a proxy other than API Gateway, TRUSTED_PROXY_HOPS is the number of proxies in front of
+# the app; X-Forwarded-For only replaces remote_addr when it is set, and only that many hops deep
+if int(os.getenv('TRUSTED_PROXY_HOPS', '0')) > 0:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=int(os.getenv('TRUSTED_PROXY_HOPS')))
 
 
 # Expects a query parameter 'groupId' in the URL; e.g., /get_group_graph?groupId=123
 @app.route('/get_group_graph', methods=['GET'])
 def controller_get_group_graph():
+    from controllers.group.controller import get_group_graph
+    group_id = request.args.get('groupId')
+    include_graph = request.args.get('include_graph', 'true').lower() == 'true'
+    return get_group_graph(group_id, include_graph)
+
+
+# Streams just the stored graph JSON, passing stored compression through when the client accepts it
+@app.route('/get_group_graph_data', methods=['GET'])
+def controller_get_group_graph_data():
+    from controllers.group.controller import get_group_graph_data
     group_id = request.args.get('groupId')
-    return get_group_graph(group_id)
+    return get_group_graph_data(group_id, request.headers.get('Accept-Encoding'))
+
+
+def _timings_param():
+    # 'timings=true' returns per-stage timings with the graph; 'timings=memory' adds allocation deltas
+    value = (request.form.get('timings') or request.args.get('timings') or '').lower()
+    if value == 'memory':
+        return 'memory'
+    return value == 'true'
+
 
+def _layout_param():
+    # 'layout=true' adds the precomputed diagram layout to each graph (parsing/layout.py); unset follows GRAPH_LAYOUT
+    value = request.form.get('layout') or request.args.get('layout')
+    return None if value is None else value.lower() == 'true'
 
+
+def _request_owner():
+    # Optional sign-in: results staged with a valid token are bound to the user (services/result_store.py)
+    if not request.headers.get('Authorization'):
+        return None
+    access_claims, _ = authenticate_user(request)
+    return access_claims['sub']
+
+
+def _client_id():
+    # On Lambda, Zappa passes the API Gateway event through; its sourceIp is the caller's address as
+    # API Gateway saw it, unlike X-Forwarded-For, which the caller can set
+    event = request.environ.get('lambda.event') or {}
+    identity = (event.get('requestContext') or {}).get('identity') or {}
+    return identity.get('sourceIp') or request.remote_addr
+
+
+# Requests are admitted by estimated cost (services/admission.py); saturation returns 429/503 with Retry-After
 @app.route('/generate_graph', methods=['POST'])
 def controller_generate_graph():
+    from controllers.graph.controller import generate_graph
+    from services.admission import get_admission_controller
     coordinate_file = request.files.get('file_coordinate')
     matrix_files = [file for key, file in request.files.items() if key.startswith('file_matrix_')]
     is_domain_specific = request.form.get('is_domain_specific', 'false').lower() == 'true'
-    return generate_graph(coordinate_file, matrix_files, is_domain_specific)
+    genome_pairs = request.form.get('genome_pairs')  # Optional: 'genomeA:genomeB,...' limits links to these pairs
+    # Optional (domain-specific): long-format protein,start,end,domain file, e.g. Part1 combine_coords.py output
+    domain_coordinate_file = request.files.get('file_domain_coordinate')
+    # Optional (domain-specific): also stage the per-domain intermediates for /regenerate_domain and /save
+    keep_state = request.form.get('keep_state', 'false').lower() == 'true'
+    try:
+        owner = _request_owner()
+    except AuthenticationError as e:
+        return jsonify({"error": e.message}), e.status_code
+    try:
+        with get_admission_controller().admit(matrix_files, is_domain_specific, _client_id()):
+            return generate_graph(coordinate_file, matrix_files, is_domain_specific, include_timings=_timings_param(),
+                                  genome_pairs=genome_pairs, domain_coordinate_file=domain_coordinate_file,
+                                  layout=_layout_param(), owner=owner, keep_state=keep_state)
+    except AdmissionRejected as e:
+        return jsonify({"error": e.message}), e.status_code, {"Retry-After": str(e.retry_after)}
+
+
+# Swap, add or remove one domain matrix without re-parsing the others.
+# Expects form fields 'action' (replace/add/remove), 'state_id' or 'group_id',
+# optional 'domain' and, for replace/add, the new matrix as 'file_matrix'.
+# A group_id must be one of the signed-in user's projects.
+@app.route('/regenerate_domain', methods=['POST'])
+def controller_regenerate_domain():
+    from controllers.graph.controller import regenerate_domain_graph
+    state_id = request.form.get('state_id')
+    group_id = request.form.get('group_id')
+    try:
+        if group_id and not state_id:
+            access_claims, _ = authenticate_user(request)
+            owner = access_claims['sub']
+        else:
+            owner = _request_owner()
+    except AuthenticationError as e:
+        return jsonify({"error": e.message}), e.status_code
+    return regenerate_domain_graph(
+        request.form.get('action', 'replace').lower(),
+        state_id=state_id,
+        group_id=group_id,
+        domain=request.form.get('domain'),
+        matrix_file=request.files.get('file_matrix'),
+        include_timings=_timings_param(),
+        layout=_layout_param(),
+        owner=owner,
+    )
+
+
+# Differences between two graph results; each side is one of the user's saved projects or a staged result.
+# e.g. /diff_graphs?base_group_id=<group uuid>&compare_result_id=<result id>[&score_tolerance=0.5]
+@app.route('/diff_graphs', methods=['GET'])
+def controller_diff_graphs():
+    from controllers.graph.controller import diff_graphs
+    try:
+        access_claims, _ = authenticate_user(request)
+    except AuthenticationError as e:
+        return jsonify({"error": e.message}), e.status_code
+    return diff_graphs(
+        access_claims['sub'],
+        base_group_id=request.args.get('base_group_id'),
+        compare_group_id=request.args.get('compare_group_id'),
+        base_result_id=request.args.get('base_result_id'),
+        compare_result_id=request.args.get('compare_result_id'),
+        score_tolerance=request.args.get('score_tolerance'),
+    )
 
 
 @app.route('/save', methods=['POST'])
 def controller_save_group():
+    from controllers.group.controller import save_group
     try:
         access_claims, _ = authenticate_user(request)
     except AuthenticationError as e:
@@ -50,16 +165,21 @@ def controller_save_group():
     genomes = json.loads(request.form.get('genomes', '[]'))
     num_genes = request.form.get('num_genes')
     num_domains = request.form.get('num_domains')
-    graph_data = request.form.get('graphs')
+    graph_data = request.form.get('graphs')  # Legacy: full graph JSON posted back by the client
+    result_id = request.form.get('result_id')  # Preferred: id of the result staged by /generate_graph
+    state_id = request.form.get('state_id')  # Optional: cached per-domain results, for incremental regeneration
+    compress = request.form.get('compress')  # Optional; defaults to GRAPH_COMPRESSION
+    compress = None if compress is None else compress.lower() == 'true'
     group_id = request.form.get('group_id')  # Optional, for updating existing groups
 
     coordinate_file = request.files.get('file_coordinate')
     matrix_files = [file for key, file in request.files.items() if key.startswith('file_matrix_')]
-    return save_group(user_id, title, description, coordinate_file, matrix_files, is_domain_specific, genomes, num_genes, num_domains, graph_data, group_id)
+    return save_group(user_id, title, description, coordinate_file, matrix_files, is_domain_specific, genomes, num_genes, num_domains, graph_data, group_id, result_id, compress, state_id)
 
 
 @app.route('/get_user_file_groups', methods=['POST'])
 def controller_get_user_file_groups():
+    from controllers.group.controller import get_user_file_groups
     try:
         access_claims, _ = authenticate_user(request)
     except AuthenticationError as e:
@@ -68,8 +188,21 @@ def controller_get_user_file_groups():
     return get_user_file_groups(user_id)
 
 
+# Prefix search over the genes/proteins in the user's saved projects; e.g. /search_genes?q=Lsativa_Salinas_Chr1&limit=50
+@app.route('/search_genes', methods=['GET'])
+def controller_search_genes():
+    from controllers.group.controller import search_user_genes
+    try:
+        access_claims, _ = authenticate_user(request)
+    except AuthenticationError as e:
+        return jsonify({"error": e.message}), e.status_code
+    user_id = access_claims['sub']
+    return search_user_genes(user_id, request.args.get('q', ''), request.args.get('limit'))
+
+
 @app.route('/verify_user')
 def controller_verify_user():
+    from controllers.auth.controller import verify_user_entry
     try:
         access_claims, id_claims = authenticate_user(request)
     except AuthenticationError as e:
@@ -87,6 +220,7 @@ def nintendo():
 
 @app.route('/download_file', methods=['GET'])
 def controller_download_file():
+    from controllers.graph.controller import download
     s3_key = request.args.get('key')
     if not s3_key:
         return jsonify({"error": "Missing file key"}), 400
@@ -95,6 +229,7 @@ def controller_download_file():
 
 @app.route('/delete_group', methods=['DELETE'])
 def controller_delete_group():
+    from controllers.group.controller import delete_group
     try:
         access_claims, _ =  authenticate_user(request)
     except AuthenticationError as e:
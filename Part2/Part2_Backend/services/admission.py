@@ -0,0 +1,312 @@
+"""
+Cost-aware admission control for /generate_graph.
+
+Parsing cost grows with matrix cells, so each request is first estimated
+from cheaply sniffed dimensions: the ``<dimension>`` element of an xlsx
+sheet, the .pmx header, or the header line and average row length of a
+CSV/TSV sample. When the shape can't be read, the estimate falls back to file
+size. Requests are then admitted into one of two lanes of weighted slots:
+
+- small: estimates up to ``small_max_cells``, one slot each
+- large: everything else, ceil(cells / ``large_cells_per_slot``) slots each
+  (at most the whole lane)
+
+so a few huge uploads can only occupy the large lane and never delay the
+small ones. A request that doesn't fit waits in its lane's FIFO queue for up
+to ``max_wait_seconds``. When the queue is full or the wait runs out, it is
+rejected with 503. A client that already has ``per_client_large`` large
+requests admitted or queued gets 429. Both rejections carry a Retry-After
+estimated from the lane's recent service times.
+
+Limits come from AdmissionConfig.from_env() (ADMISSION_* variables) and are
+per process: each worker process has its own lanes, queues and per-client
+counts. On Lambda an instance serves one request at a time, so no lane ever
+queues there and the per-client limit never triggers; only the small/large
+classification and the oversized-request weights apply. The queueing
+behaviour (and ``python -m benchmarks.admission_load``, which runs a local
+mixed-load scenario) is for a long-lived multi-threaded server.
+
+Clients are identified by server._client_id: API Gateway's sourceIp on
+Lambda, otherwise the remote address (see TRUSTED_PROXY_HOPS).
+"""
+import math
+import os
+import re
+import struct
+import threading
+import time
+import zipfile
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from exception_templates.admission_exception import ClientLimitExceeded, ServerSaturated
+
+SNIFF_BYTES = 64 * 1024
+_XLSX_DIMENSION = re.compile(rb'<dimension ref="[A-Z]+\d+:([A-Z]+)(\d+)"')
+_PMX_SHAPE = re.compile(rb'"shape":\s*\[(\d+),\s*(\d+)\]')
+
+
+@dataclass
+class AdmissionConfig:
+    """Admission limits (per process)."""
+    enabled: bool = True
+    small_max_cells: int = 4_000_000  # Estimates up to this go to the small lane
+    small_slots: int = 4
+    large_slots: int = 2
+    large_cells_per_slot: int = 50_000_000  # A large request takes one slot per this many cells
+    max_queue: int = 16  # Waiting requests per lane
+    max_wait_seconds: float = 30.0
+    per_client_large: int = 1  # Large requests one client may have admitted or queued
+    domain_overhead: float = 0.1  # Extra cost per domain matrix (combining graphs, domain validation)
+    # Cells per byte when a matrix's shape can't be sniffed
+    cells_per_byte: Dict[str, float] = field(default_factory=lambda: {
+        '.csv': 1 / 6, '.tsv': 1 / 6, '.xlsx': 1 / 2, '.pmx': 1 / 4,
+    })
+
+    @classmethod
+    def from_env(cls) -> "AdmissionConfig":
+        config = cls()
+        config.enabled = os.getenv('ADMISSION_CONTROL', 'true').lower() not in ('0', 'false', 'no', 'off')
+        for name, cast in (('small_max_cells', int), ('small_slots', int), ('large_slots', int),
+                           ('large_cells_per_slot', int), ('max_queue', int), ('max_wait_seconds', float),
+                           ('per_client_large', int), ('domain_overhead', float)):
+            value = os.getenv(f'ADMISSION_{name.upper()}')
+            if value:
+                setattr(config, name, cast(value))
+        return config
+
+
+@dataclass
+class Estimate:
+    """Estimated cost of a graph request."""
+    cells: int  # Matrix cells across all matrices
+    bytes: int  # Matrix bytes across all matrices
+    domains: int
+    sniffed: bool  # False if any matrix's shape came from its size
+    cost: float
+
+
+def _column_number(letters: bytes) -> int:
+    number = 0
+    for letter in letters:
+        number = number * 26 + (letter - ord('A') + 1)
+    return number
+
+
+def _sniff_xlsx(stream) -> Optional[Tuple[int, int]]:
+    with zipfile.ZipFile(stream) as archive:
+        sheets = sorted(n for n in archive.namelist() if n.startswith('xl/worksheets/') and n.endswith('.xml'))
+        if not sheets:
+            return None
+        with archive.open('xl/worksheets/sheet1.xml' if 'xl/worksheets/sheet1.xml' in sheets else sheets[0]) as sheet:
+            match = _XLSX_DIMENSION.search(sheet.read(4096))
+    if not match:
+        return None
+    # The header row and the row-label column aren't scores
+    return max(int(match.group(2)) - 1, 0), max(_column_number(match.group(1)) - 1, 1)
+
+
+def _sniff_pmx(stream) -> Optional[Tuple[int, int]]:
+    head = stream.read(SNIFF_BYTES)
+    if head[:4] != b'PMX1' or len(head) < 12:
+        return None
+    (header_length,) = struct.unpack('<Q', head[4:12])
+    match = _PMX_SHAPE.search(head[12:12 + header_length])
+    return (int(match.group(1)), int(match.group(2))) if match else None
+
+
+def _sniff_delimited(stream, size: int, sep: bytes) -> Optional[Tuple[int, int]]:
+    sample = stream.read(SNIFF_BYTES)
+    lines = sample.split(b'\n')
+    if len(lines) < 3:
+        # The whole file fits in the sample, or a single very long line
+        if len(sample) < SNIFF_BYTES:
+            rows = [line for line in lines if line.strip()]
+            return (max(len(rows) - 1, 0), max(rows[0].count(sep), 1)) if rows else None
+        return None
+    header, body = lines[0], lines[1:-1]  # The last line may be cut off
+    average = sum(len(line) + 1 for line in body) / len(body)
+    rows = round((size - len(header) - 1) / average) if average else 0
+    return rows, max(header.count(sep), 1)  # The first column holds the row labels
+
+
+def sniff_matrix_shape(file, filename: Optional[str] = None) -> Tuple[Optional[Tuple[int, int]], int]:
+    """
+    (rows, cols) of a matrix upload without parsing it, or None, plus its size in bytes.
+    The stream position is restored.
+    """
+    stream = getattr(file, 'stream', file)
+    filename = (filename or getattr(file, 'filename', None) or getattr(file, 'name', '') or '').lower()
+    position = stream.tell()
+    try:
+        stream.seek(0, os.SEEK_END)
+        size = stream.tell()
+        stream.seek(0)
+        try:
+            if filename.endswith('.xlsx'):
+                shape = _sniff_xlsx(stream)
+            elif filename.endswith('.pmx'):
+                shape = _sniff_pmx(stream)
+            elif filename.endswith(('.csv', '.tsv')):
+                shape = _sniff_delimited(stream, size, b'\t' if filename.endswith('.tsv') else b',')
+            else:
+                shape = None
+        except (zipfile.BadZipFile, ValueError, struct.error):
+            shape = None
+        return shape, size
+    finally:
+        stream.seek(position)
+
+
+def estimate_request(matrix_files: List, is_domain_specific: bool, config: AdmissionConfig) -> Estimate:
+    """Cost estimate for a /generate_graph request, from its matrix uploads."""
+    cells, total_bytes, sniffed = 0, 0, True
+    for matrix_file in matrix_files:
+        shape, size = sniff_matrix_shape(matrix_file)
+        total_bytes += size
+        if shape is None:
+            sniffed = False
+            name = getattr(matrix_file, 'filename', None) or getattr(matrix_file, 'name', '') or ''
+            ext = os.path.splitext(name.lower())[1]
+            cells += int(size * config.cells_per_byte.get(ext, 1 / 6))
+        else:
+            cells += shape[0] * shape[1]
+    domains = len(matrix_files) if is_domain_specific else 0
+    cost = cells * (1 + config.domain_overhead * domains)
+    return Estimate(cells=cells, bytes=total_bytes, domains=domains, sniffed=sniffed, cost=cost)
+
+
+class _Lane:
+    def __init__(self, name: str, slots: int, max_queue: int, default_seconds: float):
+        self.name = name
+        self.slots = max(1, slots)
+        self.max_queue = max_queue
+        self.in_use = 0
+        self.queue = deque()
+        self.seconds = default_seconds  # Moving average of request time, for Retry-After
+
+    def retry_after(self) -> int:
+        return max(1, math.ceil(self.seconds * (len(self.queue) + 1) / self.slots))
+
+
+@dataclass
+class Ticket:
+    lane: str
+    weight: int
+    client: Optional[str]
+    estimate: Estimate
+    queued_seconds: float = 0.0
+    admitted_at: float = 0.0
+
+
+class AdmissionController:
+    """Weighted small/large concurrency lanes with bounded FIFO queues."""
+
+    def __init__(self, config: Optional[AdmissionConfig] = None):
+        self.config = config or AdmissionConfig()
+        self._cond = threading.Condition()
+        self._lanes = {
+            "small": _Lane("small", self.config.small_slots, self.config.max_queue, 1.0),
+            "large": _Lane("large", self.config.large_slots, self.config.max_queue, 10.0),
+        }
+        self._large_by_client: Dict[str, int] = {}
+
+    def _classify(self, estimate: Estimate) -> Tuple[str, int]:
+        if estimate.cost <= self.config.small_max_cells:
+            return "small", 1
+        lane = self._lanes["large"]
+        weight = math.ceil(estimate.cost / max(1, self.config.large_cells_per_slot))
+        return "large", min(lane.slots, max(1, weight))
+
+    def acquire(self, estimate: Estimate, client: Optional[str] = None) -> Ticket:
+        """Wait for slots in the request's lane; raises AdmissionRejected (429/503)."""
+        lane_name, weight = self._classify(estimate)
+        lane = self._lanes[lane_name]
+        ticket = Ticket(lane=lane_name, weight=weight, client=client if lane_name == "large" else None,
+                        estimate=estimate)
+        started = time.monotonic()
+        with self._cond:
+            if ticket.client is not None:
+                if self._large_by_client.get(client, 0) >= self.config.per_client_large:
+                    raise ClientLimitExceeded(lane.retry_after())
+            if lane.queue or lane.in_use + weight > lane.slots:
+                if len(lane.queue) >= lane.max_queue:
+                    raise ServerSaturated(lane.retry_after())
+                self._hold_client(ticket, 1)
+                lane.queue.append(ticket)
+                deadline = started + self.config.max_wait_seconds
+                while lane.queue[0] is not ticket or lane.in_use + weight > lane.slots:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        lane.queue.remove(ticket)
+                        self._hold_client(ticket, -1)
+                        self._cond.notify_all()
+                        raise ServerSaturated(lane.retry_after())
+                    self._cond.wait(remaining)
+                lane.queue.popleft()
+                self._hold_client(ticket, -1)
+            lane.in_use += weight
+            self._hold_client(ticket, 1)
+            # The next queued request may fit in what is left
+            self._cond.notify_all()
+        ticket.admitted_at = time.monotonic()
+        ticket.queued_seconds = ticket.admitted_at - started
+        return ticket
+
+    def release(self, ticket: Ticket) -> None:
+        elapsed = time.monotonic() - ticket.admitted_at
+        with self._cond:
+            lane = self._lanes[ticket.lane]
+            lane.in_use -= ticket.weight
+            lane.seconds = 0.8 * lane.seconds + 0.2 * elapsed
+            self._hold_client(ticket, -1)
+            self._cond.notify_all()
+
+    def _hold_client(self, ticket: Ticket, delta: int) -> None:
+        if ticket.client is None:
+            return
+        count = self._large_by_client.get(ticket.client, 0) + delta
+        if count > 0:
+            self._large_by_client[ticket.client] = count
+        else:
+            self._large_by_client.pop(ticket.client, None)
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        with self._cond:
+            return {name: {"slots": lane.slots, "in_use": lane.in_use, "queued": len(lane.queue)}
+                    for name, lane in self._lanes.items()}
+
+    @contextmanager
+    def admit(self, matrix_files: List, is_domain_specific: bool, client: Optional[str] = None):
+        """Hold slots for the duration of the block; yields the Ticket (None when disabled)."""
+        if not self.config.enabled:
+            yield None
+            return
+        ticket = self.acquire(estimate_request(matrix_files, is_domain_specific, self.config), client)
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
+
+
+_controller: Optional[AdmissionController] = None
+_controller_lock = threading.Lock()
+
+
+def set_admission_controller(controller: Optional[AdmissionController]) -> None:
+    """Replace the process-wide controller (None re-reads the environment on next use)."""
+    global _controller
+    with _controller_lock:
+        _controller = controller
+
+
+def get_admission_controller() -> AdmissionController:
+    """Return the process-wide admission controller, configured from the environment."""
+    global _controller
+    if _controller is None:
+        with _controller_lock:
+            if _controller is None:
+                _controller = AdmissionController(AdmissionConfig.from_env())
+    return _controller
@@ -0,0 +1,124 @@
+"""
+Content-encoding helpers for stored graph artifacts.
+
+Graphs are stored in S3 with a standard HTTP ``Content-Encoding`` (``zstd``
+or ``gzip``) so they can be handed to browsers that accept that encoding
+without a decompress/re-compress cycle. zstandard is optional; without it
+everything falls back to gzip.
+"""
+import os
+import gzip
+import zlib
+from typing import Iterable, Iterator, Optional
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+IDENTITY = "identity"
+GZIP = "gzip"
+ZSTD = "zstd"
+
+CHUNK_SIZE = 64 * 1024
+
+
+def available_encodings():
+    encodings = [GZIP, IDENTITY]
+    if zstandard is not None:
+        encodings.insert(0, ZSTD)
+    return encodings
+
+
+def default_graph_encoding() -> str:
+    """
+    Encoding used for newly saved graphs.
+
+    Controlled by GRAPH_COMPRESSION ('auto', 'zstd', 'gzip' or 'identity').
+    'auto' (the default) picks zstd when the zstandard package is installed.
+    """
+    requested = os.getenv("GRAPH_COMPRESSION", "auto").lower()
+    if requested == "auto":
+        return ZSTD if zstandard is not None else GZIP
+    if requested in ("none", "", IDENTITY):
+        return IDENTITY
+    if requested == ZSTD and zstandard is None:
+        return GZIP
+    if requested not in (ZSTD, GZIP):
+        raise ValueError(f"Unsupported GRAPH_COMPRESSION value: {requested}")
+    return requested
+
+
+def normalize_encoding(encoding: Optional[str]) -> str:
+    return (encoding or IDENTITY).strip().lower()
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    encoding = normalize_encoding(encoding)
+    if encoding == IDENTITY:
+        return data
+    if encoding == GZIP:
+        return gzip.compress(data, compresslevel=6)
+    if encoding == ZSTD:
+        if zstandard is None:
+            raise ValueError("zstd compression requested but the zstandard package is not installed")
+        return zstandard.ZstdCompressor(level=10, threads=-1).compress(data)
+    raise ValueError(f"Unsupported content encoding: {encoding}")
+
+
+def decompress(data: bytes, encoding: Optional[str]) -> bytes:
+    return b"".join(decompress_stream([data], encoding))
+
+
+def decompress_stream(chunks: Iterable[bytes], encoding: Optional[str]) -> Iterator[bytes]:
+    """Incrementally decompress an iterable of encoded chunks."""
+    encoding = normalize_encoding(encoding)
+    if encoding == IDENTITY:
+        yield from chunks
+        return
+    if encoding == GZIP:
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        for chunk in chunks:
+            out = decompressor.decompress(chunk)
+            # Concatenated gzip members are valid; start a new decompressor for each
+            while decompressor.unused_data:
+                leftover = decompressor.unused_data
+                if out:
+                    yield out
+                decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+                out = decompressor.decompress(leftover)
+            if out:
+                yield out
+        tail = decompressor.flush()
+        if tail:
+            yield tail
+        return
+    if encoding == ZSTD:
+        if zstandard is None:
+            raise ValueError("Stored object is zstd-compressed but the zstandard package is not installed")
+        decompressor = zstandard.ZstdDecompressor().decompressobj()
+        for chunk in chunks:
+            out = decompressor.decompress(chunk)
+            if out:
+                yield out
+        return
+    raise ValueError(f"Unsupported content encoding: {encoding}")
+
+
+def accepts_encoding(accept_encoding_header: Optional[str], encoding: Optional[str]) -> bool:
+    """Whether an Accept-Encoding header allows serving a body encoded with `encoding` as-is."""
+    encoding = normalize_encoding(encoding)
+    if encoding == IDENTITY:
+        return True
+    for part in (accept_encoding_header or "").split(","):
+        token, _, params = part.strip().partition(";")
+        if token.strip().lower() not in (encoding, "*"):
+            continue
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                return float(q[2:]) > 0
+            except ValueError:
+                return False
+        return True
+    return False
@@ -0,0 +1,164 @@
+"""
+Gene -> project inverted index.
+
+Gene ids only live inside the stored graph JSON, so answering "which of my
+projects contain gene X" would otherwise mean downloading every project's
+graph. save_group writes one gene_index row per gene of a new project
+(gene id, protein name, genome) and search_genes answers prefix queries from
+Postgres indexes. Projects without index rows (saved before the index existed,
+or whose indexing failed on save) are filled with:
+
+    python -m services.gene_index [--all] [--workers 8]
+"""
+import argparse
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List
+
+from sqlalchemy import exists, insert, or_
+
+from database.models import Group, File, GeneIndex
+
+DEFAULT_SEARCH_LIMIT = 50
+MAX_SEARCH_LIMIT = 500
+INSERT_BATCH = 5000
+
+
+def extract_genes(graph_data) -> List[Dict[str, Any]]:
+    """
+    One entry per gene (gene_id, protein_name, genome_name) in a graph result.
+
+    Args:
+        graph_data: Graph JSON (bytes/str) or the parsed graph list
+    """
+    if isinstance(graph_data, (bytes, str)):
+        graph_data = json.loads(graph_data)
+    if isinstance(graph_data, dict):
+        graph_data = graph_data["graphs"] if "graphs" in graph_data else [graph_data]
+
+    genes = {}
+    for graph in graph_data:
+        for node in graph.get("nodes", []):
+            gene_id = node.get("id")
+            if gene_id is not None and gene_id not in genes:
+                genes[gene_id] = {
+                    "gene_id": str(gene_id),
+                    "protein_name": node.get("protein_name"),
+                    "genome_name": node.get("genome_name"),
+                }
+    return list(genes.values())
+
+
+def index_group(session, group_id, user_id, genes: Iterable[Dict[str, Any]]) -> int:
+    """Replace a project's index rows; returns the number of genes indexed."""
+    clear_group(session, group_id)
+    rows = [{**gene, "group_id": group_id, "user_id": user_id} for gene in genes]
+    for start in range(0, len(rows), INSERT_BATCH):
+        session.execute(insert(GeneIndex), rows[start:start + INSERT_BATCH])
+    return len(rows)
+
+
+def clear_group(session, group_id) -> None:
+    session.query(GeneIndex).filter(GeneIndex.group_id == group_id).delete(synchronize_session=False)
+
+
+def search_genes(session, user_id, query: str, limit: int = DEFAULT_SEARCH_LIMIT) -> Dict[str, Any]:
+    """
+    A user's projects containing genes whose id or protein name starts with query.
+
+    Returns:
+        dict: 'results' (gene_id, protein_name, genome_name, group_id, group_title),
+        ordered by gene id and project title, and 'truncated' if limit was reached
+    """
+    limit = max(1, min(int(limit), MAX_SEARCH_LIMIT))
+    # A complete 'prefix%' pattern (not prefix || '%') so the planner can use the text_pattern_ops indexes
+    pattern = query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+    rows = (
+        session.query(GeneIndex.gene_id, GeneIndex.protein_name, GeneIndex.genome_name, Group.id, Group.title)
+        .join(Group, Group.id == GeneIndex.group_id)
+        .filter(GeneIndex.user_id == user_id)
+        .filter(or_(GeneIndex.gene_id.like(pattern, escape='\\'),
+                    GeneIndex.protein_name.like(pattern, escape='\\')))
+        .order_by(GeneIndex.gene_id, Group.title, Group.id)
+        .limit(limit + 1)
+        .all()
+    )
+    results = [{
+        "gene_id": gene_id,
+        "protein_name": protein_name,
+        "genome_name": genome_name,
+        "group_id": str(group_id),
+        "group_title": title,
+    } for gene_id, protein_name, genome_name, group_id, title in rows[:limit]]
+    return {"results": results, "truncated": len(rows) > limit}
+
+
+def _groups_to_backfill(session, reindex_all: bool):
+    query = (
+        session.query(Group.id, Group.user_id, File.s3_key)
+        .join(File, (File.group_id == Group.id) & (File.file_type == "graph"))
+    )
+    if not reindex_all:
+        query = query.filter(~exists().where(GeneIndex.group_id == Group.id))
+    return query.order_by(Group.created_at).all()
+
+
+def backfill(reindex_all: bool = False, workers: int = 8, progress=None) -> Dict[str, int]:
+    """
+    Index saved projects from their stored graphs.
+
+    Graphs are downloaded and parsed on a thread pool; each project's rows are
+    written in their own transaction, so an interrupted run can be resumed.
+
+    Args:
+        reindex_all: Rebuild every project's rows, not just projects without any (by
+            default, unindexed and previously failed projects are both picked up)
+        workers: Concurrent graph downloads
+        progress: Optional callable receiving (group_id, gene count or exception)
+    """
+    from database import session_scope
+    from services.s3_service import get_file_bytes
+
+    with session_scope() as session:
+        groups = _groups_to_backfill(session, reindex_all)
+
+    def load(group):
+        return group, extract_genes(get_file_bytes(group.s3_key))
+
+    counts = {"groups": 0, "genes": 0, "failed": 0}
+    workers = max(1, workers)
+    window = workers * 4  # Parsed graphs held in memory at once
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(load, group) for group in groups[:window]]
+        for i, group in enumerate(groups):
+            future = futures[i]
+            if i + window < len(groups):
+                futures.append(pool.submit(load, groups[i + window]))
+            try:
+                _, genes = future.result()
+                futures[i] = None
+                with session_scope() as session:
+                    count = index_group(session, group.id, group.user_id, genes)
+            except Exception as e:
+                counts["failed"] += 1
+                if progress:
+                    progress(group.id, e)
+                continue
+            counts["groups"] += 1
+            counts["genes"] += count
+            if progress:
+                progress(group.id, count)
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fill the gene index for saved projects")
+    parser.add_argument("--all", action="store_true", help="Re-index every project, not only unindexed ones")
+    parser.add_argument("--workers", "-j", type=int, default=8, help="Concurrent graph downloads")
+    args = parser.parse_args()
+
+    def report(group_id, result):
+        print(f"{group_id}: {'failed: ' + str(result) if isinstance(result, Exception) else f'{result} genes'}")
+
+    totals = backfill(args.all, args.workers, progress=report)
+    print(f"Indexed {totals['genes']} genes across {totals['groups']} projects ({totals['failed']} failed)")
@@ -0,0 +1,257 @@
+"""
+Short-lived staging area for generated graph results.
+
+/generate_graph stashes its result here under a random result id, and /save
+promotes the staged artifact into permanent storage by id, so the browser no
+longer has to post the (often multi-MB) graph JSON back to the server.
+
+A result staged by a signed-in user is bound to their user id (the access
+token's sub): get/promote with any other owner fail as if the id had expired.
+Results staged without a token have no owner and work for whoever holds the id.
+"""
+import os
+import time
+import uuid
+import tempfile
+import threading
+from typing import Optional, Tuple
+
+from services import s3_service
+from services import compression
+
+DEFAULT_TTL_SECONDS = 3600
+STAGING_PREFIX = "staging"
+
+
+class ResultExpiredError(Exception):
+    """Raised when a result id is unknown or its TTL has passed."""
+    def __init__(self, result_id):
+        super().__init__(f"Result {result_id} not found or expired; please regenerate the graph")
+        self.result_id = result_id
+
+
+class ResultStore:
+    """Base class for staged-result backends."""
+
+    def __init__(self, ttl_seconds: int = DEFAULT_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+
+    def put(self, data: bytes, owner: Optional[str] = None) -> str:
+        """Stage a result, optionally bound to a user id, and return its id."""
+        raise NotImplementedError
+
+    def get(self, result_id: str, owner: Optional[str] = None) -> bytes:
+        """Return a staged result, raising ResultExpiredError if it is gone or owned by someone else."""
+        raise NotImplementedError
+
+    def delete(self, result_id: str) -> None:
+        raise NotImplementedError
+
+    def promote(self, result_id: str, encoding: str = compression.IDENTITY,
+                owner: Optional[str] = None, return_data: bool = False, delete_staged: bool = True) -> Tuple:
+        """
+        Copy a staged result into permanent graph storage and, by default, delete it.
+
+        Args:
+            result_id: Id returned by put()
+            encoding: Content encoding to store the graph with ('identity', 'gzip' or 'zstd')
+            owner: User id promoting the result; must match the owner it was staged with
+            return_data: Also return the staged bytes, so callers don't have to get() them first
+            delete_staged: Delete the staged result; callers that record the stored graph in a
+                transaction pass False and delete() it once that has committed
+
+        Returns:
+            Tuple of (s3_key, file name) for the stored graph, plus the
+            (uncompressed) staged bytes if return_data is set
+        """
+        encoding = compression.normalize_encoding(encoding)
+        staged = self.get(result_id, owner)
+        data = compression.compress(staged, encoding)
+        content_encoding = None if encoding == compression.IDENTITY else encoding
+        s3_key = s3_service.upload_bytes(data, "json", content_encoding=content_encoding)
+        if delete_staged:
+            self.delete(result_id)
+        if return_data:
+            return s3_key, _graph_filename(), staged
+        return s3_key, _graph_filename()
+
+    @staticmethod
+    def _new_id() -> str:
+        return uuid.uuid4().hex
+
+    @staticmethod
+    def _valid_id(result_id: str) -> bool:
+        # Ids are uuid4 hex; reject anything else before it reaches a path or key
+        return bool(result_id) and len(result_id) == 32 and all(c in "0123456789abcdef" for c in result_id)
+
+    @staticmethod
+    def _owner_matches(stored_owner: Optional[str], owner: Optional[str]) -> bool:
+        return not stored_owner or stored_owner == owner
+
+
+class LocalResultStore(ResultStore):
+    """Stages results on local disk. Suitable for single-process/dev deployments."""
+
+    def __init__(self, directory: str = None, ttl_seconds: int = DEFAULT_TTL_SECONDS):
+        super().__init__(ttl_seconds)
+        self.directory = directory or os.path.join(tempfile.gettempdir(), "graph_results")
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, result_id: str) -> str:
+        return os.path.join(self.directory, f"{result_id}.json")
+
+    def _owner_path(self, result_id: str) -> str:
+        return os.path.join(self.directory, f"{result_id}.owner")
+
+    def put(self, data: bytes, owner: Optional[str] = None) -> str:
+        self.evict_expired()
+        result_id = self._new_id()
+        if owner:
+            # Written first, so the result is never readable without its owner
+            with open(self._owner_path(result_id), "w", encoding="utf-8") as f:
+                f.write(owner)
+        tmp_path = self._path(result_id) + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, self._path(result_id))
+        return result_id
+
+    def _stored_owner(self, result_id: str) -> Optional[str]:
+        try:
+            with open(self._owner_path(result_id), encoding="utf-8") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def get(self, result_id: str, owner: Optional[str] = None) -> bytes:
+        if not self._valid_id(result_id):
+            raise ResultExpiredError(result_id)
+        path = self._path(result_id)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl_seconds:
+                self.delete(result_id)
+                raise ResultExpiredError(result_id)
+            if not self._owner_matches(self._stored_owner(result_id), owner):
+                raise ResultExpiredError(result_id)
+            with open(path, "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            raise ResultExpiredError(result_id)
+
+    def delete(self, result_id: str) -> None:
+        if not self._valid_id(result_id):
+            return
+        for path in (self._path(result_id), self._owner_path(result_id)):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def evict_expired(self) -> int:
+        """Remove staged results older than the TTL. Returns the number removed."""
+        removed = 0
+        cutoff = time.time() - self.ttl_seconds
+        for entry in os.scandir(self.directory):
+            try:
+                if entry.is_file() and entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+                    removed += 1
+            except FileNotFoundError:
+                continue
+        return removed
+
+
+class S3ResultStore(ResultStore):
+    """
+    Stages results under a prefix in the app's S3 bucket.
+
+    Expiry is enforced on read from the stored expires-at metadata; an S3
+    lifecycle rule on the staging prefix should be used to reclaim abandoned
+    objects.
+    """
+
+    def __init__(self, prefix: str = STAGING_PREFIX, ttl_seconds: int = DEFAULT_TTL_SECONDS):
+        super().__init__(ttl_seconds)
+        self.prefix = prefix
+
+    def _key(self, result_id: str) -> str:
+        return f"{self.prefix}/{result_id}.json"
+
+    def put(self, data: bytes, owner: Optional[str] = None) -> str:
+        result_id = self._new_id()
+        metadata = {"expires-at": str(int(time.time() + self.ttl_seconds))}
+        if owner:
+            metadata["owner"] = owner
+        s3_service.get_s3_client().put_object(
+            Bucket=os.getenv('S3_BUCKET_NAME'),
+            Key=self._key(result_id),
+            Body=data,
+            ContentType="application/json",
+            Metadata=metadata
+        )
+        return result_id
+
+    def _check(self, result_id: str, owner: Optional[str] = None) -> None:
+        if not self._valid_id(result_id):
+            raise ResultExpiredError(result_id)
+        try:
+            head = s3_service.get_s3_client().head_object(Bucket=os.getenv('S3_BUCKET_NAME'), Key=self._key(result_id))
+        except Exception:
+            raise ResultExpiredError(result_id)
+        metadata = head.get("Metadata", {})
+        if time.time() > float(metadata.get("expires-at", 0)):
+            self.delete(result_id)
+            raise ResultExpiredError(result_id)
+        if not self._owner_matches(metadata.get("owner"), owner):
+            raise ResultExpiredError(result_id)
+
+    def get(self, result_id: str, owner: Optional[str] = None) -> bytes:
+        self._check(result_id, owner)
+        body, _, _ = s3_service.get_object(self._key(result_id))
+        return body
+
+    def delete(self, result_id: str) -> None:
+        if self._valid_id(result_id):
+            s3_service.delete_key(self._key(result_id))
+
+    def promote(self, result_id: str, encoding: str = compression.IDENTITY,
+                owner: Optional[str] = None, return_data: bool = False, delete_staged: bool = True) -> Tuple:
+        if compression.normalize_encoding(encoding) != compression.IDENTITY or return_data:
+            # The bytes are read anyway, so they are uploaded rather than copied a second time
+            return super().promote(result_id, encoding, owner, return_data, delete_staged)
+        # Uncompressed promotion is a server-side copy; the bytes never leave S3
+        self._check(result_id, owner)
+        s3_key = s3_service.copy_within_s3(self._key(result_id), "json")
+        if delete_staged:
+            self.delete(result_id)
+        return s3_key, _graph_filename()
+
+
+def _graph_filename() -> str:
+    return f"graph_{time.strftime('%Y%m%d%H%M%S')}.json"
+
+
+_store: Optional[ResultStore] = None
+_store_lock = threading.Lock()
+
+
+def get_result_store() -> ResultStore:
+    """
+    Return the process-wide result store.
+
+    RESULT_STORE_BACKEND selects 'local' or 's3' (default: 's3' in production,
+    where Lambda instances don't share a disk, 'local' otherwise).
+    RESULT_STORE_TTL sets the TTL in seconds and RESULT_STORE_DIR the local directory.
+    """
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                default_backend = "s3" if os.getenv("ENV") == "production" else "local"
+                backend = os.getenv("RESULT_STORE_BACKEND", default_backend).lower()
+                ttl = int(os.getenv("RESULT_STORE_TTL", DEFAULT_TTL_SECONDS))
+                if backend == "s3":
+                    _store = S3ResultStore(ttl_seconds=ttl)
+                else:
+                    _store = LocalResultStore(os.getenv("RESULT_STORE_DIR"), ttl_seconds=ttl)
+    return _store
@@ -1,17 +1,31 @@
 import os
 from dotenv import load_dotenv
 from io import BytesIO
-import boto3
+import threading
 import uuid
 
+from services import compression
+
 load_dotenv()
 
-s3_client = boto3.client(
-    's3',
-    aws_access_key_id=os.getenv("S3_AWS_ACCESS_KEY_ID"),
-    aws_secret_access_key=os.getenv("S3_AWS_SECRET_ACCESS_KEY"),
-    region_name=os.getenv("AWS_REGION")
-)
+# The boto3 client is created on first use so that endpoints which never
+# touch S3 don't pay for importing boto3 on a cold start.
+_s3_client = None
+_s3_client_lock = threading.Lock()
+
+def get_s3_client():
+    global _s3_client
+    if _s3_client is None:
+        with _s3_client_lock:
+            if _s3_client is None:
+                import boto3
+                _s3_client = boto3.client(
+                    's3',
+                    aws_access_key_id=os.getenv("S3_AWS_ACCESS_KEY_ID"),
+                    aws_secret_access_key=os.getenv("S3_AWS_SECRET_ACCESS_KEY"),
+                    region_name=os.getenv("AWS_REGION")
+                )
+    return _s3_client
 
 def guess_content_type(extension):
     mapping = {
@@ -32,7 +46,7 @@ def upload_to_s3(file_obj):
     unique_filename = f"uploadedfiles/{uuid.uuid4()}.{extension.lower()}"
 
     # Upload to S3
-    s3_client.upload_fileobj(
+    get_s3_client().upload_fileobj(
         Fileobj=BytesIO(file_obj.read()),  # Important: rewrap as BytesIO
         Bucket=bucket_name,
         Key=unique_filename,
@@ -44,14 +58,69 @@ def upload_to_s3(file_obj):
 
     return unique_filename, original_filename  # Return the S3 object key (not full URL)
 
+def upload_bytes(data, extension, content_encoding=None, prefix="uploadedfiles", metadata=None):
+    """Upload raw bytes under a fresh unique key and return that key."""
+    key = f"{prefix}/{uuid.uuid4()}.{extension.lower()}"
+    return put_bytes(key, data, extension, content_encoding=content_encoding, metadata=metadata)
+
+def put_bytes(key, data, extension, content_encoding=None, metadata=None):
+    """Upload raw bytes under the given key and return it."""
+    extra_args = {"ContentType": guess_content_type(extension)}
+    if content_encoding:
+        extra_args["ContentEncoding"] = content_encoding
+    if metadata:
+        extra_args["Metadata"] = metadata
+    get_s3_client().upload_fileobj(
+        Fileobj=BytesIO(data),
+        Bucket=os.getenv('S3_BUCKET_NAME'),
+        Key=key,
+        ExtraArgs=extra_args
+    )
+    return key
+
+def copy_within_s3(source_key, extension, prefix="uploadedfiles"):
+    """Server-side copy of an existing object to a fresh unique key (no download/re-upload)."""
+    bucket_name = os.getenv('S3_BUCKET_NAME')
+    key = f"{prefix}/{uuid.uuid4()}.{extension.lower()}"
+    get_s3_client().copy_object(
+        Bucket=bucket_name,
+        Key=key,
+        CopySource={"Bucket": bucket_name, "Key": source_key},
+        MetadataDirective="COPY"
+    )
+    return key
+
+def delete_key(s3_key):
+    get_s3_client().delete_object(Bucket=os.getenv('S3_BUCKET_NAME'), Key=s3_key)
+
+def get_object(s3_key):
+    """Return (body bytes, ContentEncoding, user metadata) without decoding the body."""
+    response = get_s3_client().get_object(Bucket=os.getenv('S3_BUCKET_NAME'), Key=s3_key)
+    return response["Body"].read(), response.get("ContentEncoding"), response.get("Metadata", {})
+
+def open_object(s3_key, chunk_size=compression.CHUNK_SIZE):
+    """
+    Open an object for streaming.
+
+    Returns:
+        Tuple of (iterator over the raw stored chunks, ContentEncoding, ContentLength)
+    """
+    response = get_s3_client().get_object(Bucket=os.getenv('S3_BUCKET_NAME'), Key=s3_key)
+    return response["Body"].iter_chunks(chunk_size), response.get("ContentEncoding"), response.get("ContentLength")
+
+def iter_decoded(s3_key):
+    """Stream an object's bytes, decompressing according to its ContentEncoding."""
+    chunks, content_encoding, _ = open_object(s3_key)
+    return compression.decompress_stream(chunks, content_encoding)
+
 def delete_from_s3(file_obj):
-    s3_client.delete_object(
+    get_s3_client().delete_object(
         Bucket=os.getenv('S3_BUCKET_NAME'),
         Key=file_obj.s3_key
     )
 
 def get_file_url(s3_key):
-    return s3_client.generate_presigned_url(
+    return get_s3_client().generate_presigned_url(
         'get_object',
         Params={
             'Bucket': os.getenv('S3_BUCKET_NAME'),
@@ -60,5 +129,8 @@ def get_file_url(s3_key):
         ExpiresIn=3600
     )
 
+def get_file_bytes(s3_key):
+    return b"".join(iter_decoded(s3_key))
+
 def get_file(s3_key):
-    return s3_client.get_object(Bucket=os.getenv('S3_BUCKET_NAME'), Key=s3_key)["Body"].read().decode()
\ No newline at end of file
+    return get_file_bytes(s3_key).decode()
\ No newline at end of file
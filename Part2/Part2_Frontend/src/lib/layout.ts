@@ -0,0 +1,118 @@
+// Precomputed diagram layout (Part2_Backend/parsing/layout.py)
+export type GraphLayout = {
+  rows: string[];           // track order; with more than 2 genomes the last track repeats the first genome
+  duplicates: number[];     // graph node index of each bottom-track copy, in order
+  nodes: { row: number[] }; // track per layout node: graph nodes, then the copies
+  links: { source: number[]; target: number[]; visible: number[] }; // layout node indices (-1: unknown node)
+};
+
+type LayoutNode = { genome_name: string };
+
+type LayoutGraph<N extends LayoutNode, L> = {
+  genomes: string[];
+  nodes: N[];
+  links: L[];
+  layout?: GraphLayout;
+};
+
+/* whether a graph's layout was computed for its current nodes, links and genomes */
+export function hasLayout<N extends LayoutNode, L>(graph: LayoutGraph<N, L>): boolean {
+  const layout = graph.layout;
+  if (!layout) return false;
+  const copies = graph.genomes.length > 2 ? 1 : 0;
+  return layout.rows.length === graph.genomes.length + copies
+    && layout.rows.every((genome, i) => genome === graph.genomes[i % graph.genomes.length])
+    && layout.nodes.row.length === graph.nodes.length + layout.duplicates.length
+    && layout.links.source.length === graph.links.length;
+}
+
+/**
+ * compute_layout for links given as graph node indices: tracks follow genomes, first-genome
+ * nodes get a bottom-track copy when there are more than 2 genomes, and track-skipping links
+ * go to that copy.
+ */
+export function computeLayout(nodeGenomes: string[], source: number[], target: number[], genomes: string[]): GraphLayout {
+  const n = nodeGenomes.length;
+  const trackOf = new Map(genomes.map((genome, i) => [genome, i]));
+  const rows = nodeGenomes.map((genome) => trackOf.get(genome) ?? -1);
+
+  const duplicate = genomes.length > 2;
+  const duplicates: number[] = [];
+  const copyOf: number[] = new Array(n).fill(-1);
+  if (duplicate) {
+    rows.forEach((row, i) => {
+      if (row === 0) {
+        copyOf[i] = n + duplicates.length;
+        duplicates.push(i);
+      }
+    });
+  }
+
+  const links: GraphLayout['links'] = { source: [], target: [], visible: [] };
+  for (let i = 0; i < source.length; i++) {
+    let s = source[i];
+    let t = target[i];
+    const sourceRow = s >= 0 ? rows[s] : -1;
+    const targetRow = t >= 0 ? rows[t] : -1;
+    const known = sourceRow >= 0 && targetRow >= 0;
+    if (duplicate && known && Math.abs(sourceRow - targetRow) > 1) {
+      if (sourceRow === 0) s = copyOf[s];
+      else if (targetRow === 0) t = copyOf[t];
+    }
+    links.source.push(s);
+    links.target.push(t);
+    links.visible.push(known && sourceRow !== targetRow ? 1 : 0);
+  }
+
+  return {
+    rows: duplicate ? [...genomes, genomes[0]] : genomes,
+    duplicates,
+    nodes: { row: [...rows, ...duplicates.map(() => genomes.length)] },
+    links,
+  };
+}
+
+/**
+ * The part of a graph with a layout (see hasLayout) whose nodes are in genomes, with the
+ * layout redone for that genome order. Links are matched to nodes through the layout's
+ * endpoint indices, so there are no id lookups.
+ */
+export function selectGenomes<N extends LayoutNode, L, G extends LayoutGraph<N, L>>(graph: G, genomes: string[]): G {
+  const layout = graph.layout!;
+  const n = graph.nodes.length;
+  const selected = new Set(genomes);
+
+  const newIndex: number[] = new Array(n).fill(-1);
+  const nodes: N[] = [];
+  graph.nodes.forEach((node, i) => {
+    if (selected.has(node.genome_name)) {
+      newIndex[i] = nodes.length;
+      nodes.push(node);
+    }
+  });
+
+  // Endpoints pointing at a bottom-track copy are mapped back to the copied node
+  const graphNode = (i: number) => (i >= n ? layout.duplicates[i - n] : i);
+  const links: L[] = [];
+  const source: number[] = [];
+  const target: number[] = [];
+  graph.links.forEach((link, i) => {
+    const s = layout.links.source[i];
+    const t = layout.links.target[i];
+    if (s < 0 || t < 0) return;
+    const newSource = newIndex[graphNode(s)];
+    const newTarget = newIndex[graphNode(t)];
+    if (newSource < 0 || newTarget < 0) return;
+    links.push(link);
+    source.push(newSource);
+    target.push(newTarget);
+  });
+
+  return {
+    ...graph,
+    genomes,
+    nodes,
+    links,
+    layout: computeLayout(nodes.map((node) => node.genome_name), source, target, genomes),
+  };
+}
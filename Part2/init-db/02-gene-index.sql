@@ -0,0 +1,16 @@
+-- Gene -> project inverted index (database.models.GeneIndex).
+-- Safe to run against an existing database; fill it for existing projects with
+-- python -m services.gene_index
+
+CREATE TABLE IF NOT EXISTS gene_index (
+    group_id UUID NOT NULL REFERENCES groups(id) ON DELETE CASCADE,
+    gene_id VARCHAR NOT NULL,
+    user_id UUID NOT NULL REFERENCES users(id),
+    protein_name VARCHAR,
+    genome_name VARCHAR,
+    PRIMARY KEY (group_id, gene_id)
+);
+
+-- Prefix search (LIKE 'abc%') within one user's projects, by gene id or protein name
+CREATE INDEX IF NOT EXISTS idx_gene_index_user_gene ON gene_index(user_id, gene_id text_pattern_ops);
+CREATE INDEX IF NOT EXISTS idx_gene_index_user_protein ON gene_index(user_id, protein_name text_pattern_ops);